@@ -0,0 +1,467 @@
+import argparse
+import logging
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from igraph import Graph
+
+from src.hipporag.HippoRAG import HippoRAG
+from src.hipporag.ann_index import IVFIndex
+from src.hipporag.embedding_store import EmbeddingStore
+from src.hipporag.quantization import QuantizedIndex
+from src.hipporag.rerank import _get_reranker
+from src.hipporag.snapshot import read_snapshot, write_snapshot
+from src.hipporag.utils.config_utils import BaseConfig
+from src.hipporag.ppr import SparsePPR, PushPPR
+from src.hipporag.utils.embed_utils import knn_search
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def make_clustered_vectors(num_vectors: int, dim: int, num_clusters: int = 256, noise: float = 0.5, seed: int = 0) -> np.ndarray:
+    """Synthetic L2-normalized embeddings drawn around random cluster centers, a rough stand-in for real fact/passage embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, num_clusters, num_vectors)] + noise * rng.standard_normal((num_vectors, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = vectors @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def benchmark_ann(args):
+    """Recall@k and per-query latency of the IVF index against the exact brute-force scan."""
+    vectors = make_clustered_vectors(args.num_vectors + args.num_queries, args.dim)
+    vectors, queries = vectors[:args.num_vectors], vectors[args.num_vectors:]
+
+    start = time.time()
+    exact = [exact_top_k(vectors, query, args.k) for query in queries]
+    exact_latency = (time.time() - start) / args.num_queries
+    logger.info(f"exact: {exact_latency * 1000:.2f} ms/query")
+
+    index = IVFIndex(filename=None, nlist=args.nlist)
+    start = time.time()
+    index.build(vectors)
+    logger.info(f"IVF build with {args.nlist} lists: {time.time() - start:.2f}s")
+
+    for nprobe in args.nprobe:
+        index.nprobe = nprobe
+        start = time.time()
+        approx, _ = index.search(vectors, queries, args.k)
+        latency = (time.time() - start) / args.num_queries
+        recall = np.mean([len(set(a) & set(e)) / args.k for a, e in zip(approx, exact)])
+        logger.info(f"ivf nprobe={nprobe}: recall@{args.k}={recall:.4f}, {latency * 1000:.2f} ms/query, {exact_latency / latency:.1f}x vs exact")
+
+
+def benchmark_quantization(args):
+    """Memory, per-query latency and recall@k of quantized candidate generation with exact rescoring against float32."""
+    vectors = make_clustered_vectors(args.num_vectors + args.num_queries, args.dim)
+    vectors, queries = vectors[:args.num_vectors], vectors[args.num_vectors:]
+
+    start = time.time()
+    exact = [exact_top_k(vectors, query, args.k) for query in queries]
+    exact_latency = (time.time() - start) / args.num_queries
+    logger.info(f"float32: {vectors.nbytes / 2 ** 20:.1f} MiB, {exact_latency * 1000:.2f} ms/query")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Rescoring reads the full-precision vectors from a memory map, as with the 'mmap' store backend or a snapshot.
+        np.save(os.path.join(tmp_dir, "vectors.npy"), vectors)
+        mapped_vectors = np.load(os.path.join(tmp_dir, "vectors.npy"), mmap_mode="r")
+
+        for mode in args.mode:
+            index = QuantizedIndex(mode)
+            start = time.time()
+            index.build(vectors)
+            logger.info(f"{mode}: {index.nbytes / 2 ** 20:.1f} MiB ({vectors.nbytes / index.nbytes:.1f}x smaller), built in {time.time() - start:.2f}s")
+
+            for rescore_k in args.rescore_k:
+                index.rescore_k = rescore_k
+                start = time.time()
+                approx, _ = index.search(mapped_vectors, queries, args.k)
+                latency = (time.time() - start) / args.num_queries
+                recall = np.mean([len(set(a) & set(e)) / args.k for a, e in zip(approx, exact)])
+                logger.info(f"{mode} rescore_k={rescore_k}: recall@{args.k}={recall:.4f}, {latency * 1000:.2f} ms/query, {exact_latency / latency:.1f}x vs float32")
+
+
+def make_hipporag_like_graph(num_passages: int, num_entities: int, entities_per_passage: int, num_synonymy_edges: int, seed: int = 0) -> Graph:
+    """Random graph with HippoRAG's node layout: passage nodes linked to the entities they mention, entity-entity fact and synonymy edges."""
+    rng = np.random.default_rng(seed)
+    num_nodes = num_entities + num_passages
+    passage_nodes = np.repeat(np.arange(num_entities, num_nodes), entities_per_passage)
+    mentioned_entities = rng.integers(0, num_entities, len(passage_nodes))
+    fact_edges = rng.integers(0, num_entities, (num_passages * entities_per_passage // 2, 2))
+    synonymy_edges = rng.integers(0, num_entities, (num_synonymy_edges, 2))
+
+    edges = np.concatenate([np.stack([passage_nodes, mentioned_entities], axis=1), fact_edges, synonymy_edges])
+    weights = np.concatenate([np.ones(len(passage_nodes)), rng.integers(1, 4, len(fact_edges)), rng.uniform(0.8, 1.0, len(synonymy_edges))])
+
+    graph = Graph(n=num_nodes, edges=edges.tolist(), directed=False)
+    graph.es['weight'] = weights.tolist()
+    return graph
+
+
+def benchmark_ppr(args):
+    """Accuracy and queries/second of the sparse power-iteration and forward-push PPR engines against igraph's prpack."""
+    graph = make_hipporag_like_graph(args.num_passages, args.num_entities, args.entities_per_passage, args.num_synonymy_edges)
+    num_nodes = graph.vcount()
+    passage_idxs = np.arange(args.num_entities, num_nodes)
+    logger.info(f"Graph with {num_nodes} nodes and {graph.ecount()} edges.")
+
+    # Reset vectors like HippoRAG's: a few weighted phrase nodes plus small dense passage weights.
+    rng = np.random.default_rng(1)
+    reset_probs = np.zeros((args.num_queries, num_nodes))
+    reset_probs[:, passage_idxs] = 0.05 * rng.random((args.num_queries, len(passage_idxs)))
+    seed_idxs = [rng.choice(args.num_entities, 5, replace=False) for _ in range(args.num_queries)]
+    for reset_prob, seeds in zip(reset_probs, seed_idxs):
+        reset_prob[seeds] = rng.random(5)
+
+    start = time.time()
+    prpack_scores = np.array([graph.personalized_pagerank(vertices=range(num_nodes), damping=args.damping, directed=False,
+                                                          weights='weight', reset=reset_prob, implementation='prpack')
+                              for reset_prob in reset_probs])
+    prpack_qps = args.num_queries / (time.time() - start)
+    logger.info(f"prpack: {prpack_qps:.1f} queries/s")
+
+    start = time.time()
+    engine = SparsePPR(graph, tol=args.tol, max_iter=args.max_iter)
+    logger.info(f"sparse: transition matrix built in {time.time() - start:.2f}s")
+
+    prpack_top = np.argsort(-prpack_scores[:, passage_idxs], axis=1)[:, :args.k]
+    for batch_size in args.batch_size:
+        start = time.time()
+        sparse_scores = np.concatenate([engine.run(reset_probs[i:i + batch_size], damping=args.damping)
+                                        for i in range(0, args.num_queries, batch_size)])
+        qps = args.num_queries / (time.time() - start)
+
+        max_abs_err = np.abs(sparse_scores - prpack_scores).max()
+        sparse_top = np.argsort(-sparse_scores[:, passage_idxs], axis=1)[:, :args.k]
+        overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(sparse_top, prpack_top)])
+        logger.info(f"sparse batch_size={batch_size}: {qps:.1f} queries/s ({qps / prpack_qps:.1f}x prpack), "
+                    f"{engine.last_num_iters} iterations, max abs error {max_abs_err:.2e}, top-{args.k} passage overlap {overlap:.4f}")
+
+    engine = PushPPR(graph, prior_nodes=passage_idxs)
+    for epsilon in args.push_epsilon:
+        engine.epsilon = epsilon
+        # The sparse entry point HippoRAG uses: phrase seeds and passage prior as (ids, weights) pairs.
+        start = time.time()
+        push_top = [engine.run_sparse(seeds, reset_prob[seeds], passage_idxs, reset_prob[passage_idxs],
+                                      damping=args.damping, nodes=passage_idxs, top_k=args.k)[0]
+                    for seeds, reset_prob in zip(seed_idxs, reset_probs)]
+        qps = args.num_queries / (time.time() - start)
+
+        overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(push_top, prpack_top)])
+        logger.info(f"push epsilon={epsilon:g}: {qps:.1f} queries/s ({qps / prpack_qps:.1f}x prpack), "
+                    f"{engine.last_num_pushes / args.num_queries:.0f} pushes/query, top-{args.k} passage overlap {overlap:.4f}")
+
+
+def benchmark_top_k_weights(args):
+    """Per-query cost of `HippoRAG.get_top_k_weights` for growing graphs; it should not depend on the graph size."""
+    rng = np.random.default_rng(0)
+    for num_nodes in args.num_nodes:
+        queries = [(np.sort(rng.choice(num_nodes, args.num_linked_phrases, replace=False)),
+                    rng.random(args.num_linked_phrases) + 1e-3)
+                   for _ in range(args.num_queries)]
+
+        start = time.time()
+        for phrase_ids, phrase_weights in queries:
+            HippoRAG.get_top_k_weights(args.link_top_k, phrase_ids, phrase_weights)
+        latency = (time.time() - start) / args.num_queries
+        logger.info(f"{num_nodes} nodes: {latency * 1e6:.1f} us/query")
+
+
+def legacy_retrieve_knn(query_vecs, key_vecs, k, query_batch_size, key_batch_size):
+    """The torch-based blocked KNN that `retrieve_knn` used before `knn_search`, kept here as a baseline (minus the id lists)."""
+    import torch
+
+    query_vecs = torch.nn.functional.normalize(torch.tensor(query_vecs, dtype=torch.float32), dim=1)
+    key_vecs = torch.nn.functional.normalize(torch.tensor(key_vecs, dtype=torch.float32), dim=1)
+
+    all_indices, all_scores = [], []
+    for query_start in range(0, len(query_vecs), query_batch_size):
+        query_batch = query_vecs[query_start:query_start + query_batch_size]
+        batch_scores, batch_indices = [], []
+        for key_start in range(0, len(key_vecs), key_batch_size):
+            similarity = torch.mm(query_batch, key_vecs[key_start:key_start + key_batch_size].T)
+            topk_scores, topk_indices = torch.topk(similarity, min(k, similarity.size(1)), dim=1, largest=True, sorted=True)
+            batch_scores.append(topk_scores)
+            batch_indices.append(topk_indices + key_start)
+        batch_scores, batch_indices = torch.cat(batch_scores, dim=1), torch.cat(batch_indices, dim=1)
+        final_scores, final_positions = torch.topk(batch_scores, min(k, batch_scores.size(1)), dim=1, largest=True, sorted=True)
+        all_indices.append(torch.gather(batch_indices, 1, final_positions).numpy())
+        all_scores.append(final_scores.numpy())
+    return np.concatenate(all_indices), np.concatenate(all_scores)
+
+
+def benchmark_knn(args):
+    """Throughput of the NumPy blocked `knn_search` against the previous torch implementation of `retrieve_knn`."""
+    try:
+        import torch  # noqa: F401
+        has_torch = True
+    except ImportError:
+        has_torch = False
+        logger.info("torch is not installed, skipping the legacy baseline.")
+
+    for num_keys in args.num_keys:
+        key_vecs = make_clustered_vectors(num_keys, args.dim, num_clusters=4096)
+        query_vecs = key_vecs[:args.num_queries]
+
+        for dtype in args.dtype:
+            if dtype == "int8":
+                typed_key_vecs = np.clip(np.round(key_vecs * 127 / np.abs(key_vecs).max()), -127, 127).astype(np.int8)
+            else:
+                typed_key_vecs = key_vecs.astype(dtype)
+
+            start = time.time()
+            indices, _ = knn_search(typed_key_vecs[:args.num_queries], typed_key_vecs, k=args.k,
+                                    query_batch_size=args.query_batch_size, key_batch_size=args.key_batch_size)
+            elapsed = time.time() - start
+            logger.info(f"knn_search {dtype}, {num_keys} keys: {args.num_queries / elapsed:.1f} queries/s")
+
+        if has_torch:
+            start = time.time()
+            legacy_indices, _ = legacy_retrieve_knn(query_vecs, key_vecs, args.k, args.query_batch_size, args.key_batch_size)
+            legacy_elapsed = time.time() - start
+            recall = np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(indices, legacy_indices)])
+            logger.info(f"legacy torch, {num_keys} keys: {args.num_queries / legacy_elapsed:.1f} queries/s, "
+                        f"agreement with knn_search ({args.dtype[-1]}) {recall:.4f}")
+
+
+def load_stores_and_graph(working_dir: str):
+    """The part of a fresh `HippoRAG` + `prepare_retrieval_objects` that a snapshot replaces: parquet stores, pickled graph and lookup tables."""
+    stores = {namespace: EmbeddingStore(None, os.path.join(working_dir, f"{namespace}_embeddings"), 16, namespace)
+              for namespace in ["chunk", "entity", "fact"]}
+    graph = Graph.Read_Pickle(os.path.join(working_dir, "graph.pickle"))
+
+    name_to_vertex_idx = {node["name"]: idx for idx, node in enumerate(graph.vs)}
+    keys = {namespace: store.get_all_ids() for namespace, store in stores.items()}
+    entity_node_idxs = [name_to_vertex_idx[node_key] for node_key in keys["entity"]]
+    passage_node_idxs = [name_to_vertex_idx[node_key] for node_key in keys["chunk"]]
+    entity_text_to_vertex_idx = {stores["entity"].get_row(node_key)["content"]: vertex_idx
+                                 for node_key, vertex_idx in zip(keys["entity"], entity_node_idxs)}
+    embeddings = {namespace: np.asarray(store.get_embeddings(keys[namespace])) for namespace, store in stores.items()}
+
+    return SimpleNamespace(global_config=BaseConfig(save_dir=working_dir), graph=graph, num_vertices=graph.vcount(),
+                           chunk_embedding_store=stores["chunk"], entity_embedding_store=stores["entity"], fact_embedding_store=stores["fact"],
+                           passage_node_keys=keys["chunk"], entity_node_keys=keys["entity"], fact_node_keys=keys["fact"],
+                           passage_embeddings=embeddings["chunk"], entity_embeddings=embeddings["entity"], fact_embeddings=embeddings["fact"],
+                           entity_node_idxs=entity_node_idxs, passage_node_idxs=passage_node_idxs,
+                           entity_text_to_vertex_idx=entity_text_to_vertex_idx, vertex_chunk_counts=np.ones(graph.vcount()))
+
+
+def load_snapshot_objects(path: str):
+    """The retrieval objects `HippoRAG.from_snapshot` sets up, minus the models."""
+    snapshot = read_snapshot(path)
+    entity_text_to_vertex_idx = dict(zip(snapshot["entity"].texts.tolist(), snapshot["entity_vertex_idxs"].tolist()))
+    embeddings = {namespace: np.asarray(snapshot[namespace].embeddings) for namespace in ["chunk", "entity", "fact"]}
+    return snapshot, entity_text_to_vertex_idx, embeddings
+
+
+def benchmark_snapshot(args):
+    """Cold-start time of the retrieval state from the regular working directory vs from a serving snapshot."""
+    with tempfile.TemporaryDirectory() as working_dir:
+        num_facts = args.num_passages * args.entities_per_passage // 2
+        sizes = {"chunk": args.num_passages, "entity": args.num_entities, "fact": num_facts}
+        texts = {"chunk": [f"passage {i} " + "lorem ipsum " * 50 for i in range(args.num_passages)],
+                 "entity": [f"entity {i}" for i in range(args.num_entities)],
+                 "fact": [str((f"entity {i}", "relates to", f"entity {i + 1}")) for i in range(num_facts)]}
+        node_keys = {}
+        for namespace in sizes:
+            # The store only calls `batch_encode` of its embedding model, so a namespace stands in for one.
+            embedding_model = SimpleNamespace(batch_encode=lambda batch: make_clustered_vectors(len(batch), args.dim))
+            store = EmbeddingStore(embedding_model, os.path.join(working_dir, f"{namespace}_embeddings"), 16, namespace)
+            store.insert_strings(texts[namespace])
+            node_keys[namespace] = store.get_all_ids()
+
+        graph = make_hipporag_like_graph(args.num_passages, args.num_entities, args.entities_per_passage, args.num_synonymy_edges)
+        graph.vs["name"] = node_keys["entity"] + node_keys["chunk"]
+        graph.write_pickle(os.path.join(working_dir, "graph.pickle"))
+        logger.info(f"Corpus with {args.num_passages} passages, {args.num_entities} entities, {num_facts} facts and {graph.ecount()} edges.")
+
+        legacy_times = []
+        for _ in range(args.repeats):
+            start = time.time()
+            hipporag = load_stores_and_graph(working_dir)
+            legacy_times.append(time.time() - start)
+        logger.info(f"stores + graph pickle: {min(legacy_times):.3f}s")
+
+        snapshot_path = os.path.join(working_dir, "snapshot")
+        start = time.time()
+        write_snapshot(snapshot_path, hipporag)
+        logger.info(f"snapshot export: {time.time() - start:.3f}s")
+
+        snapshot_times = []
+        for _ in range(args.repeats):
+            start = time.time()
+            load_snapshot_objects(snapshot_path)
+            snapshot_times.append(time.time() - start)
+        logger.info(f"snapshot: {min(snapshot_times):.3f}s ({min(legacy_times) / min(snapshot_times):.1f}x faster)")
+
+
+# Run in a fresh interpreter per measurement, since a module is only imported once per process.
+IMPORT_TIME_SCRIPT = """
+import json, multiprocessing, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": sorted({{name.split(".")[0] for name in sys.modules}}),
+                  "child_processes": len(multiprocessing.active_children())}}))
+"""
+
+HEAVY_MODULES = ["torch", "transformers", "vllm", "gritlm", "FlagEmbedding", "boto3", "litellm", "dspy"]
+
+
+def benchmark_import_time(args):
+    """Wall time of importing the package in a fresh interpreter, and which heavy backends the import drags in."""
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(args.repeats):
+        output = subprocess.run([sys.executable, "-c", IMPORT_TIME_SCRIPT.format(module=args.module)],
+                                cwd=repo_dir, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result["seconds"])
+
+    loaded = [name for name in HEAVY_MODULES if name in result["modules"]]
+    median = float(np.median(times))
+    logger.info(f"import {args.module}: median {median:.3f}s, min {min(times):.3f}s over {args.repeats} runs")
+    logger.info(f"heavy modules loaded: {loaded or 'none'}, child processes: {result['child_processes']}")
+    if args.max_seconds is not None and median > args.max_seconds:
+        raise SystemExit(f"Importing {args.module} took {median:.3f}s, above the budget of {args.max_seconds}s.")
+
+
+def load_retrieval_samples(dataset: str):
+    """Queries, gold passages and corpus of a `reproduce/dataset` dataset, with passages formatted as `title\ntext` like in indexing."""
+    dataset_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reproduce", "dataset")
+    with open(os.path.join(dataset_dir, f"{dataset}.json")) as f:
+        samples = json.load(f)
+    with open(os.path.join(dataset_dir, f"{dataset}_corpus.json")) as f:
+        corpus = json.load(f)
+
+    queries = [sample["question"] for sample in samples]
+    gold_docs = [list({f"{paragraph['title']}\n{paragraph['text']}" for paragraph in sample.get("paragraphs", sample.get("contexts", []))
+                       if paragraph.get("is_supporting", True)}) for sample in samples]
+    docs = [f"{doc['title']}\n{doc['text']}" for doc in corpus]
+    return queries, gold_docs, docs
+
+
+def benchmark_rerank(args):
+    """Recognition memory latency and retrieval recall of each reranker, on an index of a `reproduce/dataset` corpus."""
+    queries, gold_docs, docs = load_retrieval_samples(args.dataset)
+    config = BaseConfig(save_dir=os.path.join(args.save_dir, args.dataset),
+                        llm_name=args.llm_name,
+                        llm_base_url=args.llm_base_url,
+                        embedding_model_name=args.embedding_name,
+                        dataset=args.dataset,
+                        cross_encoder_model_name=args.cross_encoder_model_name,
+                        cross_encoder_device=args.cross_encoder_device)
+    hipporag = HippoRAG(global_config=config)
+    hipporag.index(docs)
+    logger.info(f"{len(queries)} queries over {len(docs)} passages from {args.dataset}.")
+
+    for reranker in args.rerankers:
+        hipporag.global_config.reranker = reranker
+        hipporag.rerank_filter = _get_reranker(hipporag)
+        hipporag.rerank_time = 0
+        start = time.time()
+        _, recall = hipporag.retrieve(queries, gold_docs=gold_docs)
+        elapsed = time.time() - start
+        logger.info(f"{reranker}: recognition memory {1000 * hipporag.rerank_time / len(queries):.1f} ms/query, "
+                    f"retrieval {1000 * elapsed / len(queries):.1f} ms/query, {recall}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for HippoRAG retrieval components.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    ann_parser = subparsers.add_parser("ann", help="Approximate vs exact nearest-neighbour search.")
+    ann_parser.add_argument("--num_vectors", type=int, default=200000)
+    ann_parser.add_argument("--num_queries", type=int, default=200)
+    ann_parser.add_argument("--dim", type=int, default=256)
+    ann_parser.add_argument("--k", type=int, default=100)
+    ann_parser.add_argument("--nlist", type=int, default=1024)
+    ann_parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32, 64, 128])
+    ann_parser.set_defaults(func=benchmark_ann)
+
+    quantization_parser = subparsers.add_parser("quantization", help="Quantized candidate generation with exact rescoring vs float32.")
+    quantization_parser.add_argument("--num_vectors", type=int, default=200000)
+    quantization_parser.add_argument("--num_queries", type=int, default=100)
+    quantization_parser.add_argument("--dim", type=int, default=1024)
+    quantization_parser.add_argument("--k", type=int, default=100)
+    quantization_parser.add_argument("--rescore_k", type=int, nargs="+", default=[200, 1000])
+    quantization_parser.add_argument("--mode", nargs="+", choices=["float16", "int8", "binary"], default=["float16", "int8", "binary"])
+    quantization_parser.set_defaults(func=benchmark_quantization)
+
+    ppr_parser = subparsers.add_parser("ppr", help="Sparse power-iteration PPR vs igraph prpack.")
+    ppr_parser.add_argument("--num_passages", type=int, default=10000)
+    ppr_parser.add_argument("--num_entities", type=int, default=50000)
+    ppr_parser.add_argument("--entities_per_passage", type=int, default=10)
+    ppr_parser.add_argument("--num_synonymy_edges", type=int, default=100000)
+    ppr_parser.add_argument("--num_queries", type=int, default=64)
+    ppr_parser.add_argument("--damping", type=float, default=0.5)
+    ppr_parser.add_argument("--tol", type=float, default=1e-8)
+    ppr_parser.add_argument("--max_iter", type=int, default=100)
+    ppr_parser.add_argument("--k", type=int, default=200)
+    ppr_parser.add_argument("--batch_size", type=int, nargs="+", default=[1, 8, 32])
+    ppr_parser.add_argument("--push_epsilon", type=float, nargs="+", default=[1e-5, 1e-6, 1e-7])
+    ppr_parser.set_defaults(func=benchmark_ppr)
+
+    top_k_weights_parser = subparsers.add_parser("top_k_weights", help="Per-query cost of get_top_k_weights vs graph size.")
+    top_k_weights_parser.add_argument("--num_nodes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    top_k_weights_parser.add_argument("--num_queries", type=int, default=1000)
+    top_k_weights_parser.add_argument("--num_linked_phrases", type=int, default=10)
+    top_k_weights_parser.add_argument("--link_top_k", type=int, default=5)
+    top_k_weights_parser.set_defaults(func=benchmark_top_k_weights)
+
+    knn_parser = subparsers.add_parser("knn", help="NumPy blocked KNN vs the previous torch implementation.")
+    knn_parser.add_argument("--num_keys", type=int, nargs="+", default=[100000, 1000000])
+    knn_parser.add_argument("--num_queries", type=int, default=2000)
+    knn_parser.add_argument("--dim", type=int, default=256)
+    knn_parser.add_argument("--k", type=int, default=2047)
+    knn_parser.add_argument("--query_batch_size", type=int, default=1000)
+    knn_parser.add_argument("--key_batch_size", type=int, default=10000)
+    knn_parser.add_argument("--dtype", nargs="+", choices=["float32", "float16", "int8"], default=["float16", "int8", "float32"])
+    knn_parser.set_defaults(func=benchmark_knn)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="Cold start from the working directory vs from a serving snapshot.")
+    snapshot_parser.add_argument("--num_passages", type=int, default=20000)
+    snapshot_parser.add_argument("--num_entities", type=int, default=100000)
+    snapshot_parser.add_argument("--entities_per_passage", type=int, default=10)
+    snapshot_parser.add_argument("--num_synonymy_edges", type=int, default=100000)
+    snapshot_parser.add_argument("--dim", type=int, default=256)
+    snapshot_parser.add_argument("--repeats", type=int, default=3)
+    snapshot_parser.set_defaults(func=benchmark_snapshot)
+
+    import_time_parser = subparsers.add_parser("import_time", help="Import time of the package in a fresh interpreter.")
+    import_time_parser.add_argument("--module", default="src.hipporag")
+    import_time_parser.add_argument("--repeats", type=int, default=5)
+    import_time_parser.add_argument("--max_seconds", type=float, default=None,
+                                    help="Exit with an error if the median import time exceeds this budget.")
+    import_time_parser.set_defaults(func=benchmark_import_time)
+
+    rerank_parser = subparsers.add_parser("rerank", help="LLM (DSPy) filter vs local cross-encoder recognition memory.")
+    rerank_parser.add_argument("--dataset", default="sample", help="Name of a `reproduce/dataset` dataset with a corpus file.")
+    rerank_parser.add_argument("--save_dir", default="outputs/benchmark_rerank")
+    rerank_parser.add_argument("--llm_name", default="gpt-4o-mini")
+    rerank_parser.add_argument("--llm_base_url", default=None)
+    rerank_parser.add_argument("--embedding_name", default="nvidia/NV-Embed-v2")
+    rerank_parser.add_argument("--rerankers", nargs="+", choices=["dspy_filter", "cross_encoder"], default=["dspy_filter", "cross_encoder"])
+    rerank_parser.add_argument("--cross_encoder_model_name", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    rerank_parser.add_argument("--cross_encoder_device", default="cpu")
+    rerank_parser.set_defaults(func=benchmark_rerank)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
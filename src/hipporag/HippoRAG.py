@@ -1,5 +1,6 @@
 import json
 import os
+import pickle
 import logging
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
@@ -7,7 +8,6 @@ from typing import Union, Optional, List, Set, Dict, Any, Tuple, Literal
 import numpy as np
 import importlib
 from collections import defaultdict
-from transformers import HfArgumentParser
 from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 from igraph import Graph
@@ -19,24 +19,36 @@ import time
 
 from .llm import _get_llm_class, BaseLLM
 from .embedding_model import _get_embedding_model_class, BaseEmbeddingModel
-from .embedding_store import EmbeddingStore
+from .embedding_model.query_cache import QueryEmbeddingCache
+from .embedding_store import EmbeddingStore, _get_embedding_store, _get_quantized_index
 from .information_extraction import OpenIE
-from .information_extraction.openie_vllm_offline import VLLMOfflineOpenIE
+from .ppr import SparsePPR, PushPPR, adjacency_to_graph
+from .ann_index import IVFIndex
+from .retrieval_cache import RetrievalResultCache, normalize_query, config_fingerprint
+from .snapshot import write_snapshot, read_snapshot
+from .openie_store import OpenIEStore
+from .graph_state import CSRMapping, load_graph_state, save_graph_state
 from .information_extraction.table_extractor import TableTripleExtractor
 from .information_extraction.table_to_text_converter import TableToTextConverter
 from .evaluation.retrieval_eval import RetrievalRecall
 from .evaluation.qa_eval import QAExactMatch, QAF1Score
 from .prompts.linking import get_query_instruction
 from .prompts.prompt_template_manager import PromptTemplateManager
-from .rerank import DSPyFilter
+from .rerank import BaseReranker, _get_reranker
 from .utils.misc_utils import *
 from .utils.misc_utils import NerRawOutput, TripleRawOutput
-from .utils.embed_utils import retrieve_knn
+from .utils.embed_utils import knn_search
+from .utils.llm_utils import filter_invalid_triples
+from .utils.qa_utils import batch_qa_inference
 from .utils.typing import Triple
 from .utils.config_utils import BaseConfig
 
 logger = logging.getLogger(__name__)
 
+# Slots of `HippoRAG.query_to_embedding` and the query instructions their embeddings are encoded with.
+QUERY_EMBEDDING_SLOTS = {'triple': 'query_to_fact', 'passage': 'query_to_passage'}
+
+
 class HippoRAG:
 
     def __init__(self,
@@ -70,8 +82,8 @@ class HippoRAG:
                 and roles mappings.
             openie_results_path (str): The file path for storing Open Information Extraction results
                 based on the dataset and LLM name in the global configuration.
-            rerank_filter (Optional[DSPyFilter]): The filter responsible for reranking information
-                when a rerank file path is specified in the global configuration.
+            rerank_filter (BaseReranker): The recognition memory filtering the facts retrieved for a query,
+                selected by `reranker` in the global configuration.
             ready_to_retrieve (bool): A flag indicating whether the system is ready for retrieval
                 operations.
 
@@ -126,7 +138,11 @@ class HippoRAG:
         self.llm_model: BaseLLM = _get_llm_class(self.global_config)
 
         if self.global_config.openie_mode == 'online':
-            self.openie = OpenIE(llm_model=self.llm_model)
+            self.openie = OpenIE(llm_model=self.llm_model,
+                                 pipelined=self.global_config.openie_pipelined,
+                                 ner_workers=self.global_config.openie_ner_workers,
+                                 triple_workers=self.global_config.openie_triple_workers,
+                                 max_in_flight=self.global_config.openie_max_in_flight)
             # 初始化表格处理器（根据配置选择处理模式）
             if self.global_config.table_processing_mode == 'triple_extraction':
                 self.table_extractor = TableTripleExtractor(llm_model=self.llm_model)
@@ -140,6 +156,7 @@ class HippoRAG:
                     detail_level=self.global_config.text_conversion_detail_level
                 )
         elif self.global_config.openie_mode == 'offline':
+            from .information_extraction.openie_vllm_offline import VLLMOfflineOpenIE
             self.openie = VLLMOfflineOpenIE(self.global_config)
             # offline模式暂不支持表格处理
             self.table_extractor = None
@@ -153,23 +170,30 @@ class HippoRAG:
             self.embedding_model: BaseEmbeddingModel = _get_embedding_model_class(
                 embedding_model_name=self.global_config.embedding_model_name)(global_config=self.global_config,
                                                                               embedding_model_name=self.global_config.embedding_model_name)
-        self.chunk_embedding_store = EmbeddingStore(self.embedding_model,
-                                                    os.path.join(self.working_dir, "chunk_embeddings"),
-                                                    self.global_config.embedding_batch_size, 'chunk')
-        self.entity_embedding_store = EmbeddingStore(self.embedding_model,
-                                                     os.path.join(self.working_dir, "entity_embeddings"),
-                                                     self.global_config.embedding_batch_size, 'entity')
-        self.fact_embedding_store = EmbeddingStore(self.embedding_model,
-                                                   os.path.join(self.working_dir, "fact_embeddings"),
-                                                   self.global_config.embedding_batch_size, 'fact')
+        self.chunk_embedding_store = _get_embedding_store(self.global_config, self.embedding_model,
+                                                          os.path.join(self.working_dir, "chunk_embeddings"), 'chunk')
+        self.entity_embedding_store = _get_embedding_store(self.global_config, self.embedding_model,
+                                                           os.path.join(self.working_dir, "entity_embeddings"), 'entity')
+        self.fact_embedding_store = _get_embedding_store(self.global_config, self.embedding_model,
+                                                         os.path.join(self.working_dir, "fact_embeddings"), 'fact')
+
+        self.init_query_embedding_cache()
+        self.init_retrieval_cache()
 
         self.prompt_template_manager = PromptTemplateManager(role_mapping={"system": "system", "user": "user", "assistant": "assistant"})
 
         self.openie_results_path = os.path.join(self.global_config.save_dir,f'openie_results_ner_{self.global_config.llm_name.replace("/", "_")}.json')
+        if self.global_config.openie_store_backend == 'sqlite':
+            self.openie_store = OpenIEStore(os.path.splitext(self.openie_results_path)[0] + '.sqlite',
+                                            legacy_json_filename=self.openie_results_path)
+        else:
+            self.openie_store = None
 
-        self.rerank_filter = DSPyFilter(self)
+        self.rerank_filter: BaseReranker = _get_reranker(self)
 
         self.ready_to_retrieve = False
+        self._read_only = False
+        self.ppr_engine = None
 
         self.ppr_time = 0
         self.rerank_time = 0
@@ -196,6 +220,12 @@ class HippoRAG:
         self._graph_pickle_filename = os.path.join(
             self.working_dir, f"graph.pickle"
         )
+        self._synonymy_neighbors_filename = os.path.join(
+            self.working_dir, f"synonymy_neighbors.pickle"
+        )
+        self._graph_state_filename = os.path.join(
+            self.working_dir, f"graph_state.npz"
+        )
 
         preloaded_graph = None
 
@@ -229,6 +259,10 @@ class HippoRAG:
 
         assert False, logger.info('Done with OpenIE, run online indexing for future retrieval.')
 
+    def _check_writable(self, operation: str):
+        if self._read_only:
+            raise RuntimeError(f"Cannot {operation} on a HippoRAG instance opened from a snapshot, which is read-only.")
+
     def index(self, docs: List[str]):
         """
         Indexes the given documents based on the HippoRAG 2 framework which generates an OpenIE knowledge graph
@@ -238,6 +272,11 @@ class HippoRAG:
             docs : List[str]
                 A list of documents to be indexed.
         """
+        self._check_writable("index documents")
+
+        # The index version is bumped before and after the update, so that cached retrieval results computed
+        # against the index while it changes are never served.
+        self.index_version += 1
 
         logger.info(f"Indexing Documents")
 
@@ -247,7 +286,7 @@ class HippoRAG:
             self.pre_openie(docs)
 
         self.chunk_embedding_store.insert_strings(docs)
-        chunk_to_rows = self.chunk_embedding_store.get_all_id_to_rows()
+        chunk_to_rows = self.get_chunks_to_index()
 
         all_openie_info, chunk_keys_to_process = self.load_existing_openie(chunk_to_rows.keys())
         new_openie_rows = {k : chunk_to_rows[k] for k in chunk_keys_to_process}
@@ -291,6 +330,10 @@ class HippoRAG:
             self.augment_graph()
             self.save_igraph()
 
+            self.ready_to_retrieve = False
+
+        self.index_version += 1
+
     def index_with_tables(self, docs: List[str], content_types: List[str]):
         """
         索引包含表格的文档。根据content_type区分文本和表格段落进行不同处理。
@@ -301,9 +344,12 @@ class HippoRAG:
             content_types : List[str] 
                 对应的内容类型列表，'text'为文本，'table'为表格
         """
+        self._check_writable("index documents")
         
         if len(docs) != len(content_types):
             raise ValueError("docs和content_types长度必须一致")
+
+        self.index_version += 1
             
         logger.info(f"索引包含表格的文档: 文本段落 {content_types.count('text')} 个, 表格段落 {content_types.count('table')} 个")
         
@@ -325,7 +371,7 @@ class HippoRAG:
         if text_docs:
             logger.info(f"处理文本段落...")
             self.chunk_embedding_store.insert_strings(text_docs)
-            chunk_to_rows = self.chunk_embedding_store.get_all_id_to_rows()
+            chunk_to_rows = self.get_chunks_to_index()
             
             all_openie_info, chunk_keys_to_process = self.load_existing_openie(chunk_to_rows.keys())
             new_openie_rows = {k : chunk_to_rows[k] for k in chunk_keys_to_process}
@@ -473,6 +519,10 @@ class HippoRAG:
             self.augment_graph()
             self.save_igraph()
 
+            self.ready_to_retrieve = False
+
+        self.index_version += 1
+
     def delete(self, docs_to_delete: List[str]):
         """
         Deletes the given documents from all data structures within the HippoRAG class.
@@ -482,6 +532,9 @@ class HippoRAG:
             docs : List[str]
                 A list of documents to be deleted.
         """
+        self._check_writable("delete documents")
+
+        self.index_version += 1
 
         #Making sure that all the necessary structures have been built.
         if not self.ready_to_retrieve:
@@ -495,16 +548,20 @@ class HippoRAG:
             [self.chunk_embedding_store.text_to_hash_id[chunk] for chunk in docs_to_delete])
 
         #Find triples in chunks to delete
-        all_openie_info, chunk_keys_to_process = self.load_existing_openie([])
         triples_to_delete = []
 
         all_openie_info_with_deletes = []
 
-        for openie_doc in all_openie_info:
-            if openie_doc['idx'] in chunk_ids_to_delete:
-                triples_to_delete.append(openie_doc['extracted_triples'])
-            else:
-                all_openie_info_with_deletes.append(openie_doc)
+        if self.openie_store is not None:
+            triples_to_delete = [openie_doc['extracted_triples'] for openie_doc in self.openie_store.get(chunk_ids_to_delete)]
+        else:
+            all_openie_info, chunk_keys_to_process = self.load_existing_openie([])
+
+            for openie_doc in all_openie_info:
+                if openie_doc['idx'] in chunk_ids_to_delete:
+                    triples_to_delete.append(openie_doc['extracted_triples'])
+                else:
+                    all_openie_info_with_deletes.append(openie_doc)
 
         triples_to_delete = flatten_facts(triples_to_delete)
 
@@ -544,7 +601,10 @@ class HippoRAG:
         logger.info(f"Deleting {len(triple_ids_to_delete)} Triples")
         logger.info(f"Deleting {len(filtered_ent_ids_to_delete)} Entities")
 
-        self.save_openie_results(all_openie_info_with_deletes)
+        if self.openie_store is not None:
+            self.openie_store.delete(chunk_ids_to_delete)
+        else:
+            self.save_openie_results(all_openie_info_with_deletes)
 
         self.entity_embedding_store.delete(filtered_ent_ids_to_delete)
         self.fact_embedding_store.delete(triple_ids_to_delete)
@@ -555,6 +615,7 @@ class HippoRAG:
         self.save_igraph()
 
         self.ready_to_retrieve = False
+        self.index_version += 1
 
     def retrieve(self,
                  queries: List[str],
@@ -586,6 +647,8 @@ class HippoRAG:
         Notes
         -----
         - Long queries with no relevant facts after reranking will default to results from dense passage retrieval.
+        - Repeated queries are only ranked once. With `retrieval_cache` enabled, results are also reused across calls
+          until `index` or `delete` changes the index.
         """
         retrieve_start_time = time.time()  # Record start time
 
@@ -598,32 +661,38 @@ class HippoRAG:
         if not self.ready_to_retrieve:
             self.prepare_retrieval_objects()
 
-        self.get_query_embeddings(queries)
-
-        retrieval_results = []
-
-        for q_idx, query in tqdm(enumerate(queries), desc="Retrieving", total=len(queries)):
-            rerank_start = time.time()
-            query_fact_scores = self.get_fact_scores(query)
-            top_k_fact_indices, top_k_facts, rerank_log = self.rerank_facts(query, query_fact_scores)
-            rerank_end = time.time()
-
-            self.rerank_time += rerank_end - rerank_start
-
-            if len(top_k_facts) == 0:
-                logger.info('No facts found after reranking, return DPR results')
-                sorted_doc_ids, sorted_doc_scores = self.dense_passage_retrieval(query)
+        # Identical queries are ranked once per call, and with the retrieval cache on, queries that only differ in
+        # whitespace share one result and queries already ranked against the current index are not ranked again.
+        if self.retrieval_cache is not None:
+            fingerprint = config_fingerprint(self.global_config)
+            query_keys = [(normalize_query(query), fingerprint, num_to_retrieve, self.index_version) for query in queries]
+        else:
+            query_keys = list(queries)
+
+        key_to_result, pending_queries = {}, {}
+        for query, key in zip(queries, query_keys):
+            if key in key_to_result or key in pending_queries:
+                continue
+            cached = self.retrieval_cache.get(key) if self.retrieval_cache is not None else None
+            if cached is None:
+                pending_queries[key] = query
             else:
-                sorted_doc_ids, sorted_doc_scores = self.graph_search_with_fact_entities(query=query,
-                                                                                         link_top_k=self.global_config.linking_top_k,
-                                                                                         query_fact_scores=query_fact_scores,
-                                                                                         top_k_facts=top_k_facts,
-                                                                                         top_k_fact_indices=top_k_fact_indices,
-                                                                                         passage_node_weight=self.global_config.passage_node_weight)
+                passage_ids, doc_scores = cached
+                key_to_result[key] = ([self.chunk_embedding_store.get_row(passage_id)["content"] for passage_id in passage_ids], doc_scores)
 
-            top_k_docs = [self.chunk_embedding_store.get_row(self.passage_node_keys[idx])["content"] for idx in sorted_doc_ids[:num_to_retrieve]]
+        if self.retrieval_cache is not None:
+            logger.info(f"Retrieval cache served {len(key_to_result)} of {len(dict.fromkeys(query_keys))} unique queries")
 
-            retrieval_results.append(QuerySolution(question=query, docs=top_k_docs, doc_scores=sorted_doc_scores[:num_to_retrieve]))
+        if len(pending_queries) > 0:
+            for key, query_solution in zip(pending_queries, self.rank_passages(list(pending_queries.values()), num_to_retrieve)):
+                key_to_result[key] = (query_solution.docs, query_solution.doc_scores)
+                if self.retrieval_cache is not None:
+                    self.retrieval_cache.put(key,
+                                             [self.chunk_embedding_store.text_to_hash_id[doc] for doc in query_solution.docs],
+                                             query_solution.doc_scores)
+
+        retrieval_results = [QuerySolution(question=query, docs=list(key_to_result[key][0]), doc_scores=np.array(key_to_result[key][1]))
+                             for query, key in zip(queries, query_keys)]
 
         retrieve_end_time = time.time()  # Record end time
 
@@ -644,6 +713,162 @@ class HippoRAG:
         else:
             return retrieval_results
 
+    def rank_passages(self, queries: List[str], num_to_retrieve: int) -> List[QuerySolution]:
+        """
+        Runs the retrieval pipeline of `retrieve` (fact scoring, recognition memory, dense passage scoring and graph
+        search) for every query, in batches of `retrieval_batch_size` queries if set, without consulting the
+        retrieval cache.
+
+        Returns:
+            List[QuerySolution]: The top `num_to_retrieve` passages of each query, in the order of `queries`.
+        """
+        self.get_query_embeddings(queries)
+
+        retrieval_results = []
+
+        batch_size = self.global_config.retrieval_batch_size
+        # The batched path scores every fact and passage in full precision, so it is skipped for quantized stores.
+        quantized = self.fact_embedding_store.quantized_index is not None or self.chunk_embedding_store.quantized_index is not None
+        if batch_size and self.global_config.retrieval_search_mode == 'exact' and not quantized:
+            pbar = tqdm(total=len(queries), desc="Retrieving")
+            for batch_start in range(0, len(queries), batch_size):
+                batch_queries = queries[batch_start:batch_start + batch_size]
+
+                rerank_start = time.time()
+                batch_fact_scores, batch_candidate_fact_indices = self.get_fact_scores_batch(batch_queries)
+                self.rerank_time += time.time() - rerank_start
+
+                batch_doc_scores = self.get_passage_scores_batch(batch_queries)
+
+                rerank_start = time.time()
+                rerank_results = self.rerank_facts_batch(batch_queries, batch_fact_scores,
+                                                         batch_candidate_fact_indices=batch_candidate_fact_indices)
+                self.rerank_time += time.time() - rerank_start
+
+                batch_top_k_fact_indices = [top_k_fact_indices for top_k_fact_indices, _, _ in rerank_results]
+                batch_top_k_facts = [top_k_facts for _, top_k_facts, _ in rerank_results]
+
+                retrieval_results.extend(self.search_passages_batch(queries=batch_queries,
+                                                                    num_to_retrieve=num_to_retrieve,
+                                                                    batch_fact_scores=batch_fact_scores,
+                                                                    batch_top_k_facts=batch_top_k_facts,
+                                                                    batch_top_k_fact_indices=batch_top_k_fact_indices,
+                                                                    batch_doc_scores=batch_doc_scores))
+                pbar.update(len(batch_queries))
+            pbar.close()
+        else:
+            # Facts are scored one query at a time, but filtered for `rerank_batch_size` queries at once so that
+            # the recognition memory requests run concurrently.
+            pbar = tqdm(total=len(queries), desc="Retrieving")
+            rerank_batch_size = max(1, self.global_config.rerank_batch_size)
+            for batch_start in range(0, len(queries), rerank_batch_size):
+                batch_queries = queries[batch_start:batch_start + rerank_batch_size]
+
+                rerank_start = time.time()
+                batch_fact_scores = [self.get_fact_scores(query) for query in batch_queries]
+                rerank_results = self.rerank_facts_batch(batch_queries, batch_fact_scores)
+                self.rerank_time += time.time() - rerank_start
+
+                for query, query_fact_scores, (top_k_fact_indices, top_k_facts, rerank_log) in zip(batch_queries, batch_fact_scores, rerank_results):
+                    retrieval_results.append(self.search_passages(query=query,
+                                                                  num_to_retrieve=num_to_retrieve,
+                                                                  query_fact_scores=query_fact_scores,
+                                                                  top_k_facts=top_k_facts,
+                                                                  top_k_fact_indices=top_k_fact_indices))
+                pbar.update(len(batch_queries))
+            pbar.close()
+
+        return retrieval_results
+
+    def search_passages(self,
+                        query: str,
+                        num_to_retrieve: int,
+                        query_fact_scores: np.ndarray,
+                        top_k_facts: List[Tuple],
+                        top_k_fact_indices: List[int],
+                        query_doc_scores: np.ndarray = None) -> QuerySolution:
+        """
+        Ranks passages for a single query once its facts have been reranked: runs graph search seeded by the
+        surviving facts, or falls back to dense passage retrieval if no fact survived the recognition memory.
+
+        Parameters:
+            query (str): The query string.
+            num_to_retrieve (int): The number of passages to return.
+            query_fact_scores (np.ndarray): Normalized query-fact similarity scores over all facts.
+            top_k_facts (List[Tuple]): Facts kept by the recognition memory.
+            top_k_fact_indices (List[int]): Indices of `top_k_facts` in `query_fact_scores`.
+            query_doc_scores (np.ndarray, optional): Precomputed query-passage similarities, e.g. one row of
+                `get_passage_scores_batch`. If None they are computed by `dense_passage_retrieval`.
+
+        Returns:
+            QuerySolution: The top `num_to_retrieve` passages and their scores.
+        """
+        if len(top_k_facts) == 0:
+            logger.info('No facts found after reranking, return DPR results')
+            sorted_doc_ids, sorted_doc_scores = self.dense_passage_retrieval(query,
+                                                                             query_doc_scores=query_doc_scores,
+                                                                             top_k=num_to_retrieve)
+        else:
+            sorted_doc_ids, sorted_doc_scores = self.graph_search_with_fact_entities(query=query,
+                                                                                     link_top_k=self.global_config.linking_top_k,
+                                                                                     query_fact_scores=query_fact_scores,
+                                                                                     top_k_facts=top_k_facts,
+                                                                                     top_k_fact_indices=top_k_fact_indices,
+                                                                                     passage_node_weight=self.global_config.passage_node_weight,
+                                                                                     query_doc_scores=query_doc_scores,
+                                                                                     top_k=num_to_retrieve)
+
+        top_k_docs = [self.chunk_embedding_store.get_row(self.passage_node_keys[idx])["content"] for idx in sorted_doc_ids]
+
+        return QuerySolution(question=query, docs=top_k_docs, doc_scores=sorted_doc_scores)
+
+    def search_passages_batch(self,
+                              queries: List[str],
+                              num_to_retrieve: int,
+                              batch_fact_scores: np.ndarray,
+                              batch_top_k_facts: List[List[Tuple]],
+                              batch_top_k_fact_indices: List[List[int]],
+                              batch_doc_scores: np.ndarray) -> List[QuerySolution]:
+        """
+        Batched counterpart of `search_passages`. The PPR reset vectors of all queries with surviving facts are
+        built first and ranked together by `run_ppr_batch`; the remaining queries fall back to dense passage
+        retrieval. Each argument holds one entry (or row) per query, see `search_passages`.
+
+        Returns:
+            List[QuerySolution]: The top `num_to_retrieve` passages of each query, in the order of `queries`.
+        """
+        retrieval_results = [None] * len(queries)
+        graph_query_idxs, batch_seed_weights = [], []
+
+        for i, query in enumerate(queries):
+            if len(batch_top_k_facts[i]) == 0:
+                retrieval_results[i] = self.search_passages(query=query,
+                                                            num_to_retrieve=num_to_retrieve,
+                                                            query_fact_scores=batch_fact_scores[i],
+                                                            top_k_facts=[],
+                                                            top_k_fact_indices=[],
+                                                            query_doc_scores=batch_doc_scores[i])
+            else:
+                graph_query_idxs.append(i)
+                batch_seed_weights.append(self.get_ppr_seed_weights(query=query,
+                                                                    link_top_k=self.global_config.linking_top_k,
+                                                                    query_fact_scores=batch_fact_scores[i],
+                                                                    top_k_facts=batch_top_k_facts[i],
+                                                                    top_k_fact_indices=batch_top_k_fact_indices[i],
+                                                                    passage_node_weight=self.global_config.passage_node_weight,
+                                                                    query_doc_scores=batch_doc_scores[i]))
+
+        if len(graph_query_idxs) > 0:
+            ppr_start = time.time()
+            ppr_results = self.run_ppr_seeds(batch_seed_weights, damping=self.global_config.damping, top_k=num_to_retrieve)
+            self.ppr_time += time.time() - ppr_start
+
+            for i, (sorted_doc_ids, sorted_doc_scores) in zip(graph_query_idxs, ppr_results):
+                top_k_docs = [self.chunk_embedding_store.get_row(self.passage_node_keys[idx])["content"] for idx in sorted_doc_ids]
+                retrieval_results[i] = QuerySolution(question=queries[i], docs=top_k_docs, doc_scores=sorted_doc_scores)
+
+        return retrieval_results
+
     def rag_qa(self,
                queries: List[str|QuerySolution],
                gold_docs: List[List[str]] = None,
@@ -763,13 +988,13 @@ class HippoRAG:
 
         for q_idx, query in tqdm(enumerate(queries), desc="Retrieving", total=len(queries)):
             logger.info('No facts found after reranking, return DPR results')
-            sorted_doc_ids, sorted_doc_scores = self.dense_passage_retrieval(query)
+            sorted_doc_ids, sorted_doc_scores = self.dense_passage_retrieval(query, top_k=num_to_retrieve)
 
             top_k_docs = [self.chunk_embedding_store.get_row(self.passage_node_keys[idx])["content"] for idx in
-                          sorted_doc_ids[:num_to_retrieve]]
+                          sorted_doc_ids]
 
             retrieval_results.append(
-                QuerySolution(question=query, docs=top_k_docs, doc_scores=sorted_doc_scores[:num_to_retrieve]))
+                QuerySolution(question=query, docs=top_k_docs, doc_scores=sorted_doc_scores))
 
         retrieve_end_time = time.time()  # Record end time
 
@@ -902,10 +1127,8 @@ class HippoRAG:
             all_qa_messages.append(
                 self.prompt_template_manager.render(name=f'rag_qa_{prompt_dataset_name}', prompt_user=prompt_user))
 
-        all_qa_results = [self.llm_model.infer(qa_messages) for qa_messages in tqdm(all_qa_messages, desc="QA Reading")]
-
-        all_response_message, all_metadata, all_cache_hit = zip(*all_qa_results)
-        all_response_message, all_metadata = list(all_response_message), list(all_metadata)
+        all_response_message, all_metadata, all_cache_hit = batch_qa_inference(
+            self.llm_model, all_qa_messages, max_workers=self.global_config.qa_max_workers)
 
         #Process responses and extract predicted answers.
         queries_solutions = []
@@ -951,7 +1174,7 @@ class HippoRAG:
             Does not explicitly raise exceptions within the provided function logic.
         """
 
-        if "name" in self.graph.vs:
+        if "name" in self.graph.vs.attribute_names():
             current_graph_nodes = set(self.graph.vs["name"])
         else:
             current_graph_nodes = set()
@@ -1027,9 +1250,11 @@ class HippoRAG:
         """
         Adds synonymy edges between similar nodes in the graph to enhance connectivity by identifying and linking synonym entities.
 
-        This method performs key operations to compute and add synonymy edges. It first retrieves embeddings for all nodes, then conducts
-        a nearest neighbor (KNN) search to find similar nodes. These similar nodes are identified based on a score threshold, and edges
-        are added to represent the synonym relationship.
+        This method performs key operations to compute and add synonymy edges. Only phrase nodes that are not in the graph yet are
+        used as KNN queries against all phrase nodes, so an incremental update costs time proportional to the number of new nodes.
+        Similar nodes are identified based on a score threshold, and edges are added in both directions: existing nodes are not
+        queried again, so the new node is added to their synonyms through the reverse edge. The synonyms of every node are persisted
+        next to the graph so that the per-node cap on synonymy edges still holds across incremental updates.
 
         Attributes:
             entity_id_to_row: dict (populated within the function). Maps each entity ID to its corresponding row data, where rows
@@ -1045,32 +1270,43 @@ class HippoRAG:
         self.entity_id_to_row = self.entity_embedding_store.get_all_id_to_rows()
         entity_node_keys = list(self.entity_id_to_row.keys())
 
-        logger.info(f"Performing KNN retrieval for each phrase nodes ({len(entity_node_keys)}).")
+        if "name" in self.graph.vs.attribute_names():
+            current_graph_nodes = set(self.graph.vs["name"])
+        else:
+            current_graph_nodes = set()
+
+        # Here we build synonymy edges only between newly inserted phrase nodes and all phrase nodes in the storage to reduce cost for incremental graph updates
+        new_entity_node_keys = [node_key for node_key in entity_node_keys if node_key not in current_graph_nodes]
+        new_entity_node_key_set = set(new_entity_node_keys)
+        synonymy_neighbors = self.load_synonymy_neighbors(current_graph_nodes)
+
+        logger.info(f"Performing KNN retrieval for each new phrase node ({len(new_entity_node_keys)} of {len(entity_node_keys)}).")
+
+        if len(new_entity_node_keys) == 0:
+            return
 
         entity_embs = self.entity_embedding_store.get_embeddings(entity_node_keys)
+        new_entity_embs = self.entity_embedding_store.get_embeddings(new_entity_node_keys)
 
-        # Here we build synonymy edges only between newly inserted phrase nodes and all phrase nodes in the storage to reduce cost for incremental graph updates
-        query_node_key2knn_node_keys = retrieve_knn(query_ids=entity_node_keys,
-                                                    key_ids=entity_node_keys,
-                                                    query_vecs=entity_embs,
-                                                    key_vecs=entity_embs,
-                                                    k=self.global_config.synonymy_edge_topk,
-                                                    query_batch_size=self.global_config.synonymy_edge_query_batch_size,
-                                                    key_batch_size=self.global_config.synonymy_edge_key_batch_size)
+        # At most 101 synonyms are kept per node below, so neighbours past the node itself and 101 others are never used.
+        knn_indices, knn_scores = knn_search(query_vecs=new_entity_embs,
+                                             key_vecs=entity_embs,
+                                             k=min(self.global_config.synonymy_edge_topk, 102),
+                                             query_batch_size=self.global_config.synonymy_edge_query_batch_size,
+                                             key_batch_size=self.global_config.synonymy_edge_key_batch_size)
 
         num_synonym_triple = 0
         synonym_candidates = []  # [(node key, [(synonym node key, corresponding score), ...]), ...]
 
-        for node_key in tqdm(query_node_key2knn_node_keys.keys(), total=len(query_node_key2knn_node_keys)):
+        for node_key, nn_indices, nn_scores in tqdm(zip(new_entity_node_keys, knn_indices.tolist(), knn_scores.tolist()), total=len(new_entity_node_keys)):
             synonyms = []
 
             entity = self.entity_id_to_row[node_key]["content"]
 
             if len(re.sub('[^A-Za-z0-9]', '', entity)) > 2:
-                nns = query_node_key2knn_node_keys[node_key]
-
                 num_nns = 0
-                for nn, score in zip(nns[0], nns[1]):
+                for nn_idx, score in zip(nn_indices, nn_scores):
+                    nn = entity_node_keys[nn_idx]
                     if score < self.global_config.synonymy_edge_sim_threshold or num_nns > 100:
                         break
 
@@ -1082,16 +1318,69 @@ class HippoRAG:
                         num_synonym_triple += 1
 
                         self.node_to_node_stats[sim_edge] = score  # Need to seriously discuss on this
+                        synonymy_neighbors.setdefault(node_key, {})[nn] = score
                         num_nns += 1
 
+                        # Reverse edge for existing nodes, as long as they have not reached the same cap as the query side.
+                        if (nn not in new_entity_node_key_set and len(re.sub('[^A-Za-z0-9]', '', nn_phrase)) > 2
+                                and len(synonymy_neighbors.get(nn, {})) <= 100):
+                            self.node_to_node_stats[(nn, node_key)] = score
+                            synonymy_neighbors.setdefault(nn, {})[node_key] = score
+
             synonym_candidates.append((node_key, synonyms))
 
+        self.save_synonymy_neighbors(synonymy_neighbors)
+
+    def load_synonymy_neighbors(self, current_graph_nodes: Set[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Loads the synonyms persisted by `add_synonymy_edges`, keeping only nodes that are still in the graph.
+
+        Parameters:
+            current_graph_nodes (Set[str]): Names of the nodes currently in the graph.
+
+        Returns:
+            Dict[str, Dict[str, float]]: For each phrase node key, its synonym node keys and their similarity scores.
+        """
+        if not os.path.exists(self._synonymy_neighbors_filename):
+            return {}
+
+        with open(self._synonymy_neighbors_filename, "rb") as f:
+            synonymy_neighbors = pickle.load(f)
+
+        return {node_key: {nn: score for nn, score in nns.items() if nn in current_graph_nodes}
+                for node_key, nns in synonymy_neighbors.items() if node_key in current_graph_nodes}
+
+    def save_synonymy_neighbors(self, synonymy_neighbors: Dict[str, Dict[str, float]]):
+        tmp_filename = self._synonymy_neighbors_filename + ".tmp"
+        with open(tmp_filename, "wb") as f:
+            pickle.dump(synonymy_neighbors, f)
+        os.replace(tmp_filename, self._synonymy_neighbors_filename)
+
+    def get_chunks_to_index(self) -> Dict[str, dict]:
+        """
+        Returns the chunk rows (as in `EmbeddingStore.get_all_id_to_rows`) whose OpenIE results `index` processes.
+
+        These are all chunks with the JSON OpenIE store. With the 'sqlite' store, chunks that already are graph
+        nodes are left out: `add_fact_edges` and `add_passage_edges` skip them and their entities and facts are
+        already encoded, so their OpenIE results do not need to be read.
+        """
+        chunk_to_rows = self.chunk_embedding_store.get_all_id_to_rows()
+        if self.openie_store is None:
+            return chunk_to_rows
+
+        if "name" in self.graph.vs.attribute_names():
+            current_graph_nodes = set(self.graph.vs["name"])
+        else:
+            current_graph_nodes = set()
+        return {chunk_key: row for chunk_key, row in chunk_to_rows.items() if chunk_key not in current_graph_nodes}
+
     def load_existing_openie(self, chunk_keys: List[str]) -> Tuple[List[dict], Set[str]]:
         """
         Loads existing OpenIE results from the specified file if it exists and combines
         them with new content while standardizing indices. If the file does not exist or
         is configured to be re-initialized from scratch with the flag `force_openie_from_scratch`,
-        it prepares new entries for processing.
+        it prepares new entries for processing. With the 'sqlite' OpenIE store, only the results
+        of the given chunks are loaded.
 
         Args:
             chunk_keys (List[str]): A list of chunk keys that represent identifiers
@@ -1104,6 +1393,15 @@ class HippoRAG:
                                          be saved or processed.
         """
 
+        if self.openie_store is not None:
+            if self.global_config.force_openie_from_scratch:
+                return [], chunk_keys
+
+            chunk_keys = list(chunk_keys)
+            all_openie_info = self.openie_store.get(chunk_keys)
+            existing_openie_keys = set([info['idx'] for info in all_openie_info])
+            return all_openie_info, set([chunk_key for chunk_key in chunk_keys if chunk_key not in existing_openie_keys])
+
         # combine openie_results with contents already in file, if file exists
         chunk_keys_to_save = set()
 
@@ -1182,6 +1480,14 @@ class HippoRAG:
                 extracted entities.
         """
 
+        if self.openie_store is not None:
+            # Only the chunks that are not stored yet (or all given ones when rebuilding from scratch) are written.
+            if not self.global_config.force_openie_from_scratch:
+                existing_openie_keys = self.openie_store.existing_keys([chunk['idx'] for chunk in all_openie_info])
+                all_openie_info = [chunk for chunk in all_openie_info if chunk['idx'] not in existing_openie_keys]
+            self.openie_store.upsert(all_openie_info)
+            return
+
         sum_phrase_chars = sum([len(e) for chunk in all_openie_info for e in chunk['extracted_entities']])
         sum_phrase_words = sum([len(e.split()) for chunk in all_openie_info for e in chunk['extracted_entities']])
         num_phrases = sum([len(chunk['extracted_entities']) for chunk in all_openie_info])
@@ -1355,8 +1661,6 @@ class HippoRAG:
         logger.info("Preparing for fast retrieval.")
 
         logger.info("Loading keys.")
-        self.query_to_embedding: Dict = {'triple': {}, 'passage': {}}
-
         self.entity_node_keys: List = list(self.entity_embedding_store.get_all_ids()) # a list of phrase node keys
         self.passage_node_keys: List = list(self.chunk_embedding_store.get_all_ids()) # a list of passage node keys
         self.fact_node_keys: List = list(self.fact_embedding_store.get_all_ids())
@@ -1400,91 +1704,261 @@ class HippoRAG:
             self.entity_node_idxs = []
             self.passage_node_idxs = []
 
+        self.num_vertices = self.graph.vcount()
+        self.passage_vertex_idxs = np.asarray(self.passage_node_idxs, dtype=np.int64) # passage position -> vertex index
+        self.entity_text_to_vertex_idx = {self.entity_embedding_store.get_row(node_key)["content"]: vertex_idx
+                                          for node_key, vertex_idx in zip(self.entity_node_keys, self.entity_node_idxs)}
+
         logger.info("Loading embeddings.")
-        self.entity_embeddings = np.array(self.entity_embedding_store.get_embeddings(self.entity_node_keys))
-        self.passage_embeddings = np.array(self.chunk_embedding_store.get_embeddings(self.passage_node_keys))
+        self.entity_embeddings = np.asarray(self.entity_embedding_store.get_embeddings(self.entity_node_keys))
+        # Quantized stores shortlist candidates from their codes and only rescore a few rows, so their vectors are
+        # kept in the stored dtype (e.g. memory-mapped float16) instead of being copied to float32.
+        passage_dtype = self.chunk_embedding_store.embeddings.dtype if self.chunk_embedding_store.quantized_index is not None else np.float32
+        self.passage_embeddings = np.asarray(self.chunk_embedding_store.get_embeddings(self.passage_node_keys, dtype=passage_dtype))
 
-        self.fact_embeddings = np.array(self.fact_embedding_store.get_embeddings(self.fact_node_keys))
+        fact_dtype = self.fact_embedding_store.embeddings.dtype if self.fact_embedding_store.quantized_index is not None else np.float32
+        self.fact_embeddings = np.asarray(self.fact_embedding_store.get_embeddings(self.fact_node_keys, dtype=fact_dtype))
 
-        all_openie_info, chunk_keys_to_process = self.load_existing_openie([])
+        self.load_graph_state()
 
-        self.proc_triples_to_docs = {}
+        # Number of passages mentioning each entity vertex (1 for other vertices), dividing the fact scores of phrases.
+        self.vertex_chunk_counts = np.ones(self.num_vertices)
+        if isinstance(self.ent_node_to_chunk_ids, CSRMapping):
+            chunk_counts = self.ent_node_to_chunk_ids.value_counts()
+        else:
+            chunk_counts = {node_key: len(chunk_ids) for node_key, chunk_ids in self.ent_node_to_chunk_ids.items()}
+        for node_key, chunk_count in chunk_counts.items():
+            vertex_idx = self.node_name_to_vertex_idx.get(node_key, None)
+            if vertex_idx is not None and chunk_count > 0:
+                self.vertex_chunk_counts[vertex_idx] = chunk_count
 
-        for doc in all_openie_info:
-            triples = flatten_facts([doc['extracted_triples']])
-            for triple in triples:
-                if len(triple) == 3:
-                    proc_triple = tuple(text_processing(list(triple)))
-                    self.proc_triples_to_docs[str(proc_triple)] = self.proc_triples_to_docs.get(str(proc_triple), set()).union(set([doc['idx']]))
-
-        if self.ent_node_to_chunk_ids is None:
-            ner_results_dict, triple_results_dict = reformat_openie_results(all_openie_info)
-
-            # Check if the lengths match
-            if not (len(self.passage_node_keys) == len(ner_results_dict) == len(triple_results_dict)):
-                logger.warning(f"Length mismatch: passage_node_keys={len(self.passage_node_keys)}, ner_results_dict={len(ner_results_dict)}, triple_results_dict={len(triple_results_dict)}")
-                
-                # If there are missing keys, create empty entries for them
-                for chunk_id in self.passage_node_keys:
-                    if chunk_id not in ner_results_dict:
-                        ner_results_dict[chunk_id] = NerRawOutput(
-                            chunk_id=chunk_id,
-                            response=None,
-                            metadata={},
-                            unique_entities=[]
-                        )
-                    if chunk_id not in triple_results_dict:
-                        triple_results_dict[chunk_id] = TripleRawOutput(
-                            chunk_id=chunk_id,
-                            response=None,
-                            metadata={},
-                            triples=[]
-                        )
-
-            # prepare data_store
-            chunk_triples = [[text_processing(t) for t in triple_results_dict[chunk_id].triples] for chunk_id in self.passage_node_keys]
-
-            self.node_to_node_stats = {}
-            self.ent_node_to_chunk_ids = {}
-            self.add_fact_edges(self.passage_node_keys, chunk_triples)
+        self.ppr_engine = self.build_ppr_engine(self.graph)
 
         self.ready_to_retrieve = True
 
-    def get_query_embeddings(self, queries: List[str] | List[QuerySolution]):
+    def build_ppr_engine(self, graph) -> Optional[Union[SparsePPR, PushPPR]]:
+        """
+        Builds the PPR engine selected by `ppr_engine` over `graph`, an igraph graph or its weighted adjacency
+        matrix. Returns None for 'igraph', in which case `run_ppr` calls igraph directly.
+        """
+        if self.global_config.ppr_engine == 'sparse':
+            return SparsePPR(graph,
+                             tol=self.global_config.ppr_tol,
+                             max_iter=self.global_config.ppr_max_iter)
+        elif self.global_config.ppr_engine == 'push':
+            return PushPPR(graph,
+                           prior_nodes=self.passage_node_idxs,
+                           epsilon=self.global_config.ppr_push_epsilon)
+        return None
+
+    def export_snapshot(self, path: str):
+        """
+        Exports everything retrieval needs (embeddings, graph, id tables and chunk texts) into a read-only
+        directory of memory-mappable arrays, see `snapshot.write_snapshot`. Open it with `HippoRAG.from_snapshot`.
+
+        Parameters:
+            path (str): Snapshot directory, replaced if it already exists.
+        """
+        if not self.ready_to_retrieve:
+            self.prepare_retrieval_objects()
+
+        write_snapshot(path, self)
+
+    @classmethod
+    def from_snapshot(cls, path: str, global_config: BaseConfig = None) -> "HippoRAG":
+        """
+        Creates a HippoRAG instance that is ready to retrieve and answer queries from a snapshot written by
+        `export_snapshot`, without loading the embedding stores, the pickled graph or the OpenIE results.
+
+        Embeddings are memory-mapped, so several serving processes opened on the same snapshot share one copy
+        through the page cache. The instance is read-only: `index`, `index_with_tables` and `delete` raise a
+        RuntimeError.
+
+        Parameters:
+            path (str): Snapshot directory.
+            global_config (BaseConfig): Configuration of the instance, e.g. to pick another LLM or PPR engine.
+                Defaults to the configuration the snapshot was exported with.
+
+        Returns:
+            HippoRAG: The serving instance.
+        """
+        snapshot = read_snapshot(path)
+        if global_config is None:
+            global_config = BaseConfig(**snapshot["manifest"]["config"])
+
+        self = cls.__new__(cls)
+        self.global_config = global_config
+        self.working_dir = path
+        self._read_only = True
+        self.openie_results_path = None
+        self.openie_store = None
+        self.openie = self.table_extractor = self.table_to_text_converter = None
+
+        self.llm_model: BaseLLM = _get_llm_class(self.global_config)
+        self.embedding_model: BaseEmbeddingModel = _get_embedding_model_class(
+            embedding_model_name=self.global_config.embedding_model_name)(global_config=self.global_config,
+                                                                          embedding_model_name=self.global_config.embedding_model_name)
+        self.prompt_template_manager = PromptTemplateManager(role_mapping={"system": "system", "user": "user", "assistant": "assistant"})
+        self.rerank_filter: BaseReranker = _get_reranker(self)
+
+        self.ppr_time = 0
+        self.rerank_time = 0
+        self.all_retrieval_time = 0
+        self.ent_node_to_chunk_ids = None
+        self.init_query_embedding_cache()
+        self.init_retrieval_cache()
+
+        self.chunk_embedding_store = snapshot["chunk"]
+        self.entity_embedding_store = snapshot["entity"]
+        self.fact_embedding_store = snapshot["fact"]
+        if self.global_config.retrieval_search_mode == "ann":
+            for store in [self.chunk_embedding_store, self.entity_embedding_store, self.fact_embedding_store]:
+                store.attach_ann_index(IVFIndex(store.filename + ".ivf.npz",
+                                                nlist=self.global_config.ann_nlist,
+                                                nprobe=self.global_config.ann_nprobe))
+        for namespace, store in [("chunk", self.chunk_embedding_store), ("fact", self.fact_embedding_store)]:
+            quantized_index = _get_quantized_index(self.global_config, namespace)
+            if quantized_index is not None:
+                store.attach_quantized_index(quantized_index)
+
+        self.entity_node_keys: List = self.entity_embedding_store.get_all_ids()
+        self.passage_node_keys: List = self.chunk_embedding_store.get_all_ids()
+        self.fact_node_keys: List = self.fact_embedding_store.get_all_ids()
+        self.entity_node_idxs = snapshot["entity_vertex_idxs"].tolist()
+        self.passage_node_idxs = snapshot["passage_vertex_idxs"].tolist()
+
+        self.num_vertices = snapshot["manifest"]["num_vertices"]
+        self.passage_vertex_idxs = snapshot["passage_vertex_idxs"]
+        self.vertex_chunk_counts = snapshot["vertex_chunk_counts"]
+        self.entity_text_to_vertex_idx = dict(zip(self.entity_embedding_store.texts.tolist(), self.entity_node_idxs))
+
+        self.entity_embeddings = np.asarray(self.entity_embedding_store.embeddings)
+        self.passage_embeddings = np.asarray(self.chunk_embedding_store.embeddings)
+        self.fact_embeddings = np.asarray(self.fact_embedding_store.embeddings)
+
+        self.ppr_engine = self.build_ppr_engine(snapshot["adjacency"])
+        if self.ppr_engine is None:
+            # igraph's solver needs the graph object itself, rebuilt from the adjacency matrix.
+            self.graph = adjacency_to_graph(snapshot["adjacency"])
+            self.graph.vs["name"] = snapshot["vertex_names"].tolist()
+        else:
+            self.graph = None
+
+        self.ready_to_retrieve = True
+        logger.info(f"Loaded snapshot from {path} with {self.num_vertices} vertices")
+        return self
+
+    def load_graph_state(self):
+        """
+        Loads `ent_node_to_chunk_ids` and `proc_triples_to_docs`, the chunks mentioning each entity node and each
+        processed triple, from `graph_state.npz` in the working directory.
+
+        The file is tagged with a fingerprint of the OpenIE results (file or store) and of the number of passages, so
+        it is only used while neither changed since it was written; otherwise both mappings are derived from the
+        OpenIE results in a single pass and the file is rewritten. Without OpenIE results on disk, the mappings built in this process
+        by `index` are kept.
+        """
+        if self.global_config.force_openie_from_scratch or (self.openie_store is None and not os.path.isfile(self.openie_results_path)):
+            if self.ent_node_to_chunk_ids is None:
+                self.ent_node_to_chunk_ids = {}
+            self.proc_triples_to_docs = {}
+            return
+
+        if self.openie_store is not None:
+            fingerprint = f"sqlite-{self.openie_store.generation}-{len(self.passage_node_keys)}"
+        else:
+            openie_stat = os.stat(self.openie_results_path)
+            fingerprint = f"{openie_stat.st_size}-{openie_stat.st_mtime_ns}-{len(self.passage_node_keys)}"
+
+        graph_state = load_graph_state(self._graph_state_filename, fingerprint)
+        if graph_state is not None:
+            logger.info(f"Loaded graph state from {self._graph_state_filename}")
+            self.ent_node_to_chunk_ids, self.proc_triples_to_docs = graph_state
+            return
+
+        logger.info("Building graph state from OpenIE results.")
+        if self.openie_store is not None:
+            all_openie_info = self.openie_store.iter_docs()
+        else:
+            all_openie_info, _ = self.load_existing_openie([])
+        passage_node_keys = set(self.passage_node_keys)
+
+        ent_node_to_chunk_ids = defaultdict(set)
+        proc_triples_to_docs = defaultdict(set)
+        for doc in all_openie_info:
+            chunk_key = doc['idx']
+            for triple in filter_invalid_triples(doc['extracted_triples']):
+                proc_triple = tuple(text_processing(triple))
+                proc_triples_to_docs[str(proc_triple)].add(chunk_key)
+
+                if chunk_key in passage_node_keys:
+                    ent_node_to_chunk_ids[compute_mdhash_id(content=proc_triple[0], prefix="entity-")].add(chunk_key)
+                    ent_node_to_chunk_ids[compute_mdhash_id(content=proc_triple[2], prefix="entity-")].add(chunk_key)
+
+        self.ent_node_to_chunk_ids = dict(ent_node_to_chunk_ids)
+        self.proc_triples_to_docs = dict(proc_triples_to_docs)
+        save_graph_state(self._graph_state_filename, fingerprint, self.ent_node_to_chunk_ids, self.proc_triples_to_docs)
+
+    def init_query_embedding_cache(self):
+        """
+        Creates the `QueryEmbeddingCache` of this instance and exposes it as `self.query_to_embedding`, whose 'triple'
+        and 'passage' slots hold the query embeddings for the query_to_fact and query_to_passage instructions. If the
+        embedding model gives both instructions the same cache key (see `BaseEmbeddingModel.instruction_cache_key`),
+        the slots share their entries and every query is only encoded once.
+        """
+        self.query_embedding_cache = QueryEmbeddingCache(self.global_config.embedding_model_name,
+                                                         max_size=self.global_config.query_embedding_cache_size,
+                                                         filename=self.global_config.query_embedding_cache_path)
+        self.query_to_embedding: Dict = {}
+        for slot, instruction_name in QUERY_EMBEDDING_SLOTS.items():
+            instruction = get_query_instruction(instruction_name)
+            if self.embedding_model is not None:
+                instruction = self.embedding_model.instruction_cache_key(instruction)
+            self.query_to_embedding[slot] = self.query_embedding_cache.view(instruction)
+
+    def init_retrieval_cache(self):
+        """
+        Resets the index version and creates the `RetrievalResultCache` used by `retrieve` if `retrieval_cache` is
+        enabled. `index` and `delete` bump `self.index_version`, which is part of every cache key.
+        """
+        self.index_version = 0
+        self.retrieval_cache = None
+        if self.global_config.retrieval_cache:
+            self.retrieval_cache = RetrievalResultCache(max_size=self.global_config.retrieval_cache_size,
+                                                        ttl=self.global_config.retrieval_cache_ttl)
+
+    def get_query_embeddings(self, queries: List[str] | List[QuerySolution]) -> Dict[str, Dict[str, np.ndarray]]:
         """
-        Retrieves embeddings for given queries and updates the internal query-to-embedding mapping. The method determines whether each query
-        is already present in the `self.query_to_embedding` dictionary under the keys 'triple' and 'passage'. If a query is not present in
-        either, it is encoded into embeddings using the embedding model and stored.
+        Retrieves embeddings for given queries and updates the internal query-to-embedding mapping. For the 'triple'
+        and 'passage' slots of `self.query_to_embedding`, the cached embeddings of the queries are looked up in one
+        batch and the missing ones are encoded with the slot's instruction. Slots sharing a cache key are filled by
+        the same encoding pass.
 
         Args:
             queries List[str] | List[QuerySolution]: A list of query strings or QuerySolution objects. Each query is checked for
             its presence in the query-to-embedding mappings.
+
+        Returns:
+            Dict[str, Dict[str, np.ndarray]]: For each slot, the embeddings of the given queries. Unlike the cache, these
+            are complete even if `query_embedding_cache_size` is smaller than the number of queries.
         """
+        all_query_strings = list(dict.fromkeys(query.question if isinstance(query, QuerySolution) else query for query in queries))
+
+        query_embeddings = {}
+        for slot, instruction_name in QUERY_EMBEDDING_SLOTS.items():
+            query_embeddings[slot] = self.query_to_embedding[slot].get_many(all_query_strings)
+            missing_queries = [query for query in all_query_strings if query not in query_embeddings[slot]]
+            if not missing_queries:
+                continue
+
+            logger.info(f"Encoding {len(missing_queries)} queries for {instruction_name}.")
+            embeddings = np.asarray(self.embedding_model.batch_encode(missing_queries,
+                                                                      instruction=get_query_instruction(instruction_name),
+                                                                      norm=True), dtype=np.float32)
+            self.query_to_embedding[slot].update(zip(missing_queries, embeddings))
+            query_embeddings[slot].update(zip(missing_queries, embeddings))
 
-        all_query_strings = []
-        for query in queries:
-            if isinstance(query, QuerySolution) and (
-                    query.question not in self.query_to_embedding['triple'] or query.question not in
-                    self.query_to_embedding['passage']):
-                all_query_strings.append(query.question)
-            elif query not in self.query_to_embedding['triple'] or query not in self.query_to_embedding['passage']:
-                all_query_strings.append(query)
-
-        if len(all_query_strings) > 0:
-            # get all query embeddings
-            logger.info(f"Encoding {len(all_query_strings)} queries for query_to_fact.")
-            query_embeddings_for_triple = self.embedding_model.batch_encode(all_query_strings,
-                                                                            instruction=get_query_instruction('query_to_fact'),
-                                                                            norm=True)
-            for query, embedding in zip(all_query_strings, query_embeddings_for_triple):
-                self.query_to_embedding['triple'][query] = embedding
-
-            logger.info(f"Encoding {len(all_query_strings)} queries for query_to_passage.")
-            query_embeddings_for_passage = self.embedding_model.batch_encode(all_query_strings,
-                                                                             instruction=get_query_instruction('query_to_passage'),
-                                                                             norm=True)
-            for query, embedding in zip(all_query_strings, query_embeddings_for_passage):
-                self.query_to_embedding['passage'][query] = embedding
+        return query_embeddings
 
     def get_fact_scores(self, query: str) -> np.ndarray:
         """
@@ -1517,6 +1991,12 @@ class HippoRAG:
             logger.warning("No facts available for scoring. Returning empty array.")
             return np.array([])
             
+        if self.global_config.retrieval_search_mode == 'ann' or self.fact_embedding_store.quantized_index is not None:
+            candidate_indices, candidate_scores = self.ann_search(self.fact_embedding_store, self.fact_embeddings, query_embedding)
+            query_fact_scores = np.zeros(len(self.fact_embeddings))
+            query_fact_scores[candidate_indices] = candidate_scores
+            return query_fact_scores
+
         try:
             query_fact_scores = np.dot(self.fact_embeddings, query_embedding.T) # shape: (#facts, )
             query_fact_scores = np.squeeze(query_fact_scores) if query_fact_scores.ndim == 2 else query_fact_scores
@@ -1526,7 +2006,76 @@ class HippoRAG:
             logger.error(f"Error computing fact scores: {str(e)}")
             return np.array([])
 
-    def dense_passage_retrieval(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+    def get_fact_scores_batch(self, queries: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batched counterpart of `get_fact_scores`: scores all given queries against every fact embedding with a
+        single matrix multiply and selects each query's `linking_top_k` candidate facts with a partial sort.
+
+        Parameters:
+            queries (List[str]): Queries whose embeddings were already computed by `get_query_embeddings`.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]:
+                - A (#queries, #facts) matrix of query-fact scores, min-max normalized per query.
+                - A (#queries, k) matrix of candidate fact indices per query, sorted by descending score.
+        """
+        # Looked up again rather than read from `self.query_to_embedding`, as they may have been evicted from the cache.
+        embeddings = self.get_query_embeddings(queries)['triple']
+        query_embeddings = np.stack([np.ravel(embeddings[query]) for query in queries]).astype(np.float32)
+
+        if len(self.fact_embeddings) == 0:
+            logger.warning("No facts available for scoring. Returning empty array.")
+            return np.zeros((len(queries), 0)), np.zeros((len(queries), 0), dtype=np.int64)
+
+        query_fact_scores = min_max_normalize(query_embeddings @ self.fact_embeddings.T, axis=1)  # shape: (#queries, #facts)
+
+        candidate_fact_indices = top_k_indices(query_fact_scores, self.global_config.linking_top_k, axis=1)
+
+        return query_fact_scores, candidate_fact_indices
+
+    def get_passage_scores_batch(self, queries: List[str]) -> np.ndarray:
+        """
+        Scores all given queries against every passage embedding with a single matrix multiply.
+
+        Parameters:
+            queries (List[str]): Queries whose embeddings were already computed by `get_query_embeddings`.
+
+        Returns:
+            np.ndarray: A (#queries, #passages) matrix of raw query-passage similarities, to be passed row by
+            row to `dense_passage_retrieval` as `query_doc_scores`.
+        """
+        embeddings = self.get_query_embeddings(queries)['passage']
+        query_embeddings = np.stack([np.ravel(embeddings[query]) for query in queries]).astype(np.float32)
+        return query_embeddings @ self.passage_embeddings.T
+
+    def get_passage_scores(self, query: str, query_doc_scores: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Computes the normalized similarity between a query and the passages, without ranking them.
+
+        Parameters:
+            query (str): The input query.
+            query_doc_scores (np.ndarray, optional): Precomputed similarities between the query and every
+                passage (e.g. a row of `get_passage_scores_batch`). If given, the query embedding is not looked up.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Passage indices and their min-max normalized scores, in no particular
+            order. Covers every passage with exact search and only the ANN candidates with approximate search.
+        """
+        if query_doc_scores is None:
+            query_embedding = self.query_to_embedding['passage'].get(query, None)
+            if query_embedding is None:
+                query_embedding = self.embedding_model.batch_encode(query,
+                                                                    instruction=get_query_instruction('query_to_passage'),
+                                                                    norm=True)
+            if self.global_config.retrieval_search_mode == 'ann' or self.chunk_embedding_store.quantized_index is not None:
+                return self.ann_search(self.chunk_embedding_store, self.passage_embeddings, query_embedding)
+
+            query_doc_scores = np.dot(self.passage_embeddings, query_embedding.T)
+            query_doc_scores = np.squeeze(query_doc_scores) if query_doc_scores.ndim == 2 else query_doc_scores
+
+        return np.arange(len(query_doc_scores)), min_max_normalize(query_doc_scores)
+
+    def dense_passage_retrieval(self, query: str, query_doc_scores: np.ndarray = None, top_k: int = None) -> Tuple[np.ndarray, np.ndarray]:
         """
         Conduct dense passage retrieval to find relevant documents for a query.
 
@@ -1541,6 +2090,12 @@ class HippoRAG:
         ----------
         query : str
             The input query for which relevant passages should be retrieved.
+        query_doc_scores : np.ndarray, optional
+            Precomputed similarities between the query and every passage (e.g. a row of
+            `get_passage_scores_batch`). If given, the query embedding is not looked up.
+        top_k : int, optional
+            Number of top-ranked passages to return. Only these are sorted; if None, every
+            passage is ranked.
 
         Returns
         -------
@@ -1550,65 +2105,144 @@ class HippoRAG:
             - A numpy array of the normalized similarity scores for the corresponding
               documents.
         """
-        query_embedding = self.query_to_embedding['passage'].get(query, None)
-        if query_embedding is None:
-            query_embedding = self.embedding_model.batch_encode(query,
-                                                                instruction=get_query_instruction('query_to_passage'),
-                                                                norm=True)
-        query_doc_scores = np.dot(self.passage_embeddings, query_embedding.T)
-        query_doc_scores = np.squeeze(query_doc_scores) if query_doc_scores.ndim == 2 else query_doc_scores
-        query_doc_scores = min_max_normalize(query_doc_scores)
+        doc_ids, doc_scores = self.get_passage_scores(query, query_doc_scores=query_doc_scores)
 
-        sorted_doc_ids = np.argsort(query_doc_scores)[::-1]
-        sorted_doc_scores = query_doc_scores[sorted_doc_ids.tolist()]
-        return sorted_doc_ids, sorted_doc_scores
+        top = top_k_indices(doc_scores, top_k)
+        return doc_ids[top], doc_scores[top]
+
+    def ann_search(self, store: EmbeddingStore, embeddings: np.ndarray, query_embedding: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores a query against the candidates returned by the ANN index attached to `store` instead of
+        every row of `embeddings`. Only used when `retrieval_search_mode` is set to 'ann', or when the store
+        has a `quantized_index`, whose shortlist is rescored with `embeddings`.
 
+        Parameters:
+            store (EmbeddingStore): The store whose `ann_index` or `quantized_index` is searched.
+            embeddings (np.ndarray): The store's embeddings, in the same row order as the store.
+            query_embedding (np.ndarray): The query embedding.
 
-    def get_top_k_weights(self,
-                          link_top_k: int,
-                          all_phrase_weights: np.ndarray,
-                          linking_score_map: Dict[str, float]) -> Tuple[np.ndarray, Dict[str, float]]:
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row indices of the `ann_top_k` (or `quantization_rescore_k`) candidates
+            sorted by descending similarity and their similarity scores, min-max normalized over the candidates.
         """
-        This function filters the all_phrase_weights to retain only the weights for the
-        top-ranked phrases in terms of the linking_score_map. It also filters linking scores
-        to retain only the top `link_top_k` ranked nodes. Non-selected phrases in phrase
-        weights are reset to a weight of 0.0.
+        if store.ann_index is not None:
+            candidate_indices, candidate_scores = store.ann_index.search(embeddings, query_embedding, self.global_config.ann_top_k)
+        else:
+            candidate_indices, candidate_scores = store.quantized_index.search(embeddings, query_embedding,
+                                                                               self.global_config.quantization_rescore_k)
+        valid = candidate_indices[0] >= 0
+        return candidate_indices[0][valid], min_max_normalize(candidate_scores[0][valid].astype(np.float64))
+
+    @staticmethod
+    def get_top_k_weights(link_top_k: int,
+                          phrase_ids: np.ndarray,
+                          phrase_weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        This function retains only the top `link_top_k` phrases in terms of their weights; the other phrases
+        are dropped, which amounts to resetting their weight to 0.0.
+
+        Only the linked phrases are looked at, so the cost depends on their number and not on the size of
+        the graph.
 
         Args:
-            link_top_k (int): Number of top-ranked nodes to retain in the linking score map.
-            all_phrase_weights (np.ndarray): An array representing the phrase weights, indexed
-                by phrase ID.
-            linking_score_map (Dict[str, float]): A mapping of phrase content to its linking
-                score, sorted in descending order of scores.
+            link_top_k (int): Number of top-ranked phrases to retain.
+            phrase_ids (np.ndarray): Vertex indices of the linked phrases.
+            phrase_weights (np.ndarray): Weights of the linked phrases, aligned with `phrase_ids`.
 
         Returns:
-            Tuple[np.ndarray, Dict[str, float]]: A tuple containing the filtered array
-            of all_phrase_weights with unselected weights set to 0.0, and the filtered
-            linking_score_map containing only the top `link_top_k` phrases.
+            Tuple[np.ndarray, np.ndarray]: The vertex indices and weights of the retained phrases, sorted by
+            descending weight.
         """
-        # choose top ranked nodes in linking_score_map
-        linking_score_map = dict(sorted(linking_score_map.items(), key=lambda x: x[1], reverse=True)[:link_top_k])
+        top = top_k_indices(phrase_weights, link_top_k)
+        return phrase_ids[top], phrase_weights[top]
+
+    def get_ppr_seed_weights(self, query: str,
+                             link_top_k: int,
+                             query_fact_scores: np.ndarray,
+                             top_k_facts: List[Tuple],
+                             top_k_fact_indices: List[str],
+                             passage_node_weight: float = 0.05,
+                             query_doc_scores: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Builds the nonzero entries of the PPR reset vector of a query: phrase nodes are weighted by the scores of
+        the selected facts that mention them and passage nodes by their dense retrieval scores scaled by
+        `passage_node_weight`. See `graph_search_with_fact_entities` for the parameters.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The vertex indices and weights of the phrase
+            nodes, followed by the vertex indices and weights of the passage nodes.
+        """
+
+        #Assigning phrase weights based on selected facts from previous steps.
+        linked_phrase_ids, linked_fact_scores = [], []
+        for rank, f in enumerate(top_k_facts):
+            fact_score = query_fact_scores[
+                top_k_fact_indices[rank]] if query_fact_scores.ndim > 0 else query_fact_scores
 
-        # only keep the top_k phrases in all_phrase_weights
-        top_k_phrases = set(linking_score_map.keys())
-        top_k_phrases_keys = set(
-            [compute_mdhash_id(content=top_k_phrase, prefix="entity-") for top_k_phrase in top_k_phrases])
+            for phrase in [f[0].lower(), f[2].lower()]:
+                phrase_id = self.entity_text_to_vertex_idx.get(phrase, None)
 
-        for phrase_key in self.node_name_to_vertex_idx:
-            if phrase_key not in top_k_phrases_keys:
-                phrase_id = self.node_name_to_vertex_idx.get(phrase_key, None)
                 if phrase_id is not None:
-                    all_phrase_weights[phrase_id] = 0.0
+                    linked_phrase_ids.append(phrase_id)
+                    linked_fact_scores.append(fact_score)
 
-        assert np.count_nonzero(all_phrase_weights) == len(linking_score_map.keys())
-        return all_phrase_weights, linking_score_map
+        # average fact score for each phrase, scaled down by the number of chunks the phrase occurs in
+        phrase_ids, occurrences = np.unique(np.asarray(linked_phrase_ids, dtype=np.int64), return_inverse=True)
+        phrase_weights = (np.bincount(occurrences, weights=np.asarray(linked_fact_scores, dtype=np.float64), minlength=len(phrase_ids))
+                          / np.bincount(occurrences, minlength=len(phrase_ids))
+                          / self.vertex_chunk_counts[phrase_ids])
+
+        if link_top_k:
+            phrase_ids, phrase_weights = self.get_top_k_weights(link_top_k, phrase_ids, phrase_weights)
+
+        #Get passage scores according to chosen dense retrieval model
+        dpr_doc_ids, dpr_doc_scores = self.get_passage_scores(query, query_doc_scores=query_doc_scores)
+        dpr_doc_weights = min_max_normalize(dpr_doc_scores) * passage_node_weight
+
+        assert phrase_weights.sum() + dpr_doc_weights.sum() > 0, f'No phrases found in the graph for the given facts: {top_k_facts}'
+
+        return phrase_ids, phrase_weights, self.passage_vertex_idxs[dpr_doc_ids], dpr_doc_weights
+
+    def get_ppr_node_weights(self, query: str,
+                             link_top_k: int,
+                             query_fact_scores: np.ndarray,
+                             top_k_facts: List[Tuple],
+                             top_k_fact_indices: List[str],
+                             passage_node_weight: float = 0.05,
+                             query_doc_scores: np.ndarray = None) -> np.ndarray:
+        """
+        Builds the PPR reset vector of a query over all graph vertices from `get_ppr_seed_weights`, which
+        documents the parameters.
+
+        Returns:
+            np.ndarray: Unnormalized reset probabilities over all graph vertices.
+        """
+        seed_weights = self.get_ppr_seed_weights(query=query,
+                                                 link_top_k=link_top_k,
+                                                 query_fact_scores=query_fact_scores,
+                                                 top_k_facts=top_k_facts,
+                                                 top_k_fact_indices=top_k_fact_indices,
+                                                 passage_node_weight=passage_node_weight,
+                                                 query_doc_scores=query_doc_scores)
+        return self.seed_weights_to_reset_probs([seed_weights])[0]
+
+    def seed_weights_to_reset_probs(self, batch_seed_weights: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]) -> np.ndarray:
+        """Scatters `get_ppr_seed_weights` results into a (#queries, #vertices) array of reset probabilities."""
+        reset_probs = np.zeros((len(batch_seed_weights), self.num_vertices))
+        for reset_prob, (phrase_ids, phrase_weights, passage_ids, passage_weights) in zip(reset_probs, batch_seed_weights):
+            #Combining phrase and passage scores into one array for PPR
+            reset_prob[phrase_ids] = phrase_weights
+            reset_prob[passage_ids] += passage_weights
+        return reset_probs
 
     def graph_search_with_fact_entities(self, query: str,
                                         link_top_k: int,
                                         query_fact_scores: np.ndarray,
                                         top_k_facts: List[Tuple],
                                         top_k_fact_indices: List[str],
-                                        passage_node_weight: float = 0.05) -> Tuple[np.ndarray, np.ndarray]:
+                                        passage_node_weight: float = 0.05,
+                                        query_doc_scores: np.ndarray = None,
+                                        top_k: int = None) -> Tuple[np.ndarray, np.ndarray]:
         """
         Computes document scores based on fact-based similarity and relevance using personalized
         PageRank (PPR) and dense retrieval models. This function combines the signal from the relevant
@@ -1626,6 +2260,9 @@ class HippoRAG:
             top_k_fact_indices (List[str]): Corresponding indices or identifiers for the top-ranked
                 facts in the query_fact_scores array.
             passage_node_weight (float): Default weight to scale passage scores in the graph.
+            query_doc_scores (np.ndarray, optional): Precomputed query-passage similarities forwarded to
+                `get_passage_scores`.
+            top_k (int, optional): Number of top-ranked documents to return. If None, every document is returned.
 
         Returns:
             Tuple[np.ndarray, np.ndarray]: A tuple containing two arrays:
@@ -1633,95 +2270,60 @@ class HippoRAG:
                 - The second array consists of the PPR scores associated with the sorted document IDs.
         """
 
-        #Assigning phrase weights based on selected facts from previous steps.
-        linking_score_map = {}  # from phrase to the average scores of the facts that contain the phrase
-        phrase_scores = {}  # store all fact scores for each phrase regardless of whether they exist in the knowledge graph or not
-        phrase_weights = np.zeros(len(self.graph.vs['name']))
-        passage_weights = np.zeros(len(self.graph.vs['name']))
-        number_of_occurs = np.zeros(len(self.graph.vs['name']))
-
-        phrases_and_ids = set()
-
-        for rank, f in enumerate(top_k_facts):
-            subject_phrase = f[0].lower()
-            predicate_phrase = f[1].lower()
-            object_phrase = f[2].lower()
-            fact_score = query_fact_scores[
-                top_k_fact_indices[rank]] if query_fact_scores.ndim > 0 else query_fact_scores
-
-            for phrase in [subject_phrase, object_phrase]:
-                phrase_key = compute_mdhash_id(
-                    content=phrase,
-                    prefix="entity-"
-                )
-                phrase_id = self.node_name_to_vertex_idx.get(phrase_key, None)
-
-                if phrase_id is not None:
-                    weighted_fact_score = fact_score
-
-                    if len(self.ent_node_to_chunk_ids.get(phrase_key, set())) > 0:
-                        weighted_fact_score /= len(self.ent_node_to_chunk_ids[phrase_key])
-
-                    phrase_weights[phrase_id] += weighted_fact_score
-                    number_of_occurs[phrase_id] += 1
-
-                phrases_and_ids.add((phrase, phrase_id))
-
-        phrase_weights /= number_of_occurs
-
-        for phrase, phrase_id in phrases_and_ids:
-            if phrase not in phrase_scores:
-                phrase_scores[phrase] = []
-
-            phrase_scores[phrase].append(phrase_weights[phrase_id])
-
-        # calculate average fact score for each phrase
-        for phrase, scores in phrase_scores.items():
-            linking_score_map[phrase] = float(np.mean(scores))
-
-        if link_top_k:
-            phrase_weights, linking_score_map = self.get_top_k_weights(link_top_k,
-                                                                           phrase_weights,
-                                                                           linking_score_map)  # at this stage, the length of linking_scope_map is determined by link_top_k
-
-        #Get passage scores according to chosen dense retrieval model
-        dpr_sorted_doc_ids, dpr_sorted_doc_scores = self.dense_passage_retrieval(query)
-        normalized_dpr_sorted_scores = min_max_normalize(dpr_sorted_doc_scores)
-
-        for i, dpr_sorted_doc_id in enumerate(dpr_sorted_doc_ids.tolist()):
-            passage_node_key = self.passage_node_keys[dpr_sorted_doc_id]
-            passage_dpr_score = normalized_dpr_sorted_scores[i]
-            passage_node_id = self.node_name_to_vertex_idx[passage_node_key]
-            passage_weights[passage_node_id] = passage_dpr_score * passage_node_weight
-            passage_node_text = self.chunk_embedding_store.get_row(passage_node_key)["content"]
-            linking_score_map[passage_node_text] = passage_dpr_score * passage_node_weight
-
-        #Combining phrase and passage scores into one array for PPR
-        node_weights = phrase_weights + passage_weights
-
-        #Recording top 30 facts in linking_score_map
-        if len(linking_score_map) > 30:
-            linking_score_map = dict(sorted(linking_score_map.items(), key=lambda x: x[1], reverse=True)[:30])
-
-        assert sum(node_weights) > 0, f'No phrases found in the graph for the given facts: {top_k_facts}'
+        seed_weights = self.get_ppr_seed_weights(query=query,
+                                                 link_top_k=link_top_k,
+                                                 query_fact_scores=query_fact_scores,
+                                                 top_k_facts=top_k_facts,
+                                                 top_k_fact_indices=top_k_fact_indices,
+                                                 passage_node_weight=passage_node_weight,
+                                                 query_doc_scores=query_doc_scores)
 
         #Running PPR algorithm based on the passage and phrase weights previously assigned
         ppr_start = time.time()
-        ppr_sorted_doc_ids, ppr_sorted_doc_scores = self.run_ppr(node_weights, damping=self.global_config.damping)
+        ppr_sorted_doc_ids, ppr_sorted_doc_scores = self.run_ppr_seeds([seed_weights], damping=self.global_config.damping, top_k=top_k)[0]
         ppr_end = time.time()
 
         self.ppr_time += (ppr_end - ppr_start)
 
-        assert len(ppr_sorted_doc_ids) == len(
-            self.passage_node_idxs), f"Doc prob length {len(ppr_sorted_doc_ids)} != corpus length {len(self.passage_node_idxs)}"
+        expected_len = len(self.passage_node_idxs) if top_k is None else min(top_k, len(self.passage_node_idxs))
+        assert len(ppr_sorted_doc_ids) == expected_len, f"Doc prob length {len(ppr_sorted_doc_ids)} != expected length {expected_len}"
 
         return ppr_sorted_doc_ids, ppr_sorted_doc_scores
 
 
-    def rerank_facts(self, query: str, query_fact_scores: np.ndarray) -> Tuple[List[int], List[Tuple], dict]:
+    def get_candidate_facts(self, query_fact_scores: np.ndarray, candidate_fact_indices: List[int] = None) -> Tuple[List[int], List[Tuple]]:
         """
+        Selects the facts handed to the recognition memory for one query.
 
         Args:
+            query_fact_scores: Normalized query-fact similarity scores over all facts.
+            candidate_fact_indices: Precomputed top `linking_top_k` fact indices sorted by descending score
+                (e.g. from `get_fact_scores_batch`). If None they are selected from `query_fact_scores`.
+
+        Returns:
+            Tuple[List[int], List[Tuple]]: The indices of the candidate facts in `query_fact_scores` and the facts
+            themselves (relation triples in tuple data type).
+        """
+        if candidate_fact_indices is not None:
+            candidate_fact_indices = np.asarray(candidate_fact_indices).tolist()
+        else:
+            # All facts if there are fewer than requested, otherwise the top k
+            candidate_fact_indices = top_k_indices(query_fact_scores, self.global_config.linking_top_k).tolist()
+
+        # Get the actual fact IDs
+        real_candidate_fact_ids = [self.fact_node_keys[idx] for idx in candidate_fact_indices]
+        fact_row_dict = self.fact_embedding_store.get_rows(real_candidate_fact_ids)
+        candidate_facts = [eval(fact_row_dict[id]['content']) for id in real_candidate_fact_ids]
+        return candidate_fact_indices, candidate_facts
+
+    def rerank_facts(self, query: str, query_fact_scores: np.ndarray, candidate_fact_indices: List[int] = None) -> Tuple[List[int], List[Tuple], dict]:
+        """
+
+        Args:
+            query: The query string.
+            query_fact_scores: Normalized query-fact similarity scores over all facts.
+            candidate_fact_indices: Precomputed top `linking_top_k` fact indices sorted by descending score
+                (e.g. from `get_fact_scores_batch`). If None they are selected from `query_fact_scores`.
 
         Returns:
             top_k_fact_indicies:
@@ -1732,45 +2334,72 @@ class HippoRAG:
 
 
         """
-        # load args
+        return self.rerank_facts_batch([query], [query_fact_scores],
+                                       batch_candidate_fact_indices=None if candidate_fact_indices is None else [candidate_fact_indices])[0]
+
+    def rerank_facts_batch(self,
+                           queries: List[str],
+                           batch_fact_scores: List[np.ndarray],
+                           batch_candidate_fact_indices: List[List[int]] = None) -> List[Tuple[List[int], List[Tuple], dict]]:
+        """
+        Batched counterpart of `rerank_facts`: the candidate facts of all queries are selected first and then
+        filtered together by `rerank_filter.rerank_batch`, e.g. with concurrent LLM requests for `DSPyFilter` or
+        batched forward passes for `CrossEncoderReranker`.
+
+        Args:
+            queries: The query strings.
+            batch_fact_scores: Normalized query-fact similarity scores over all facts, one array (or row) per query.
+            batch_candidate_fact_indices: Precomputed candidate fact indices of each query, see `rerank_facts`.
+
+        Returns:
+            List[Tuple[List[int], List[Tuple], dict]]: The `rerank_facts` result of each query, in the order of `queries`.
+        """
         link_top_k: int = self.global_config.linking_top_k
-        
-        # Check if there are any facts to rerank
-        if len(query_fact_scores) == 0 or len(self.fact_node_keys) == 0:
-            logger.warning("No facts available for reranking. Returning empty lists.")
-            return [], [], {'facts_before_rerank': [], 'facts_after_rerank': []}
-            
-        try:
-            # Get the top k facts by score
-            if len(query_fact_scores) <= link_top_k:
-                # If we have fewer facts than requested, use all of them
-                candidate_fact_indices = np.argsort(query_fact_scores)[::-1].tolist()
-            else:
-                # Otherwise get the top k
-                candidate_fact_indices = np.argsort(query_fact_scores)[-link_top_k:][::-1].tolist()
-                
-            # Get the actual fact IDs
-            real_candidate_fact_ids = [self.fact_node_keys[idx] for idx in candidate_fact_indices]
-            fact_row_dict = self.fact_embedding_store.get_rows(real_candidate_fact_ids)
-            candidate_facts = [eval(fact_row_dict[id]['content']) for id in real_candidate_fact_ids]
-            
-            # Rerank the facts
-            top_k_fact_indices, top_k_facts, reranker_dict = self.rerank_filter(query,
-                                                                                candidate_facts,
-                                                                                candidate_fact_indices,
-                                                                                len_after_rerank=link_top_k)
-            
-            rerank_log = {'facts_before_rerank': candidate_facts, 'facts_after_rerank': top_k_facts}
-            
-            return top_k_fact_indices, top_k_facts, rerank_log
-            
-        except Exception as e:
-            logger.error(f"Error in rerank_facts: {str(e)}")
-            return [], [], {'facts_before_rerank': [], 'facts_after_rerank': [], 'error': str(e)}
-    
+        results = [None] * len(queries)
+        rerank_idxs, batch_candidate_indices, batch_candidate_facts = [], [], []
+
+        for i, query_fact_scores in enumerate(batch_fact_scores):
+            # Check if there are any facts to rerank
+            if len(query_fact_scores) == 0 or len(self.fact_node_keys) == 0:
+                logger.warning("No facts available for reranking. Returning empty lists.")
+                results[i] = [], [], {'facts_before_rerank': [], 'facts_after_rerank': []}
+                continue
+
+            try:
+                candidate_fact_indices, candidate_facts = self.get_candidate_facts(
+                    query_fact_scores, None if batch_candidate_fact_indices is None else batch_candidate_fact_indices[i])
+            except Exception as e:
+                logger.error(f"Error in rerank_facts: {str(e)}")
+                results[i] = [], [], {'facts_before_rerank': [], 'facts_after_rerank': [], 'error': str(e)}
+                continue
+
+            rerank_idxs.append(i)
+            batch_candidate_indices.append(candidate_fact_indices)
+            batch_candidate_facts.append(candidate_facts)
+
+        if len(rerank_idxs) > 0:
+            try:
+                rerank_results = self.rerank_filter.rerank_batch([queries[i] for i in rerank_idxs],
+                                                                 batch_candidate_facts,
+                                                                 batch_candidate_indices,
+                                                                 len_after_rerank=link_top_k)
+            except Exception as e:
+                logger.error(f"Error in rerank_facts: {str(e)}")
+                rerank_results = [e] * len(rerank_idxs)
+
+            for i, candidate_facts, rerank_result in zip(rerank_idxs, batch_candidate_facts, rerank_results):
+                if isinstance(rerank_result, Exception):
+                    results[i] = [], [], {'facts_before_rerank': [], 'facts_after_rerank': [], 'error': str(rerank_result)}
+                else:
+                    top_k_fact_indices, top_k_facts, reranker_dict = rerank_result
+                    results[i] = top_k_fact_indices, top_k_facts, {'facts_before_rerank': candidate_facts, 'facts_after_rerank': top_k_facts}
+
+        return results
+
     def run_ppr(self,
                 reset_prob: np.ndarray,
-                damping: float =0.5) -> Tuple[np.ndarray, np.ndarray]:
+                damping: float =0.5,
+                top_k: int = None) -> Tuple[np.ndarray, np.ndarray]:
         """
         Runs Personalized PageRank (PPR) on a graph and computes relevance scores for
         nodes corresponding to document passages. The method utilizes a damping
@@ -1784,6 +2413,8 @@ class HippoRAG:
                 within the array are replaced with zeros.
             damping (float): A scalar specifying the damping factor for the
                 computation. Defaults to 0.5 if not provided or set to `None`.
+            top_k (int, optional): Number of top-ranked document passages to return.
+                If None, every document passage is returned.
 
         Returns:
             Tuple[np.ndarray, np.ndarray]: A tuple containing two numpy arrays. The
@@ -1794,9 +2425,12 @@ class HippoRAG:
         """
 
         if damping is None: damping = 0.5 # for potential compatibility
+        if self.ppr_engine is not None:
+            return self.run_ppr_batch(reset_prob[None, :], damping=damping, top_k=top_k)[0]
+
         reset_prob = np.where(np.isnan(reset_prob) | (reset_prob < 0), 0, reset_prob)
         pagerank_scores = self.graph.personalized_pagerank(
-            vertices=range(len(self.node_name_to_vertex_idx)),
+            vertices=range(self.num_vertices),
             damping=damping,
             directed=False,
             weights='weight',
@@ -1805,7 +2439,62 @@ class HippoRAG:
         )
 
         doc_scores = np.array([pagerank_scores[idx] for idx in self.passage_node_idxs])
-        sorted_doc_ids = np.argsort(doc_scores)[::-1]
-        sorted_doc_scores = doc_scores[sorted_doc_ids.tolist()]
+        sorted_doc_ids = top_k_indices(doc_scores, top_k)
+        sorted_doc_scores = doc_scores[sorted_doc_ids]
+
+        return sorted_doc_ids, sorted_doc_scores
+
+    def run_ppr_seeds(self,
+                      batch_seed_weights: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]],
+                      damping: float = 0.5,
+                      top_k: int = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Runs Personalized PageRank for a batch of queries given by the nonzero reset weights returned by
+        `get_ppr_seed_weights`. The 'push' `ppr_engine` works on them directly, pushing from the phrase nodes and
+        blending in the passage weights, so no vector over all vertices or passages is built; the other engines
+        get the dense reset vectors through `run_ppr_batch`.
+
+        Parameters:
+            batch_seed_weights: The phrase vertex ids and weights and passage vertex ids and weights of each query.
+            damping (float): The damping factor.
+            top_k (int, optional): Number of top-ranked document passages to return per query.
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: Sorted passage ids and their scores for each query, as returned
+            by `run_ppr`.
+        """
+        if damping is None: damping = 0.5
+        if isinstance(self.ppr_engine, PushPPR):
+            return [self.ppr_engine.run_sparse(phrase_ids, phrase_weights, passage_ids, passage_weights,
+                                               damping=damping, nodes=self.passage_vertex_idxs, top_k=top_k)
+                    for phrase_ids, phrase_weights, passage_ids, passage_weights in batch_seed_weights]
+
+        return self.run_ppr_batch(self.seed_weights_to_reset_probs(batch_seed_weights), damping=damping, top_k=top_k)
+
+    def run_ppr_batch(self,
+                      reset_probs: np.ndarray,
+                      damping: float = 0.5,
+                      top_k: int = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Runs Personalized PageRank for a batch of reset vectors. With the 'sparse' `ppr_engine` the whole batch
+        goes through a single power iteration and with 'push' each vector is pushed from its phrase nodes;
+        with 'igraph' each vector is passed to `run_ppr`.
+
+        Parameters:
+            reset_probs (np.ndarray): A (#queries, #nodes) array of reset probabilities.
+            damping (float): The damping factor.
+            top_k (int, optional): Number of top-ranked document passages to return per reset vector.
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: Sorted passage ids and their scores for each reset vector,
+            as returned by `run_ppr`.
+        """
+        if damping is None: damping = 0.5
+        if self.ppr_engine is None:
+            return [self.run_ppr(reset_prob, damping=damping, top_k=top_k) for reset_prob in reset_probs]
+
+        doc_scores = self.ppr_engine.run(reset_probs, damping=damping, nodes=self.passage_node_idxs)
+        sorted_doc_ids = top_k_indices(doc_scores, top_k, axis=1)
+        sorted_doc_scores = np.take_along_axis(doc_scores, sorted_doc_ids, axis=1)
 
-        return sorted_doc_ids, sorted_doc_scores
\ No newline at end of file
+        return list(zip(sorted_doc_ids, sorted_doc_scores))
\ No newline at end of file
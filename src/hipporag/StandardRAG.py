@@ -7,7 +7,6 @@ from typing import Union, Optional, List, Set, Dict, Any, Tuple, Literal
 import numpy as np
 import importlib
 from collections import defaultdict
-from transformers import HfArgumentParser
 from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 from igraph import Graph
@@ -19,9 +18,8 @@ import time
 
 from .llm import _get_llm_class, BaseLLM
 from .embedding_model import _get_embedding_model_class, BaseEmbeddingModel
-from .embedding_store import EmbeddingStore
+from .embedding_store import EmbeddingStore, _get_embedding_store
 from .information_extraction import OpenIE
-from .information_extraction.openie_vllm_offline import VLLMOfflineOpenIE
 from .evaluation.retrieval_eval import RetrievalRecall
 from .evaluation.qa_eval import QAExactMatch, QAF1Score
 from .prompts.linking import get_query_instruction
@@ -29,6 +27,7 @@ from .prompts.prompt_template_manager import PromptTemplateManager
 from .rerank import DSPyFilter
 from .utils.misc_utils import *
 from .utils.embed_utils import retrieve_knn
+from .utils.qa_utils import batch_qa_inference
 from .utils.typing import Triple
 from .utils.config_utils import BaseConfig
 
@@ -94,9 +93,8 @@ class StandardRAG:
         import ipdb;
         ipdb.set_trace()
 
-        self.chunk_embedding_store = EmbeddingStore(self.embedding_model,
-                                                    os.path.join(self.working_dir, "chunk_embeddings"),
-                                                    self.global_config.embedding_batch_size, 'chunk')
+        self.chunk_embedding_store = _get_embedding_store(self.global_config, self.embedding_model,
+                                                          os.path.join(self.working_dir, "chunk_embeddings"), 'chunk')
 
         self.ready_to_retrieve = False
 
@@ -185,13 +183,13 @@ class StandardRAG:
 
         for q_idx, query in tqdm(enumerate(queries), desc="Retrieving", total=len(queries)):
             logger.info('No facts found after reranking, return DPR results')
-            sorted_doc_ids, sorted_doc_scores = self.dense_passage_retrieval(query)
+            sorted_doc_ids, sorted_doc_scores = self.dense_passage_retrieval(query, top_k=num_to_retrieve)
 
             top_k_docs = [self.chunk_embedding_store.get_row(self.passage_node_keys[idx])["content"] for idx in
-                          sorted_doc_ids[:num_to_retrieve]]
+                          sorted_doc_ids]
 
             retrieval_results.append(
-                QuerySolution(question=query, docs=top_k_docs, doc_scores=sorted_doc_scores[:num_to_retrieve]))
+                QuerySolution(question=query, docs=top_k_docs, doc_scores=sorted_doc_scores))
 
         retrieve_end_time = time.time()  # Record end time
 
@@ -324,10 +322,8 @@ class StandardRAG:
             all_qa_messages.append(
                 self.prompt_template_manager.render(name=f'rag_qa_{prompt_dataset_name}', prompt_user=prompt_user))
 
-        all_qa_results = [self.llm_model.infer(qa_messages) for qa_messages in tqdm(all_qa_messages, desc="QA Reading")]
-
-        all_response_message, all_metadata, all_cache_hit = zip(*all_qa_results)
-        all_response_message, all_metadata = list(all_response_message), list(all_metadata)
+        all_response_message, all_metadata, all_cache_hit = batch_qa_inference(
+            self.llm_model, all_qa_messages, max_workers=self.global_config.qa_max_workers)
 
         #Process responses and extract predicted answers.
         queries_solutions = []
@@ -366,7 +362,7 @@ class StandardRAG:
         self.passage_node_keys: List = list(self.chunk_embedding_store.get_all_ids()) # a list of passage node keys
 
         logger.info("Loading embeddings.")
-        self.passage_embeddings = np.array(self.chunk_embedding_store.get_embeddings(self.passage_node_keys))
+        self.passage_embeddings = np.asarray(self.chunk_embedding_store.get_embeddings(self.passage_node_keys))
 
         self.ready_to_retrieve = True
 
@@ -398,7 +394,7 @@ class StandardRAG:
             for query, embedding in zip(all_query_strings, query_embeddings_for_passage):
                 self.query_to_embedding['passage'][query] = embedding
 
-    def dense_passage_retrieval(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+    def dense_passage_retrieval(self, query: str, top_k: int = None) -> Tuple[np.ndarray, np.ndarray]:
         """
         Conduct dense passage retrieval to find relevant documents for a query.
 
@@ -413,6 +409,9 @@ class StandardRAG:
         ----------
         query : str
             The input query for which relevant passages should be retrieved.
+        top_k : int, optional
+            Number of top-ranked passages to return. Only these are sorted; if None, every
+            passage is ranked.
 
         Returns
         -------
@@ -431,7 +430,7 @@ class StandardRAG:
         query_doc_scores = np.squeeze(query_doc_scores) if query_doc_scores.ndim == 2 else query_doc_scores
         query_doc_scores = min_max_normalize(query_doc_scores)
 
-        sorted_doc_ids = np.argsort(query_doc_scores)[::-1]
-        sorted_doc_scores = query_doc_scores[sorted_doc_ids.tolist()]
+        sorted_doc_ids = top_k_indices(query_doc_scores, top_k)
+        sorted_doc_scores = query_doc_scores[sorted_doc_ids]
 
         return sorted_doc_ids, sorted_doc_scores
\ No newline at end of file
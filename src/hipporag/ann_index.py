@@ -0,0 +1,164 @@
+import os
+import logging
+from typing import Callable, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF-Flat) approximate nearest-neighbour index over the rows of an `EmbeddingStore`.
+
+    Rows are clustered around `nlist` spherical k-means centroids. A query only scans the rows assigned
+    to its `nprobe` closest centroids and scores them exactly with the store's own vectors, so the index
+    itself only keeps the centroids and one list id per store row. The index mirrors the row order of the
+    store it is attached to: the store reports appended and deleted rows through `add` and `remove_rows`.
+
+    Until the store holds enough rows to train `nlist` centroids (`MIN_POINTS_PER_LIST` per centroid),
+    the index is untrained and `search` falls back to an exact scan.
+    """
+
+    MIN_POINTS_PER_LIST = 39
+
+    def __init__(self, filename: str, nlist: int = 1024, nprobe: int = 32, kmeans_iters: int = 10, seed: int = 0):
+        self.filename = filename
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+
+        self.centroids = None
+        self.row_lists = np.empty(0, dtype=np.int32)
+        self.trained_size = 0
+        self._list_offsets, self._list_rows = None, None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def load(self, num_rows: int) -> bool:
+        """Loads the persisted index, returns False if it is missing or out of sync with a store of `num_rows` rows."""
+        if not os.path.exists(self.filename):
+            return False
+
+        with np.load(self.filename) as data:
+            centroids, row_lists, trained_size = data["centroids"], data["row_lists"], int(data["trained_size"])
+
+        if len(row_lists) != num_rows:
+            logger.warning(f"ANN index {self.filename} covers {len(row_lists)} rows but the store has {num_rows}, rebuilding.")
+            return False
+
+        self.centroids = centroids if centroids.size > 0 else None
+        self.row_lists = row_lists
+        self.trained_size = trained_size
+        self._list_offsets, self._list_rows = None, None
+        return True
+
+    def save(self):
+        centroids = self.centroids if self.centroids is not None else np.empty((0, 0), dtype=np.float32)
+        tmp_filename = self.filename + ".tmp.npz"
+        np.savez(tmp_filename, centroids=centroids, row_lists=self.row_lists, trained_size=self.trained_size)
+        os.replace(tmp_filename, self.filename)
+
+    def build(self, vectors: np.ndarray):
+        """(Re)trains the centroids on `vectors` and assigns every row, or leaves the index untrained if there are too few rows."""
+        num_lists = min(self.nlist, len(vectors) // self.MIN_POINTS_PER_LIST)
+        if num_lists < 2:
+            self.centroids = None
+            self.row_lists = np.full(len(vectors), -1, dtype=np.int32)
+        else:
+            logger.info(f"Training ANN index with {num_lists} lists on {len(vectors)} rows.")
+            self.centroids = self._train_kmeans(vectors, num_lists)
+            self.row_lists = self._assign(vectors)
+        self.trained_size = len(vectors)
+        self._list_offsets, self._list_rows = None, None
+
+    def add(self, new_vectors: np.ndarray, all_vectors: Callable[[], np.ndarray]):
+        """
+        Registers `new_vectors`, the rows just appended to the store, retraining once the store has grown 4x since the
+        last training. `all_vectors` returns every row of the store and is only called when retraining.
+        """
+        num_rows = len(self.row_lists) + len(new_vectors)
+        if not self.is_trained or num_rows >= 4 * max(self.trained_size, 1):
+            if num_rows // self.MIN_POINTS_PER_LIST >= 2:
+                self.build(all_vectors())
+                return
+        new_lists = self._assign(new_vectors) if self.is_trained else np.full(len(new_vectors), -1, dtype=np.int32)
+        self.row_lists = np.concatenate([self.row_lists, new_lists])
+        self._list_offsets, self._list_rows = None, None
+
+    def remove_rows(self, rows):
+        keep = np.ones(len(self.row_lists), dtype=bool)
+        keep[np.asarray(list(rows), dtype=np.intp)] = False
+        self.row_lists = self.row_lists[keep]
+        self._list_offsets, self._list_rows = None, None
+
+    def search(self, vectors: np.ndarray, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (approximate) top-k rows of `vectors` by inner product for each query.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row indices and scores of shape (#queries, k), sorted by descending
+            score. Slots without a candidate hold index -1 and score -inf.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        if not self.is_trained:
+            all_rows = np.arange(len(vectors))
+            candidates = [all_rows] * len(queries)
+        else:
+            self._ensure_lists()
+            nprobe = min(self.nprobe, len(self.centroids))
+            probe_lists = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+            candidates = [np.concatenate([self._list_rows[self._list_offsets[l]:self._list_offsets[l + 1]] for l in lists])
+                          for lists in probe_lists]
+
+        for q_idx, rows in enumerate(candidates):
+            if len(rows) == 0:
+                continue
+            row_scores = np.asarray(vectors[rows], dtype=np.float32) @ queries[q_idx]
+            top = min(k, len(rows))
+            top_idx = np.argpartition(-row_scores, top - 1)[:top]
+            top_idx = top_idx[np.argsort(-row_scores[top_idx])]
+            indices[q_idx, :top] = rows[top_idx]
+            scores[q_idx, :top] = row_scores[top_idx]
+
+        return indices, scores
+
+    def _ensure_lists(self):
+        # CSR layout of the inverted lists: rows of list l are _list_rows[_list_offsets[l]:_list_offsets[l + 1]].
+        if self._list_rows is None:
+            self._list_rows = np.argsort(self.row_lists, kind="stable").astype(np.int64)
+            counts = np.bincount(self.row_lists, minlength=len(self.centroids))
+            self._list_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def _assign(self, vectors: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), batch_size):
+            batch = np.asarray(vectors[start:start + batch_size], dtype=np.float32)
+            assignments[start:start + batch_size] = np.argmax(batch @ self.centroids.T, axis=1)
+        return assignments
+
+    def _train_kmeans(self, vectors: np.ndarray, num_lists: int) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), num_lists * 256)
+        sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))], dtype=np.float32)
+        sample = sample / (np.linalg.norm(sample, axis=1, keepdims=True) + 1e-12)
+
+        centroids = sample[rng.choice(sample_size, num_lists, replace=False)]
+        for _ in range(self.kmeans_iters):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels, minlength=num_lists)
+            empty = counts == 0
+            sums = np.zeros_like(centroids)
+            sums[~empty] = np.add.reduceat(sample[order], (np.cumsum(counts) - counts)[~empty], axis=0)
+            # Re-seed empty lists with random sample points so that every list stays in use.
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+            centroids = sums / (np.linalg.norm(sums, axis=1, keepdims=True) + 1e-12)
+
+        return centroids.astype(np.float32)
@@ -23,6 +23,9 @@ class BGEM3EmbeddingModel(BaseEmbeddingModel):
     Produces dense embeddings only (default behavior for HippoRAG).
     """
 
+    # bge-m3 dense retrieval needs no instruction, `batch_encode` ignores it.
+    instruction_insensitive = True
+
     def __init__(self, global_config: Optional[BaseConfig] = None, embedding_model_name: Optional[str] = None) -> None:
         super().__init__(global_config=global_config)
 
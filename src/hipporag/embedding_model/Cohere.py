@@ -49,8 +49,12 @@ class CohereEmbeddingModel(BaseEmbeddingModel):
         response = json.loads(response.get('body').read())
         return np.array(response['embeddings'][self.embedding_type])
 
+    def instruction_cache_key(self, instruction: str) -> str:
+        # Instructions only select the input type of the request.
+        return 'search_query' if instruction in self.search_query_instr else 'search_document'
+
     def batch_encode(self, texts: List[str], **kwargs) -> None:
-        input_type = 'search_query' if (kwargs.get("instruction") in self.search_query_instr) else 'search_document'
+        input_type = self.instruction_cache_key(kwargs.get("instruction"))
 
         if len(texts) < self.batch_size:
             return self.encode(texts, input_type)
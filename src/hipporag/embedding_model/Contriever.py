@@ -19,6 +19,9 @@ def mean_pooling(token_embeddings, mask):
 
 class ContrieverModel(BaseEmbeddingModel):
 
+    # Contriever embeds texts as they are, `batch_encode` ignores the instruction.
+    instruction_insensitive = True
+
     def __init__(self, global_config: Optional[BaseConfig] = None, embedding_model_name: Optional[str] = None) -> None:
         super().__init__(global_config=global_config)
 
@@ -2,9 +2,7 @@ from copy import deepcopy
 from typing import List, Optional
 
 import numpy as np
-import torch
 from tqdm import tqdm
-from transformers import AutoModel
 from openai import OpenAI
 from openai import AzureOpenAI
 
@@ -16,6 +14,9 @@ logger = get_logger(__name__)
 
 class OpenAIEmbeddingModel(BaseEmbeddingModel):
 
+    # `encode` sends the texts as they are, so the instruction passed to `batch_encode` has no effect.
+    instruction_insensitive = True
+
     def __init__(self, global_config: Optional[BaseConfig] = None, embedding_model_name: Optional[str] = None) -> None:
         super().__init__(global_config=global_config)
 
@@ -108,9 +109,6 @@ class OpenAIEmbeddingModel(BaseEmbeddingModel):
             pbar.close()
             results = np.concatenate(results)
 
-        if isinstance(results, torch.Tensor):
-            results = results.cpu()
-            results = results.numpy()
         if self.embedding_config.norm:
             results = (results.T / np.linalg.norm(results, axis=1)).T
 
@@ -1,27 +1,46 @@
-from .Contriever import ContrieverModel
+import importlib
+
 from .base import EmbeddingConfig, BaseEmbeddingModel
-from .GritLM import GritLMEmbeddingModel
-from .NVEmbedV2 import NVEmbedV2EmbeddingModel
-from .OpenAI import OpenAIEmbeddingModel
-from .Cohere import CohereEmbeddingModel
-from .BGEM3 import BGEM3EmbeddingModel
 
 from ..utils.logging_utils import get_logger
 
 logger = get_logger(__name__)
 
+# Model classes are imported on demand, so that importing the package does not load torch, transformers or the SDKs
+# of backends that are never used.
+_MODEL_CLASSES = {
+    "ContrieverModel": ".Contriever",
+    "GritLMEmbeddingModel": ".GritLM",
+    "NVEmbedV2EmbeddingModel": ".NVEmbedV2",
+    "OpenAIEmbeddingModel": ".OpenAI",
+    "CohereEmbeddingModel": ".Cohere",
+    "BGEM3EmbeddingModel": ".BGEM3",
+}
+
+
+def __getattr__(name: str):
+    if name in _MODEL_CLASSES:
+        return getattr(importlib.import_module(_MODEL_CLASSES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def _get_embedding_model_class(embedding_model_name: str = "nvidia/NV-Embed-v2"):
     if "GritLM" in embedding_model_name:
+        from .GritLM import GritLMEmbeddingModel
         return GritLMEmbeddingModel
     elif "NV-Embed-v2" in embedding_model_name:
+        from .NVEmbedV2 import NVEmbedV2EmbeddingModel
         return NVEmbedV2EmbeddingModel
     elif "contriever" in embedding_model_name:
+        from .Contriever import ContrieverModel
         return ContrieverModel
     elif "text-embedding" in embedding_model_name:
+        from .OpenAI import OpenAIEmbeddingModel
         return OpenAIEmbeddingModel
     elif "cohere" in embedding_model_name:
+        from .Cohere import CohereEmbeddingModel
         return CohereEmbeddingModel
     elif "bge-m3" in embedding_model_name.lower():
+        from .BGEM3 import BGEM3EmbeddingModel
         return BGEM3EmbeddingModel
-    assert False, f"Unknown embedding model name: {embedding_model_name}"
\ No newline at end of file
+    assert False, f"Unknown embedding model name: {embedding_model_name}"
@@ -104,85 +104,103 @@ class EmbeddingConfig:
         return json.dumps(self._data, indent=4)
     
 
-from filelock import FileLock
 import sqlite3
 import hashlib
 import os
-import torch
+from json.encoder import encode_basestring_ascii
+
+# Hashes are looked up in chunks to stay below SQLite's limit on the number of bound parameters.
+_MAX_QUERY_PARAMS = 900
+
+
 def make_cache_embed(encode_func, cache_file_name, device):
+    """
+    Wraps `encode_func` with a SQLite cache of embeddings keyed by the hash of (instruction, prompt, max_length).
+
+    Cached embeddings are fetched with batched `IN` queries and written into one preallocated float32 array together
+    with the freshly encoded misses, which are stored back with a single `executemany`. The database runs in WAL mode,
+    so concurrent readers and writers (threads or processes) need no external lock.
+    """
+    import torch
+
+    with sqlite3.connect(cache_file_name, timeout=30) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS embeddings (
+                hash TEXT PRIMARY KEY,
+                embedding BLOB
+            )
+        ''')
+
     def wrapper(**kwargs):
         # FOCUS_KEYS = ["instruction", "prompts", "max_length"]
         instruction = kwargs.get("instruction", "")
         max_length = kwargs.get("max_length", "")
 
+        # Keys are json.dumps({"instruction", "promps", "max_length"}, sort_keys=True), whose prompt-independent
+        # prefix is built once; "promps" sorts last, so only the encoded prompt and the closing brace follow it.
+        key_prefix = json.dumps({
+            "instruction": instruction,
+            "promps": "",
+            "max_length": max_length
+        }, sort_keys=True, default=str)[:-len('""}')]
         hash_strs = []
         for prompt in kwargs['prompts']:
-            key_str = json.dumps({
-                "instruction": instruction,
-                "promps": prompt,
-                "max_length": max_length
-            }, sort_keys=True, default=str)
+            if isinstance(prompt, str):
+                key_str = key_prefix + encode_basestring_ascii(prompt) + "}"
+            else:
+                key_str = json.dumps({
+                    "instruction": instruction,
+                    "promps": prompt,
+                    "max_length": max_length
+                }, sort_keys=True, default=str)
             hash_strs.append(hashlib.sha256(key_str.encode("utf-8")).hexdigest())
 
-        missed_prompts = []
-        lock_file = cache_file_name + ".lock"
-
-        with FileLock(lock_file):
-            with sqlite3.connect(cache_file_name) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS embeddings (
-                        hash TEXT PRIMARY KEY,
-                        embedding BLOB
-                    )
-                ''')
-                conn.commit()
-
-                embeddings = []
-                for i, hash_str in enumerate(hash_strs):
-                    cursor.execute('SELECT embedding FROM embeddings WHERE hash = ?', (hash_str,))
-                    result = cursor.fetchone()
-                    if result:
-                        # Convert the BLOB back to a NumPy array
-                        emb = np.frombuffer(result[0], dtype=np.float32)
-                        embeddings.append(emb)
-                    else:
-                        missed_prompts.append(i)
-                        embeddings.append(None)
-
-        if missed_prompts:
+        cached = {}
+        unique_hashes = list(dict.fromkeys(hash_strs))
+        with sqlite3.connect(cache_file_name, timeout=30) as conn:
+            for start in range(0, len(unique_hashes), _MAX_QUERY_PARAMS):
+                batch = unique_hashes[start:start + _MAX_QUERY_PARAMS]
+                cached.update(conn.execute(
+                    f"SELECT hash, embedding FROM embeddings WHERE hash IN ({','.join('?' * len(batch))})", batch))
+
+        # Each missed hash is encoded once, even if its prompt occurs several times.
+        missed_hashes = [hash_str for hash_str in unique_hashes if hash_str not in cached]
+        new_embeddings = None
+        if missed_hashes:
+            first_prompt = {}
+            for i, hash_str in enumerate(hash_strs):
+                first_prompt.setdefault(hash_str, i)
             # Update kwargs to include only the missed prompts.
-            kwargs['prompts'] = [kwargs['prompts'][i] for i in missed_prompts]
-            # Call the encoder function (which returns a 2D torch tensor)
+            kwargs['prompts'] = [kwargs['prompts'][first_prompt[hash_str]] for hash_str in missed_hashes]
             new_embeddings = encode_func(**kwargs)
-            # Insert the new embeddings back into the correct positions.
-            for idx, embedding in enumerate(new_embeddings):
-                embeddings[missed_prompts[idx]] = embedding
+            if isinstance(new_embeddings, torch.Tensor):
+                new_embeddings = new_embeddings.detach().cpu().numpy()
+            new_embeddings = np.asarray(new_embeddings, dtype=np.float32).reshape(len(missed_hashes), -1)
 
             # Save the new embeddings to the cache.
-            with FileLock(lock_file):
-                with sqlite3.connect(cache_file_name) as conn:
-                    cursor = conn.cursor()
-                    for i in missed_prompts:
-                        hash_str = hash_strs[i]
-                        emb = embeddings[i]
-                        # Convert torch tensor to numpy bytes if necessary.
-                        if isinstance(emb, torch.Tensor):
-                            emb_bytes = emb.cpu().numpy().tobytes()
-                        else:
-                            emb_bytes = emb.tobytes()
-                        cursor.execute('INSERT INTO embeddings (hash, embedding) VALUES (?, ?)', (hash_str, emb_bytes))
-                    conn.commit()
-
-        # Convert all embeddings to torch tensors if they're not already
-        final_embeddings = [
-            emb if isinstance(emb, torch.Tensor) else torch.Tensor(emb.copy())
-            for emb in embeddings
-        ]
-
-        final_embeddings = [emb.to(device) for emb in final_embeddings]
+            with sqlite3.connect(cache_file_name, timeout=30) as conn:
+                conn.executemany('INSERT OR REPLACE INTO embeddings (hash, embedding) VALUES (?, ?)',
+                                 [(hash_str, emb.tobytes()) for hash_str, emb in zip(missed_hashes, new_embeddings)])
+
+        if new_embeddings is not None:
+            dim = new_embeddings.shape[1]
+        else:
+            dim = len(next(iter(cached.values()))) // np.dtype(np.float32).itemsize if cached else 0
+
+        embeddings = np.empty((len(hash_strs), dim), dtype=np.float32)
+        hit_rows = [i for i, hash_str in enumerate(hash_strs) if hash_str in cached]
+        if hit_rows:
+            # Decode all cached blobs with one buffer conversion instead of one array per row.
+            embeddings[hit_rows] = np.frombuffer(b"".join(cached[hash_strs[i]] for i in hit_rows),
+                                                 dtype=np.float32).reshape(len(hit_rows), dim)
+        if missed_hashes:
+            missed_rows = {hash_str: row for row, hash_str in enumerate(missed_hashes)}
+            rows = [i for i, hash_str in enumerate(hash_strs) if hash_str in missed_rows]
+            embeddings[rows] = new_embeddings[[missed_rows[hash_strs[i]] for i in rows]]
+
         # Return a 2D tensor where each row is an embedding.
-        return torch.stack(final_embeddings)
+        return torch.from_numpy(embeddings).to(device)
 
     return wrapper
     
@@ -192,6 +210,9 @@ class BaseEmbeddingModel:
     embedding_config: EmbeddingConfig
     
     embedding_dim: int # Need subclass to init
+
+    # Set by models whose `batch_encode` ignores the instruction, so that queries are encoded once for all instructions.
+    instruction_insensitive: bool = False
     
     def __init__(self, global_config: Optional[BaseConfig] = None) -> None:
         if global_config is None: 
@@ -207,6 +228,13 @@ class BaseEmbeddingModel:
 
     def batch_encode(self, texts: List[str], **kwargs) -> None:
         raise NotImplementedError
+
+    def instruction_cache_key(self, instruction: str) -> str:
+        """
+        Identifies the embedding variant that `batch_encode` produces for `instruction`: instructions with the same key
+        yield the same embeddings, so query embeddings are cached and computed once per key.
+        """
+        return "" if self.instruction_insensitive else instruction
     
     
     def get_query_doc_scores(self, query_vec: np.ndarray, doc_vecs: np.ndarray):
@@ -220,30 +248,47 @@ class BaseEmbeddingModel:
 
 
 class EmbeddingCache:
-    """A multiprocessing-safe global cache for storing embeddings."""
-    
-    _manager = multiprocessing.Manager()
-    _cache = _manager.dict()  # Shared dictionary for multiprocessing
+    """
+    A multiprocessing-safe global cache for storing embeddings.
+
+    The shared dictionary lives in a `multiprocessing.Manager` server process, which is only started on first use
+    rather than when the package is imported.
+    """
+
+    _manager = None
+    _cache = None
     _lock = threading.Lock()  # Thread-safe lock for concurrent access
 
+    @classmethod
+    def _get_cache(cls):
+        if cls._cache is None:
+            with cls._lock:
+                if cls._cache is None:
+                    cls._manager = multiprocessing.Manager()
+                    cls._cache = cls._manager.dict()  # Shared dictionary for multiprocessing
+        return cls._cache
+
     @classmethod
     def get(cls, content):
         """Retrieve the embedding if cached."""
-        return cls._cache.get(content)
+        return cls._get_cache().get(content)
 
     @classmethod
     def set(cls, content, embedding):
         """Store an embedding in the cache."""
+        cache = cls._get_cache()
         with cls._lock:  # Ensures thread safety
-            cls._cache[content] = embedding
+            cache[content] = embedding
 
     @classmethod
     def contains(cls, content):
         """Check if the embedding exists in cache."""
-        return content in cls._cache
+        return content in cls._get_cache()
 
     @classmethod
     def clear(cls):
         """Clear the entire cache."""
+        if cls._cache is None:
+            return
         with cls._lock:
             cls._cache.clear()
\ No newline at end of file
@@ -0,0 +1,160 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Keys are looked up in chunks to stay below SQLite's limit on the number of bound parameters.
+_MAX_QUERY_PARAMS = 900
+
+
+class QueryEmbeddingCache:
+    """
+    Cache of query embeddings keyed by (embedding model, instruction key, query text).
+
+    The instruction key is what `BaseEmbeddingModel.instruction_cache_key` returns for the instruction a query was
+    encoded with, so instructions that yield the same embedding share entries. At most `max_size` embeddings are kept
+    in memory, evicting the least recently used ones. If `filename` is given, embeddings are also written to an SQLite
+    database (WAL mode) and memory misses are looked up there, so they survive restarts and are shared by processes.
+    """
+
+    def __init__(self, model_name: str, max_size: int = 100000, filename: Optional[str] = None):
+        self.model_name = model_name
+        self.max_size = max_size
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self.conn = None
+        if filename is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+            self.conn = sqlite3.connect(filename, timeout=30, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS query_embeddings (hash TEXT PRIMARY KEY, embedding BLOB)")
+            self.conn.commit()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def _hash(self, instruction_key: str, text: str) -> str:
+        return hashlib.sha256(json.dumps([self.model_name, instruction_key, text]).encode("utf-8")).hexdigest()
+
+    def _remember(self, key: Tuple[str, str], embedding: np.ndarray):
+        # Caller holds self._lock.
+        self._lru[key] = embedding
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, instruction_key: str, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Returns the cached embeddings of those `texts` that are in memory or on disk."""
+        found, missing = {}, []
+        with self._lock:
+            for text in dict.fromkeys(texts):
+                embedding = self._lru.get((instruction_key, text))
+                if embedding is None:
+                    missing.append(text)
+                else:
+                    self._lru.move_to_end((instruction_key, text))
+                    found[text] = embedding
+            self._counters["memory_hits"] += len(found)
+
+        num_disk_hits = 0
+        if missing and self.conn is not None:
+            hash_to_text = {self._hash(instruction_key, text): text for text in missing}
+            hashes = list(hash_to_text)
+            rows = []
+            with self._lock:
+                for start in range(0, len(hashes), _MAX_QUERY_PARAMS):
+                    batch = hashes[start:start + _MAX_QUERY_PARAMS]
+                    rows.extend(self.conn.execute(
+                        f"SELECT hash, embedding FROM query_embeddings WHERE hash IN ({','.join('?' * len(batch))})", batch))
+                for hash_str, blob in rows:
+                    text = hash_to_text[hash_str]
+                    found[text] = np.frombuffer(blob, dtype=np.float32)
+                    self._remember((instruction_key, text), found[text])
+            num_disk_hits = len(rows)
+
+        with self._lock:
+            self._counters["disk_hits"] += num_disk_hits
+            self._counters["misses"] += len(missing) - num_disk_hits
+        return found
+
+    def put_many(self, instruction_key: str, texts: List[str], embeddings):
+        """Caches the embeddings of `texts` (one row of `embeddings` per text), writing them to disk in one transaction."""
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                self._remember((instruction_key, text), embedding)
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.executemany("INSERT OR REPLACE INTO query_embeddings (hash, embedding) VALUES (?, ?)",
+                                          [(self._hash(instruction_key, text), embedding.tobytes())
+                                           for text, embedding in zip(texts, embeddings)])
+
+    def view(self, instruction_key: str) -> "QueryEmbeddingView":
+        return QueryEmbeddingView(self, instruction_key)
+
+    def clear(self):
+        """Drops the in-memory entries; persisted embeddings are kept."""
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = sum(counters.values())
+        counters["hit_rate"] = (counters["memory_hits"] + counters["disk_hits"]) / lookups if lookups else 0.0
+        counters["entries"] = len(self._lru)
+        return counters
+
+
+class QueryEmbeddingView(Mapping):
+    """
+    Dict-like `{query text: embedding}` view of the entries of a `QueryEmbeddingCache` under one instruction key,
+    as used for the 'triple' and 'passage' slots of `HippoRAG.query_to_embedding`.
+    """
+
+    def __init__(self, cache: QueryEmbeddingCache, instruction_key: str):
+        self.cache = cache
+        self.instruction_key = instruction_key
+
+    def __getitem__(self, text: str) -> np.ndarray:
+        found = self.cache.get_many(self.instruction_key, [text])
+        if text not in found:
+            raise KeyError(text)
+        return found[text]
+
+    def __contains__(self, text) -> bool:
+        return text in self.cache.get_many(self.instruction_key, [text])
+
+    def __setitem__(self, text: str, embedding):
+        self.cache.put_many(self.instruction_key, [text], [embedding])
+
+    def update(self, items: Iterable[Tuple[str, np.ndarray]]):
+        items = list(items.items()) if isinstance(items, Mapping) else list(items)
+        if items:
+            texts, embeddings = zip(*items)
+            self.cache.put_many(self.instruction_key, list(texts), np.stack(embeddings))
+
+    def get_many(self, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """The cached embeddings of those `texts` that have one, looked up in one batch."""
+        return self.cache.get_many(self.instruction_key, texts)
+
+    def __iter__(self):
+        with self.cache._lock:
+            keys = list(self.cache._lru)
+        return (text for instruction_key, text in keys if instruction_key == self.instruction_key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
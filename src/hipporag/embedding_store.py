@@ -1,3 +1,4 @@
+import json
 import numpy as np
 from tqdm import tqdm
 import os
@@ -6,6 +7,8 @@ import logging
 from copy import deepcopy
 import pandas as pd
 
+from .ann_index import IVFIndex
+from .quantization import QuantizedIndex
 from .utils.misc_utils import compute_mdhash_id, NerRawOutput, TripleRawOutput
 
 logger = logging.getLogger(__name__)
@@ -39,6 +42,8 @@ class EmbeddingStore:
         self.filename = os.path.join(
             db_filename, f"vdb_{self.namespace}.parquet"
         )
+        self.ann_index = None
+        self.quantized_index = None
         self._load_data()
 
     def get_missing_string_hash_ids(self, texts: List[str]):
@@ -92,57 +97,126 @@ class EmbeddingStore:
     def _load_data(self):
         if os.path.exists(self.filename):
             df = pd.read_parquet(self.filename)
-            self.hash_ids, self.texts, self.embeddings = df["hash_id"].values.tolist(), df["content"].values.tolist(), df["embedding"].values.tolist()
-            self.hash_id_to_idx = {h: idx for idx, h in enumerate(self.hash_ids)}
-            self.hash_id_to_row = {
-                h: {"hash_id": h, "content": t}
-                for h, t in zip(self.hash_ids, self.texts)
-            }
-            self.hash_id_to_text = {h: self.texts[idx] for idx, h in enumerate(self.hash_ids)}
-            self.text_to_hash_id = {self.texts[idx]: h  for idx, h in enumerate(self.hash_ids)}
+            self.hash_ids, self.texts = df["hash_id"].values.tolist(), df["content"].values.tolist()
+            self._matrix = np.stack(df["embedding"].values).astype(np.float32, copy=False) if len(df) > 0 else None
+            self._num_rows = len(df)
+            self._rebuild_lookups()
             assert len(self.hash_ids) == len(self.texts) == len(self.embeddings)
             logger.info(f"Loaded {len(self.hash_ids)} records from {self.filename}")
         else:
-            self.hash_ids, self.texts, self.embeddings = [], [], []
-            self.hash_id_to_idx, self.hash_id_to_row = {}, {}
+            self.hash_ids, self.texts = [], []
+            self._matrix, self._num_rows = None, 0
+            self._rebuild_lookups()
+
+    def _rebuild_lookups(self):
+        self.hash_id_to_idx = {h: idx for idx, h in enumerate(self.hash_ids)}
+        self.hash_id_to_row = {h: {"hash_id": h, "content": t} for h, t in zip(self.hash_ids, self.texts)}
+        self.hash_id_to_text = {h: t for h, t in zip(self.hash_ids, self.texts)}
+        self.text_to_hash_id = {t: h for h, t in zip(self.hash_ids, self.texts)}
 
     def _save_data(self):
         data_to_save = pd.DataFrame({
             "hash_id": self.hash_ids,
             "content": self.texts,
-            "embedding": self.embeddings
+            "embedding": list(self.embeddings)
         })
         data_to_save.to_parquet(self.filename, index=False)
-        self.hash_id_to_row = {h: {"hash_id": h, "content": t} for h, t, e in zip(self.hash_ids, self.texts, self.embeddings)}
-        self.hash_id_to_idx = {h: idx for idx, h in enumerate(self.hash_ids)}
-        self.hash_id_to_text = {h: self.texts[idx] for idx, h in enumerate(self.hash_ids)}
-        self.text_to_hash_id = {self.texts[idx]: h for idx, h in enumerate(self.hash_ids)}
         logger.info(f"Saved {len(self.hash_ids)} records to {self.filename}")
 
+    @property
+    def embeddings(self) -> np.ndarray:
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._matrix[:self._num_rows]
+
+    def _append_embeddings(self, embeddings: np.ndarray):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 1:
+            embeddings = embeddings.reshape(1, -1)
+        num_new = len(embeddings)
+
+        if self._matrix is None:
+            self._matrix = np.empty((max(num_new, 1024), embeddings.shape[1]), dtype=np.float32)
+        elif self._num_rows + num_new > len(self._matrix):
+            # Amortized doubling keeps repeated small inserts from reallocating the whole matrix each time.
+            capacity = max(2 * len(self._matrix), self._num_rows + num_new)
+            matrix = np.empty((capacity, self._matrix.shape[1]), dtype=np.float32)
+            matrix[:self._num_rows] = self._matrix[:self._num_rows]
+            self._matrix = matrix
+
+        self._matrix[self._num_rows:self._num_rows + num_new] = embeddings
+        self._num_rows += num_new
+
     def _upsert(self, hash_ids, texts, embeddings):
-        self.embeddings.extend(embeddings)
-        self.hash_ids.extend(hash_ids)
-        self.texts.extend(texts)
+        self._append_embeddings(embeddings)
+        for h, t in zip(hash_ids, texts):
+            self.hash_id_to_idx[h] = len(self.hash_ids)
+            self.hash_id_to_row[h] = {"hash_id": h, "content": t}
+            self.hash_id_to_text[h] = t
+            self.text_to_hash_id[t] = h
+            self.hash_ids.append(h)
+            self.texts.append(t)
+        self._update_ann_index(num_added=len(hash_ids))
 
         logger.info(f"Saving new records.")
         self._save_data()
 
     def delete(self, hash_ids):
-        indices = []
-
-        for hash in hash_ids:
-            indices.append(self.hash_id_to_idx[hash])
-
-        sorted_indices = np.sort(indices)[::-1]
-
-        for idx in sorted_indices:
-            self.hash_ids.pop(idx)
-            self.texts.pop(idx)
-            self.embeddings.pop(idx)
+        rows = [self.hash_id_to_idx[h] for h in hash_ids]
+        keep = np.ones(len(self.hash_ids), dtype=bool)
+        keep[rows] = False
+
+        num_kept = int(keep.sum())
+        if self._matrix is not None:
+            # Compacted into a new buffer, so arrays returned by `get_embeddings` before the delete keep their values.
+            self._matrix = self._matrix[:self._num_rows][keep]
+        self._num_rows = num_kept
+        self.hash_ids = [h for h, k in zip(self.hash_ids, keep) if k]
+        self.texts = [t for t, k in zip(self.texts, keep) if k]
+        self._rebuild_lookups()
+        self._update_ann_index(removed_rows=rows)
 
         logger.info(f"Saving record after deletion.")
         self._save_data()
 
+    def attach_ann_index(self, ann_index):
+        """
+        Attaches an approximate nearest-neighbour index (e.g. `IVFIndex`) to this store. The index is loaded
+        from disk if it matches the current rows and rebuilt otherwise; afterwards every insert and delete
+        is mirrored into it and persisted.
+        """
+        self.ann_index = ann_index
+        if not ann_index.load(len(self.hash_ids)):
+            ann_index.build(self.embeddings)
+            ann_index.save()
+
+    def attach_quantized_index(self, quantized_index):
+        """
+        Attaches a `QuantizedIndex` to this store. It is built from the current rows and kept in memory only;
+        afterwards every insert and delete is mirrored into it.
+        """
+        self.quantized_index = quantized_index
+        quantized_index.build(self.embeddings)
+
+    def _appended_embeddings(self, num_added: int) -> np.ndarray:
+        """The vectors of the last `num_added` rows, without gathering the rest of the store."""
+        return self.embeddings[self._num_rows - num_added:]
+
+    def _update_ann_index(self, num_added=0, removed_rows=()):
+        # Indexes only encode the appended rows; the whole store is gathered only if one of them has to be rebuilt.
+        if self.quantized_index is not None:
+            if num_added > 0:
+                self.quantized_index.add(self._appended_embeddings(num_added), lambda: self.embeddings)
+            if len(removed_rows) > 0:
+                self.quantized_index.remove_rows(removed_rows)
+        if self.ann_index is None:
+            return
+        if num_added > 0:
+            self.ann_index.add(self._appended_embeddings(num_added), lambda: self.embeddings)
+        if len(removed_rows) > 0:
+            self.ann_index.remove_rows(removed_rows)
+        self.ann_index.save()
+
     def get_row(self, hash_id):
         return self.hash_id_to_row[hash_id]
 
@@ -169,11 +243,289 @@ class EmbeddingStore:
     def get_embedding(self, hash_id, dtype=np.float32) -> np.ndarray:
         return self.embeddings[self.hash_id_to_idx[hash_id]].astype(dtype)
     
-    def get_embeddings(self, hash_ids, dtype=np.float32) -> list[np.ndarray]:
+    def get_embeddings(self, hash_ids, dtype=np.float32) -> np.ndarray:
+        """
+        Returns the embeddings of `hash_ids` as one array. If the ids are consecutive rows in storage order (e.g.
+        `get_all_ids()`) and `dtype` matches the stored dtype, the array is a read-only view of the store instead of
+        a copy; inserts and deletes never modify the rows it covers.
+        """
         if not hash_ids:
             return []
 
         indices = np.array([self.hash_id_to_idx[h] for h in hash_ids], dtype=np.intp)
-        embeddings = np.array(self.embeddings, dtype=dtype)[indices]
+        embeddings = _take_rows(self.embeddings, indices).astype(dtype, copy=False)
+        if embeddings.base is not None and np.shares_memory(embeddings, self._matrix):
+            embeddings = embeddings.view()
+            embeddings.flags.writeable = False
+        return embeddings
+
+
+def _take_rows(matrix: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """
+    Gathers `rows` from `matrix`, returning a view instead of a copy whenever the rows form one
+    ascending contiguous run (e.g. when all ids of a store are requested in storage order).
+    """
+    if len(rows) > 0 and rows[-1] - rows[0] + 1 == len(rows) and np.all(np.diff(rows) == 1):
+        return matrix[rows[0]:rows[-1] + 1]
+    return matrix[rows]
+
+
+class MmapEmbeddingStore(EmbeddingStore):
+    """
+    Append-only variant of `EmbeddingStore` whose vectors live in a raw, memory-mapped file.
+
+    Every store generation consists of three files inside `db_filename`:
+        - `vdb_<namespace>.meta.json`: embedding dim, dtype and the current generation number.
+        - `vdb_<namespace>.<generation>.vectors`: row-major vectors, one physical row per inserted record.
+        - `vdb_<namespace>.<generation>.rows.jsonl`: the segment log. Inserts append `{"hash_id", "content"}`
+          records (one per physical row) and deletes append `{"op": "del", "hash_id"}` tombstones.
+
+    Inserts and deletes only append to these files. Once the share of tombstoned rows exceeds
+    `compaction_ratio`, live rows are rewritten into a new generation and the meta file is swapped
+    atomically. Loading only parses the segment log; vectors are paged in lazily through `np.memmap`.
+    """
+
+    def __init__(self, embedding_model, db_filename, batch_size, namespace,
+                 dtype: Literal["float32", "float16"] = "float32",
+                 compaction_ratio: float = 0.25):
+        self.dtype = np.dtype(dtype)
+        self.compaction_ratio = compaction_ratio
+        self.db_dir = db_filename
+        self.meta_filename = os.path.join(db_filename, f"vdb_{namespace}.meta.json")
+        super().__init__(embedding_model, db_filename, batch_size, namespace)
+
+    def _segment_paths(self, generation: int) -> Tuple[str, str]:
+        prefix = os.path.join(self.db_dir, f"vdb_{self.namespace}.{generation}")
+        return prefix + ".vectors", prefix + ".rows.jsonl"
+
+    def _write_meta(self):
+        tmp_filename = self.meta_filename + ".tmp"
+        with open(tmp_filename, "w") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype.name, "generation": self.generation}, f)
+        os.replace(tmp_filename, self.meta_filename)
+
+    def _map_vectors(self):
+        row_bytes = self.dtype.itemsize * (self.dim or 0)
+        num_rows = os.path.getsize(self.vectors_filename) // row_bytes if row_bytes and os.path.exists(self.vectors_filename) else 0
+
+        if num_rows == 0:
+            self._vectors = np.empty((0, self.dim or 0), dtype=self.dtype)
+        else:
+            self._vectors = np.memmap(self.vectors_filename, dtype=self.dtype, mode="r", shape=(num_rows, self.dim))
 
-        return embeddings
\ No newline at end of file
+    def _replay_log(self) -> Tuple[List[Optional[Tuple[str, str]]], List[int]]:
+        """
+        Replays the segment log: physical rows are numbered in insertion order, tombstones drop them again.
+
+        Returns the (hash_id, content) of every physical row (None once tombstoned) and the byte offset at which the
+        log record of each physical row ends. A partly written last line is cut off the log.
+        """
+        hash_id_to_phys, phys_to_row, phys_end_offsets = {}, [], []
+        if not os.path.exists(self.log_filename):
+            return phys_to_row, phys_end_offsets
+
+        offset = 0
+        with open(self.log_filename, "rb") as f:
+            for line in f:
+                # Every record is written with its trailing newline, so a line without one was cut short by a crash.
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("op") == "del":
+                    phys = hash_id_to_phys.pop(record["hash_id"], None)
+                    if phys is not None:
+                        phys_to_row[phys] = None
+                else:
+                    hash_id_to_phys[record["hash_id"]] = len(phys_to_row)
+                    phys_to_row.append((record["hash_id"], record["content"]))
+                    phys_end_offsets.append(offset)
+
+        if offset < os.path.getsize(self.log_filename):
+            logger.warning(f"Dropping a partly written record at the end of {self.log_filename}.")
+            os.truncate(self.log_filename, offset)
+        return phys_to_row, phys_end_offsets
+
+    def _load_data(self):
+        if os.path.exists(self.meta_filename):
+            with open(self.meta_filename) as f:
+                meta = json.load(f)
+            self.dim, self.generation = meta["dim"], meta["generation"]
+            if np.dtype(meta["dtype"]) != self.dtype:
+                logger.warning(f"{self.meta_filename} stores {meta['dtype']} vectors, ignoring requested dtype {self.dtype.name}.")
+                self.dtype = np.dtype(meta["dtype"])
+        else:
+            self.dim, self.generation = None, 0
+
+        self.vectors_filename, self.log_filename = self._segment_paths(self.generation)
+        phys_to_row, phys_end_offsets = self._replay_log()
+
+        # A crash between the two appends of `_upsert` leaves the vectors file and the log out of step. Both are cut
+        # back to the rows they have in common, so that the next append lines up physical rows and vectors again.
+        row_bytes = self.dtype.itemsize * (self.dim or 0)
+        vectors_size = os.path.getsize(self.vectors_filename) if os.path.exists(self.vectors_filename) else 0
+        num_vectors = vectors_size // row_bytes if row_bytes else 0
+        if len(phys_to_row) > num_vectors:
+            logger.warning(f"{self.log_filename} references {len(phys_to_row)} rows but only {num_vectors} vectors exist, truncating.")
+            phys_to_row = phys_to_row[:num_vectors]
+            os.truncate(self.log_filename, phys_end_offsets[num_vectors - 1] if num_vectors > 0 else 0)
+        if vectors_size > len(phys_to_row) * row_bytes:
+            logger.warning(f"{self.vectors_filename} holds vectors without log records, truncating to {len(phys_to_row)} rows.")
+            os.truncate(self.vectors_filename, len(phys_to_row) * row_bytes)
+        self._map_vectors()
+        self.num_physical_rows = len(phys_to_row)
+
+        live = [(phys, row) for phys, row in enumerate(phys_to_row) if row is not None]
+        self._phys_rows = np.array([phys for phys, _ in live], dtype=np.int64)
+        self.hash_ids = [row[0] for _, row in live]
+        self.texts = [row[1] for _, row in live]
+        self._rebuild_lookups()
+
+        if not os.path.exists(self.meta_filename) and os.path.exists(self.filename):
+            self._import_parquet()
+        elif self.hash_ids:
+            logger.info(f"Loaded {len(self.hash_ids)} records from {self.log_filename}")
+
+    def _import_parquet(self):
+        logger.info(f"Migrating {self.filename} into an append-only store.")
+        df = pd.read_parquet(self.filename)
+        if len(df) > 0:
+            self._upsert(df["hash_id"].values.tolist(), df["content"].values.tolist(), np.stack(df["embedding"].values))
+
+    def _save_data(self):
+        self._write_meta()
+
+    def _upsert(self, hash_ids, texts, embeddings):
+        embeddings = np.ascontiguousarray(np.asarray(embeddings), dtype=self.dtype)
+        if embeddings.ndim == 1:
+            embeddings = embeddings.reshape(len(hash_ids), -1)
+
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+            self._write_meta()
+        assert embeddings.shape == (len(hash_ids), self.dim), f"Expected embeddings of shape {(len(hash_ids), self.dim)}, got {embeddings.shape}"
+
+        # Vectors are appended before the log so that a crash never leaves log records without vectors; vectors
+        # without log records are cut off by `_load_data`.
+        with open(self.vectors_filename, "ab") as f:
+            f.write(embeddings.tobytes())
+        with open(self.log_filename, "a") as f:
+            for h, t in zip(hash_ids, texts):
+                f.write(json.dumps({"hash_id": h, "content": t}) + "\n")
+
+        new_phys_rows = np.arange(self.num_physical_rows, self.num_physical_rows + len(hash_ids), dtype=np.int64)
+        self.num_physical_rows += len(hash_ids)
+        self._phys_rows = np.concatenate([self._phys_rows, new_phys_rows])
+
+        for h, t in zip(hash_ids, texts):
+            self.hash_id_to_idx[h] = len(self.hash_ids)
+            self.hash_id_to_row[h] = {"hash_id": h, "content": t}
+            self.hash_id_to_text[h] = t
+            self.text_to_hash_id[t] = h
+            self.hash_ids.append(h)
+            self.texts.append(t)
+
+        self._map_vectors()
+        self._update_ann_index(num_added=len(hash_ids))
+        logger.info(f"Appended {len(hash_ids)} records to {self.log_filename}")
+
+    def delete(self, hash_ids):
+        hash_ids = [h for h in hash_ids if h in self.hash_id_to_idx]
+        if not hash_ids:
+            return
+
+        with open(self.log_filename, "a") as f:
+            for h in hash_ids:
+                f.write(json.dumps({"op": "del", "hash_id": h}) + "\n")
+
+        rows = [self.hash_id_to_idx[h] for h in hash_ids]
+        keep = np.ones(len(self.hash_ids), dtype=bool)
+        keep[rows] = False
+        self._phys_rows = self._phys_rows[keep]
+        self.hash_ids = [h for h, k in zip(self.hash_ids, keep) if k]
+        self.texts = [t for t, k in zip(self.texts, keep) if k]
+        self._rebuild_lookups()
+        self._update_ann_index(removed_rows=rows)
+
+        logger.info(f"Tombstoned {len(hash_ids)} records in {self.log_filename}")
+
+        num_dead = self.num_physical_rows - len(self.hash_ids)
+        if self.num_physical_rows > 0 and num_dead / self.num_physical_rows > self.compaction_ratio:
+            self.compact()
+
+    def compact(self, chunk_size: int = 65536):
+        """
+        Rewrites the live rows into a fresh generation, dropping tombstoned vectors and log records.
+        The switch to the new generation is a single atomic replace of the meta file.
+        """
+        new_generation = self.generation + 1
+        new_vectors_filename, new_log_filename = self._segment_paths(new_generation)
+
+        with open(new_vectors_filename, "wb") as f:
+            for start in range(0, len(self._phys_rows), chunk_size):
+                f.write(np.ascontiguousarray(self._vectors[self._phys_rows[start:start + chunk_size]]).tobytes())
+        with open(new_log_filename, "w") as f:
+            for h, t in zip(self.hash_ids, self.texts):
+                f.write(json.dumps({"hash_id": h, "content": t}) + "\n")
+
+        old_vectors_filename, old_log_filename = self.vectors_filename, self.log_filename
+        self.generation = new_generation
+        self._write_meta()
+
+        self.vectors_filename, self.log_filename = new_vectors_filename, new_log_filename
+        self.num_physical_rows = len(self.hash_ids)
+        self._phys_rows = np.arange(self.num_physical_rows, dtype=np.int64)
+        self._map_vectors()
+
+        for filename in (old_vectors_filename, old_log_filename):
+            if os.path.exists(filename):
+                os.remove(filename)
+        logger.info(f"Compacted {self.namespace} store to {self.num_physical_rows} records (generation {self.generation}).")
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        return _take_rows(self._vectors, self._phys_rows)
+
+    def _appended_embeddings(self, num_added: int) -> np.ndarray:
+        # Appended records always occupy the last physical rows, so this is a slice of the memory map.
+        return self._vectors[self.num_physical_rows - num_added:self.num_physical_rows]
+
+    def get_embedding(self, hash_id, dtype=np.float32) -> np.ndarray:
+        return self._vectors[self._phys_rows[self.hash_id_to_idx[hash_id]]].astype(dtype, copy=False)
+
+    def get_embeddings(self, hash_ids, dtype=np.float32) -> np.ndarray:
+        if not hash_ids:
+            return []
+
+        indices = np.array([self.hash_id_to_idx[h] for h in hash_ids], dtype=np.intp)
+        return _take_rows(self._vectors, self._phys_rows[indices]).astype(dtype, copy=False)
+
+
+def _get_embedding_store(global_config, embedding_model, db_filename, namespace) -> EmbeddingStore:
+    if global_config.embedding_store_backend == "mmap":
+        store = MmapEmbeddingStore(embedding_model, db_filename, global_config.embedding_batch_size, namespace,
+                                   dtype=global_config.embedding_store_dtype,
+                                   compaction_ratio=global_config.embedding_store_compaction_ratio)
+    else:
+        store = EmbeddingStore(embedding_model, db_filename, global_config.embedding_batch_size, namespace)
+
+    if global_config.retrieval_search_mode == "ann":
+        store.attach_ann_index(IVFIndex(os.path.join(db_filename, f"vdb_{namespace}.ivf.npz"),
+                                        nlist=global_config.ann_nlist,
+                                        nprobe=global_config.ann_nprobe))
+
+    quantized_index = _get_quantized_index(global_config, namespace)
+    if quantized_index is not None:
+        store.attach_quantized_index(quantized_index)
+    return store
+
+
+def _get_quantized_index(global_config, namespace) -> Optional[QuantizedIndex]:
+    """The `QuantizedIndex` configured for the chunk or fact store, if any. Only exact search uses it."""
+    mode = {"chunk": global_config.passage_embedding_quantization,
+            "fact": global_config.fact_embedding_quantization}.get(namespace, "none")
+    if mode == "none" or global_config.retrieval_search_mode != "exact":
+        return None
+    return QuantizedIndex(mode, rescore_k=global_config.quantization_rescore_k)
@@ -0,0 +1,117 @@
+import os
+import logging
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _pack_strings(strings: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Packs strings into one utf-8 byte buffer and an offsets array, which is far more compact than a fixed-width unicode array."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(buffer: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = buffer.tobytes()
+    offsets = offsets.tolist()
+    return [data[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+class CSRMapping(Mapping):
+    """
+    Read-only `Dict[str, Set[str]]` stored in CSR form: the values of the i-th key are
+    `values[indices[indptr[i]:indptr[i + 1]]]`. Keys and values are only decoded from their packed utf-8 buffers
+    when first accessed.
+    """
+
+    def __init__(self, keys: Tuple[np.ndarray, np.ndarray], values: Tuple[np.ndarray, np.ndarray], indptr: np.ndarray, indices: np.ndarray):
+        self._packed_keys, self._packed_values = keys, values
+        self.indptr, self.indices = indptr, indices
+        self._keys, self._key_to_row, self._values = None, None, None
+
+    @property
+    def keys_list(self) -> List[str]:
+        if self._keys is None:
+            self._keys = _unpack_strings(*self._packed_keys)
+            self._key_to_row = {key: row for row, key in enumerate(self._keys)}
+        return self._keys
+
+    def __getitem__(self, key: str) -> Set[str]:
+        self.keys_list
+        row = self._key_to_row[key]
+        if self._values is None:
+            self._values = np.array(_unpack_strings(*self._packed_values), dtype=object)
+        return set(self._values[self.indices[self.indptr[row]:self.indptr[row + 1]]].tolist())
+
+    def __contains__(self, key) -> bool:
+        self.keys_list
+        return key in self._key_to_row
+
+    def __iter__(self):
+        return iter(self.keys_list)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def value_counts(self) -> Dict[str, int]:
+        """Number of values of every key, without decoding the values."""
+        return dict(zip(self.keys_list, np.diff(self.indptr).tolist()))
+
+    @classmethod
+    def from_dict(cls, mapping: Dict[str, Set[str]]) -> "CSRMapping":
+        value_to_id = {}
+        indptr = np.zeros(len(mapping) + 1, dtype=np.int64)
+        indices = []
+        for row, values in enumerate(mapping.values()):
+            indices.extend(value_to_id.setdefault(value, len(value_to_id)) for value in values)
+            indptr[row + 1] = len(indices)
+        return cls(_pack_strings(mapping.keys()), _pack_strings(value_to_id.keys()), indptr, np.asarray(indices, dtype=np.int32))
+
+
+def save_graph_state(filename: str, fingerprint: str, ent_node_to_chunk_ids: Dict[str, Set[str]], proc_triples_to_docs: Dict[str, Set[str]]):
+    """
+    Persists the chunk membership of entity nodes and of processed triples as CSR arrays, tagged with the fingerprint
+    of the OpenIE results they were derived from.
+    """
+    arrays = {"fingerprint": np.array(fingerprint)}
+    for name, mapping in [("ent_node_to_chunk_ids", ent_node_to_chunk_ids), ("proc_triples_to_docs", proc_triples_to_docs)]:
+        if not isinstance(mapping, CSRMapping):
+            mapping = CSRMapping.from_dict(mapping)
+        arrays[f"{name}.keys"], arrays[f"{name}.key_offsets"] = mapping._packed_keys
+        arrays[f"{name}.values"], arrays[f"{name}.value_offsets"] = mapping._packed_values
+        arrays[f"{name}.indptr"], arrays[f"{name}.indices"] = mapping.indptr, mapping.indices
+
+    tmp_filename = filename + ".tmp.npz"
+    np.savez(tmp_filename, **arrays)
+    os.replace(tmp_filename, filename)
+
+
+def load_graph_state(filename: str, fingerprint: str) -> Optional[Tuple[CSRMapping, CSRMapping]]:
+    """
+    Loads the mappings saved by `save_graph_state`.
+
+    Returns:
+        Optional[Tuple[CSRMapping, CSRMapping]]: `ent_node_to_chunk_ids` and `proc_triples_to_docs`, or None if the file
+        is missing or was derived from different OpenIE results.
+    """
+    if not os.path.exists(filename):
+        return None
+
+    with np.load(filename) as data:
+        if str(data["fingerprint"]) != fingerprint:
+            logger.info(f"Graph state {filename} is out of date with the OpenIE results, rebuilding.")
+            return None
+
+        mappings = []
+        for name in ["ent_node_to_chunk_ids", "proc_triples_to_docs"]:
+            mappings.append(CSRMapping(keys=(data[f"{name}.keys"], data[f"{name}.key_offsets"]),
+                                       values=(data[f"{name}.values"], data[f"{name}.value_offsets"]),
+                                       indptr=data[f"{name}.indptr"],
+                                       indices=data[f"{name}.indices"]))
+
+    return mappings[0], mappings[1]
@@ -1,15 +1,18 @@
+import asyncio
 import json
+import os
 import re
-from dataclasses import dataclass
-from typing import Dict, Any, List, TypedDict, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, TypedDict, Tuple, Optional, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from tqdm import tqdm
 
 from ..prompts import PromptTemplateManager
 from ..utils.logging_utils import get_logger
 from ..utils.llm_utils import fix_broken_generated_json, filter_invalid_triples
 from ..utils.misc_utils import TripleRawOutput, NerRawOutput
-from ..llm.openai_gpt import CacheOpenAI
+from ..llm.openai_gpt import CacheOpenAI, AsyncCacheOpenAI
 
 logger = get_logger(__name__)
 
@@ -27,6 +30,50 @@ class LLMInput:
     input_message: List[Dict]
 
 
+@dataclass
+class StageMetrics:
+    """Progress and throughput of one OpenIE stage in `OpenIE.batch_openie`."""
+    name: str
+    num_done: int = 0
+    num_errors: int = 0
+    num_cache_hit: int = 0
+    total_prompt_tokens: int = 0
+    total_completion_tokens: int = 0
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
+
+    def update(self, result: Union[NerRawOutput, TripleRawOutput]):
+        metadata = result.metadata
+        self.num_done += 1
+        self.num_errors += int('error' in metadata)
+        self.num_cache_hit += int(bool(metadata.get('cache_hit')))
+        self.total_prompt_tokens += metadata.get('prompt_tokens', 0)
+        self.total_completion_tokens += metadata.get('completion_tokens', 0)
+        self.end_time = time.time()
+
+    @property
+    def throughput(self) -> float:
+        """Chunks per second between the first submission and the last completion of the stage."""
+        if self.start_time is None or self.end_time is None or self.end_time <= self.start_time:
+            return 0.0
+        return self.num_done / (self.end_time - self.start_time)
+
+    def postfix(self) -> Dict[str, Any]:
+        return {
+            'total_prompt_tokens': self.total_prompt_tokens,
+            'total_completion_tokens': self.total_completion_tokens,
+            'num_cache_hit': self.num_cache_hit,
+            'chunks/s': round(self.throughput, 2)
+        }
+
+
+def _log_stage_metrics(metrics: Dict[str, StageMetrics]):
+    for stage_metrics in metrics.values():
+        logger.info(f"{stage_metrics.name}: {stage_metrics.num_done} chunks at {stage_metrics.throughput:.2f} chunks/s, "
+                    f"{stage_metrics.num_errors} errors, {stage_metrics.num_cache_hit} cache hits, "
+                    f"{stage_metrics.total_prompt_tokens} prompt tokens, {stage_metrics.total_completion_tokens} completion tokens")
+
+
 def _extract_ner_from_response(real_response):
     pattern = r'\{[^{}]*"named_entities"\s*:\s*\[[^\]]*\][^{}]*\}'
     match = re.search(pattern, real_response, re.DOTALL)
@@ -37,21 +84,42 @@ def _extract_ner_from_response(real_response):
 
 
 class OpenIE:
-    def __init__(self, llm_model: CacheOpenAI):
+    def __init__(self, llm_model: CacheOpenAI, pipelined: bool = False, ner_workers: Optional[int] = None,
+                 triple_workers: Optional[int] = None, max_in_flight: Optional[int] = None):
+        """
+        Args:
+            llm_model: The LLM used for both NER and triple extraction.
+            pipelined: If True, `batch_openie` submits the triple extraction of each chunk as soon as its NER is
+                done instead of waiting for the NER of all chunks. An `AsyncCacheOpenAI` model is always pipelined,
+                see `batch_openie_async`, and ignores the worker settings below.
+            ner_workers: Number of threads running NER calls in pipelined mode.
+            triple_workers: Number of threads running triple extraction calls in pipelined mode.
+            max_in_flight: Max number of chunks admitted into the pipeline whose triple extraction has not
+                finished yet. Defaults to twice the total number of workers.
+        """
         # Init prompt template manager
         self.prompt_template_manager = PromptTemplateManager(role_mapping={"system": "system", "user": "user", "assistant": "assistant"})
         self.llm_model = llm_model
 
-    def ner(self, chunk_key: str, passage: str) -> NerRawOutput:
-        # PREPROCESSING
-        ner_input_message = self.prompt_template_manager.render(name='ner', passage=passage)
+        # Same default as ThreadPoolExecutor's max_workers.
+        default_workers = min(32, (os.cpu_count() or 1) + 4)
+        self.pipelined = pipelined
+        self.ner_workers = ner_workers or default_workers
+        self.triple_workers = triple_workers or default_workers
+        self.max_in_flight = max_in_flight or 2 * (self.ner_workers + self.triple_workers)
+        self.last_batch_metrics: Dict[str, StageMetrics] = {}
+
+    def _ner_messages(self, passage: str) -> List[Dict]:
+        return self.prompt_template_manager.render(name='ner', passage=passage)
+
+    def _ner_output(self, chunk_key: str, response: Union[Tuple[str, dict, bool], Exception]) -> NerRawOutput:
+        """Parses the result of the NER call of a chunk, or the exception it raised."""
         raw_response = ""
         metadata = {}
         try:
-            # LLM INFERENCE
-            raw_response, metadata, cache_hit = self.llm_model.infer(
-                messages=ner_input_message,
-            )
+            if isinstance(response, Exception):
+                raise response
+            raw_response, metadata, cache_hit = response
             metadata['cache_hit'] = cache_hit
             if metadata['finish_reason'] == 'length':
                 real_response = fix_broken_generated_json(raw_response)
@@ -78,7 +146,35 @@ class OpenIE:
             metadata=metadata
         )
 
-    def triple_extraction(self, chunk_key: str, passage: str, named_entities: List[str]) -> TripleRawOutput:
+    def ner(self, chunk_key: str, passage: str) -> NerRawOutput:
+        # PREPROCESSING
+        ner_input_message = self._ner_messages(passage)
+        try:
+            # LLM INFERENCE
+            response = self.llm_model.infer(
+                messages=ner_input_message,
+            )
+        except Exception as e:
+            response = e
+        return self._ner_output(chunk_key, response)
+
+    async def ainer(self, chunk_key: str, passage: str) -> NerRawOutput:
+        """Same as `ner`, for an `AsyncCacheOpenAI` model."""
+        try:
+            response = await self.llm_model.ainfer(messages=self._ner_messages(passage))
+        except Exception as e:
+            response = e
+        return self._ner_output(chunk_key, response)
+
+    def _triple_extraction_messages(self, passage: str, named_entities: List[str]) -> List[Dict]:
+        return self.prompt_template_manager.render(
+            name='triple_extraction',
+            passage=passage,
+            named_entity_json=json.dumps({"named_entities": named_entities})
+        )
+
+    def _triple_extraction_output(self, chunk_key: str, response: Union[Tuple[str, dict, bool], Exception]) -> TripleRawOutput:
+        """Parses the result of the triple extraction call of a chunk, or the exception it raised."""
         def _extract_triples_from_response(real_response):
             pattern = r'\{[^{}]*"triples"\s*:\s*\[[^\]]*\][^{}]*\}'
             match = re.search(pattern, real_response, re.DOTALL)
@@ -87,20 +183,12 @@ class OpenIE:
                 return []
             return eval(match.group())["triples"]
 
-        # PREPROCESSING
-        messages = self.prompt_template_manager.render(
-            name='triple_extraction',
-            passage=passage,
-            named_entity_json=json.dumps({"named_entities": named_entities})
-        )
-
         raw_response = ""
         metadata = {}
         try:
-            # LLM INFERENCE
-            raw_response, metadata, cache_hit = self.llm_model.infer(
-                messages=messages,
-            )
+            if isinstance(response, Exception):
+                raise response
+            raw_response, metadata, cache_hit = response
             metadata['cache_hit'] = cache_hit
             if metadata['finish_reason'] == 'length':
                 real_response = fix_broken_generated_json(raw_response)
@@ -127,6 +215,26 @@ class OpenIE:
             triples=triplets
         )
 
+    def triple_extraction(self, chunk_key: str, passage: str, named_entities: List[str]) -> TripleRawOutput:
+        # PREPROCESSING
+        messages = self._triple_extraction_messages(passage, named_entities)
+        try:
+            # LLM INFERENCE
+            response = self.llm_model.infer(
+                messages=messages,
+            )
+        except Exception as e:
+            response = e
+        return self._triple_extraction_output(chunk_key, response)
+
+    async def atriple_extraction(self, chunk_key: str, passage: str, named_entities: List[str]) -> TripleRawOutput:
+        """Same as `triple_extraction`, for an `AsyncCacheOpenAI` model."""
+        try:
+            response = await self.llm_model.ainfer(messages=self._triple_extraction_messages(passage, named_entities))
+        except Exception as e:
+            response = e
+        return self._triple_extraction_output(chunk_key, response)
+
     def openie(self, chunk_key: str, passage: str) -> Dict[str, Any]:
         ner_output = self.ner(chunk_key=chunk_key, passage=passage)
         triple_output = self.triple_extraction(chunk_key=chunk_key, passage=passage, named_entities=ner_output.unique_entities)
@@ -149,6 +257,11 @@ class OpenIE:
         # Extract passages from the provided chunks
         chunk_passages = {chunk_key: chunk["content"] for chunk_key, chunk in chunks.items()}
 
+        if isinstance(self.llm_model, AsyncCacheOpenAI):
+            return self.batch_openie_async(chunk_passages)
+        if self.pipelined:
+            return self.batch_openie_pipelined(chunk_passages)
+
         ner_results_list = []
         total_prompt_tokens = 0
         total_completion_tokens = 0
@@ -208,3 +321,113 @@ class OpenIE:
         triple_results_dict = {res.chunk_id: res for res in triple_results_list}
 
         return ner_results_dict, triple_results_dict
+
+    def batch_openie_pipelined(self, chunk_passages: Dict[str, str]) -> Tuple[Dict[str, NerRawOutput], Dict[str, TripleRawOutput]]:
+        """
+        Pipelined variant of `batch_openie`: each chunk's triple extraction is submitted as soon as its NER
+        completes, so a slow NER call only delays its own chunk. NER and triple extraction run in separate thread
+        pools of `ner_workers` and `triple_workers` threads, and at most `max_in_flight` chunks are between the
+        start of their NER and the end of their triple extraction at any time. Per-stage metrics are shown on
+        the progress bars, logged at the end and kept in `last_batch_metrics`.
+
+        Args:
+            chunk_passages (Dict[str, str]): Passage of each chunk id.
+
+        Returns:
+            Tuple[Dict[str, NerRawOutput], Dict[str, TripleRawOutput]]: Same as `batch_openie`.
+        """
+        ner_results_dict, triple_results_dict = {}, {}
+        metrics = {'ner': StageMetrics(name='NER'), 'triples': StageMetrics(name='Extracting triples')}
+        self.last_batch_metrics = metrics
+
+        pending_chunks = iter(chunk_passages.items())
+        in_flight = {}  # future -> (stage, chunk_key)
+
+        ner_pbar = tqdm(total=len(chunk_passages), desc="NER", position=0)
+        triple_pbar = tqdm(total=len(chunk_passages), desc="Extracting triples", position=1)
+
+        with ThreadPoolExecutor(max_workers=self.ner_workers) as ner_executor, \
+                ThreadPoolExecutor(max_workers=self.triple_workers) as triple_executor:
+
+            def admit_chunks():
+                # Chunks stay admitted until their triple extraction finishes, which bounds the in-flight window.
+                while len(in_flight) < self.max_in_flight:
+                    next_chunk = next(pending_chunks, None)
+                    if next_chunk is None:
+                        return
+                    chunk_key, passage = next_chunk
+                    in_flight[ner_executor.submit(self.ner, chunk_key, passage)] = ('ner', chunk_key)
+
+            metrics['ner'].start_time = time.time()
+            admit_chunks()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, chunk_key = in_flight.pop(future)
+                    result = future.result()
+                    metrics[stage].update(result)
+
+                    if stage == 'ner':
+                        ner_results_dict[chunk_key] = result
+                        if metrics['triples'].start_time is None:
+                            metrics['triples'].start_time = time.time()
+                        in_flight[triple_executor.submit(self.triple_extraction, chunk_key, chunk_passages[chunk_key],
+                                                         result.unique_entities)] = ('triples', chunk_key)
+                        ner_pbar.update(1)
+                        ner_pbar.set_postfix(metrics['ner'].postfix())
+                    else:
+                        triple_results_dict[chunk_key] = result
+                        triple_pbar.update(1)
+                        triple_pbar.set_postfix(metrics['triples'].postfix())
+                admit_chunks()
+
+        ner_pbar.close()
+        triple_pbar.close()
+        _log_stage_metrics(metrics)
+
+        return ner_results_dict, triple_results_dict
+
+    def batch_openie_async(self, chunk_passages: Dict[str, str]) -> Tuple[Dict[str, NerRawOutput], Dict[str, TripleRawOutput]]:
+        """
+        Variant of `batch_openie` for an `AsyncCacheOpenAI` model: NER and then triple extraction of each chunk run
+        as one coroutine on the event loop of the model, so chunks are pipelined like in `batch_openie_pipelined`
+        and the number of concurrent requests is bounded by the model's concurrency and rate limits instead of
+        thread pools. Per-stage metrics are kept in `last_batch_metrics`.
+
+        Args:
+            chunk_passages (Dict[str, str]): Passage of each chunk id.
+
+        Returns:
+            Tuple[Dict[str, NerRawOutput], Dict[str, TripleRawOutput]]: Same as `batch_openie`.
+        """
+        ner_results_dict, triple_results_dict = {}, {}
+        metrics = {'ner': StageMetrics(name='NER'), 'triples': StageMetrics(name='Extracting triples')}
+        self.last_batch_metrics = metrics
+
+        ner_pbar = tqdm(total=len(chunk_passages), desc="NER", position=0)
+        triple_pbar = tqdm(total=len(chunk_passages), desc="Extracting triples", position=1)
+
+        async def process_chunk(chunk_key, passage):
+            ner_result = await self.ainer(chunk_key, passage)
+            ner_results_dict[chunk_key] = ner_result
+            metrics['ner'].update(ner_result)
+            ner_pbar.update(1)
+            ner_pbar.set_postfix(metrics['ner'].postfix())
+
+            triple_result = await self.atriple_extraction(chunk_key, passage, ner_result.unique_entities)
+            triple_results_dict[chunk_key] = triple_result
+            metrics['triples'].update(triple_result)
+            triple_pbar.update(1)
+            triple_pbar.set_postfix(metrics['triples'].postfix())
+
+        async def process_all():
+            await asyncio.gather(*(process_chunk(chunk_key, passage) for chunk_key, passage in chunk_passages.items()))
+
+        metrics['ner'].start_time = metrics['triples'].start_time = time.time()
+        self.llm_model.run(process_all())
+
+        ner_pbar.close()
+        triple_pbar.close()
+        _log_stage_metrics(metrics)
+
+        return ner_results_dict, triple_results_dict
@@ -2,7 +2,7 @@ import json
 import re
 import logging
 from dataclasses import dataclass
-from typing import Dict, Any, List, TypedDict, Tuple, Optional, Set
+from typing import Dict, Any, List, TypedDict, Tuple, Optional, Set, Union
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
@@ -16,7 +16,7 @@ except ImportError:
 from ..prompts.prompt_template_manager import PromptTemplateManager
 from ..utils.logging_utils import get_logger
 from ..utils.misc_utils import TripleRawOutput, compute_mdhash_id
-from ..llm.openai_gpt import CacheOpenAI
+from ..llm.openai_gpt import CacheOpenAI, AsyncCacheOpenAI
 
 logger = get_logger(__name__)
 
@@ -58,6 +58,27 @@ class TableTripleExtractor:
             TripleRawOutput: 包含提取结果的数据结构
         """
         
+        prepared = self._prepare_table_extraction(table_html, table_context)
+
+        try:
+            # 调用LLM进行三元组提取
+            logger.info(f"正在从表格提取三元组...")
+            response = self.llm_model.infer(
+                messages=prepared['messages'],
+                temperature=0.1
+            )
+        except Exception as e:
+            response = e
+
+        return self._finish_table_extraction(table_html, prepared, response, chunk_id)
+
+    def _prepare_table_extraction(self, table_html: str, table_context: str = "") -> Dict[str, Any]:
+        """
+        构建表格三元组提取的LLM输入（调用LLM之前的全部预处理）
+        
+        Returns:
+            包含 messages、table_metadata 和 enhanced_context 的字典
+        """
         # 提取表格元数据
         logger.debug("提取表格元数据")
         table_metadata = self._extract_table_metadata(table_html)
@@ -75,12 +96,28 @@ class TableTripleExtractor:
             context=enhanced_context,
             table_html=simplified_table
         )
-        
+
+        return {
+            'messages': table_extraction_input,
+            'table_metadata': table_metadata,
+            'enhanced_context': enhanced_context
+        }
+
+    def _finish_table_extraction(self, table_html: str, prepared: Dict[str, Any],
+                                 response: Union[Tuple[str, dict, bool], Exception],
+                                 chunk_id: Optional[str] = None) -> TripleRawOutput:
+        """
+        解析LLM响应（或调用时抛出的异常）并完成三元组后处理
+        """
+        table_metadata = prepared['table_metadata']
         raw_response = ""
         metadata = {}
         triples = []
         
         try:
+            if isinstance(response, Exception):
+                raise response
+
             # 预先解析表格文本（用于后处理验证，避免重复解析）
             logger.debug("解析表格文本用于后处理")
             try:
@@ -92,12 +129,7 @@ class TableTripleExtractor:
             except Exception:
                 table_text = table_html.lower()
 
-            # 调用LLM进行三元组提取
-            logger.info(f"正在从表格提取三元组...")
-            response_message, metadata, _ = self.llm_model.infer(
-                messages=table_extraction_input,
-                temperature=0.1
-            )
+            response_message, metadata, _ = response
             raw_response = response_message
 
             # 解析LLM输出的三元组
@@ -121,7 +153,7 @@ class TableTripleExtractor:
         # 将表格元数据添加到最终metadata中
         metadata.update({
             'table_metadata': table_metadata,
-            'enhanced_context': enhanced_context
+            'enhanced_context': prepared['enhanced_context']
         })
 
         return TripleRawOutput(
@@ -457,6 +489,18 @@ class TableTripleExtractor:
 
         results: List[Optional[TripleRawOutput]] = [None] * total
 
+        if isinstance(self.llm_model, AsyncCacheOpenAI):
+            # 异步客户端：预处理与后处理在当前线程完成，LLM请求在客户端事件循环上并发执行（并发度与限速由客户端控制）
+            prepared = [self._prepare_table_extraction(info['content'], info.get('context', '')) for info in table_infos]
+            responses = self.llm_model.run(self.llm_model.batch_ainfer(
+                [p['messages'] for p in prepared],
+                desc="提取表格三元组" if show_progress else None,
+                return_exceptions=True,
+                temperature=0.1
+            ))
+            return [self._finish_table_extraction(info['content'], p, response, info.get('chunk_id'))
+                    for info, p, response in zip(table_infos, prepared, responses)]
+
         def _process_one(idx: int, info: TableTripleInfo) -> Tuple[int, TripleRawOutput]:
             res = self.extract_triples_from_table(
                 table_html=info['content'],
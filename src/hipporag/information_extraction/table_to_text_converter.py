@@ -1,7 +1,9 @@
 import re
+import time
+import asyncio
 import logging
 from dataclasses import dataclass
-from typing import Dict, Any, List, TypedDict, Tuple, Optional
+from typing import Dict, Any, List, TypedDict, Tuple, Optional, Union
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
@@ -15,7 +17,7 @@ except ImportError:
 from ..prompts.prompt_template_manager import PromptTemplateManager
 from ..utils.logging_utils import get_logger
 from ..utils.misc_utils import compute_mdhash_id
-from ..llm.openai_gpt import CacheOpenAI
+from ..llm.openai_gpt import CacheOpenAI, AsyncCacheOpenAI
 
 logger = get_logger(__name__)
 
@@ -144,24 +146,61 @@ class TableToTextConverter:
         logger.info(f"转换表格 {chunk_id}")
         
         # 转换开始时间
-        import time
         start_time = time.time()
         
         try:
             # 构建输入消息
-            conversion_input = self.prompt_template_manager.render(
-                name='table_to_text',
-                context=table_context if table_context else "无额外上下文",
-                table_html=table_html
-            )
+            conversion_input = self._conversion_messages(table_html, table_context)
             
             # 调用LLM进行文本转换
             logger.info(f"正在将表格转换为文本描述...")
-            response_message, _, _ = self.llm_model.infer(
+            response = self.llm_model.infer(
                 messages=conversion_input,
                 temperature=0.3,
                 response_format=None  # 确保使用文本格式而不是JSON格式
             )
+        except Exception as e:
+            response = e
+
+        return self._conversion_output(table_html, chunk_id, response, start_time)
+
+    async def aconvert_table_to_text(self, table_html: str, table_context: str = "",
+                                     chunk_id: Optional[str] = None) -> TableTextOutput:
+        """
+        convert_table_to_text 的异步版本，需配合 AsyncCacheOpenAI 使用
+        """
+        if not chunk_id:
+            chunk_id = compute_mdhash_id(table_html, prefix="table-")
+
+        start_time = time.time()
+
+        try:
+            response = await self.llm_model.ainfer(
+                messages=self._conversion_messages(table_html, table_context),
+                temperature=0.3,
+                response_format=None  # 确保使用文本格式而不是JSON格式
+            )
+        except Exception as e:
+            response = e
+
+        return self._conversion_output(table_html, chunk_id, response, start_time)
+
+    def _conversion_messages(self, table_html: str, table_context: str = "") -> List[Dict]:
+        return self.prompt_template_manager.render(
+            name='table_to_text',
+            context=table_context if table_context else "无额外上下文",
+            table_html=table_html
+        )
+
+    def _conversion_output(self, table_html: str, chunk_id: str,
+                           response: Union[Tuple[str, dict, bool], Exception], start_time: float) -> TableTextOutput:
+        """
+        根据LLM响应（或调用时抛出的异常）生成转换结果
+        """
+        try:
+            if isinstance(response, Exception):
+                raise response
+            response_message, _, _ = response
             
             text_description = response_message.strip()
             
@@ -249,6 +288,28 @@ class TableToTextConverter:
     
     
     
+    async def _aconvert_batch_tables(self, table_infos: List[TableConversionInfo],
+                                     show_progress: bool = True) -> List[TableTextOutput]:
+        """
+        convert_batch_tables 的异步实现，按输入顺序返回 aconvert_table_to_text 的结果
+        """
+        pbar = tqdm(total=len(table_infos), desc="转换表格为文本", unit="table", disable=not show_progress)
+
+        async def _aprocess_one(info: TableConversionInfo) -> TableTextOutput:
+            try:
+                return await self.aconvert_table_to_text(
+                    table_html=info['content'],
+                    table_context=info.get('context', ''),
+                    chunk_id=info.get('chunk_id')
+                )
+            finally:
+                pbar.update(1)
+
+        try:
+            return await asyncio.gather(*(_aprocess_one(info) for info in table_infos))
+        finally:
+            pbar.close()
+
     def convert_batch_tables(self, table_infos: List[TableConversionInfo], 
                            max_workers: Optional[int] = None, 
                            show_progress: bool = True) -> List[TableTextOutput]:
@@ -287,42 +348,35 @@ class TableToTextConverter:
             )
             return idx, res
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(_process_one, i, info): i for i, info in enumerate(table_infos)}
-            pbar = tqdm(total=total, desc="转换表格为文本", unit="table", disable=not show_progress)
-            
-            for future in as_completed(futures):
-                try:
-                    idx, res = future.result()
-                    results[idx] = res
-                    
-                    # 更新统计信息
-                    if res.text_chunks:
-                        success_count += 1
-                        total_chunks += len(res.text_chunks)
-                        if 'timing' in res.metadata:
-                            total_conversion_time += res.metadata['timing'].get('total_time', 0)
-                    else:
-                        error_count += 1
-                        
-                except Exception as e:
-                    idx = futures[future]
-                    error_count += 1
-                    logger.warning(f"第 {idx+1} 个表格转换失败: {e}")
-                    # 创建错误结果
-                    fallback_chunk_id = table_infos[idx].get('chunk_id') or compute_mdhash_id(
-                        table_infos[idx]['content'], prefix="table-")
-                    results[idx] = TableTextOutput(
-                        chunk_id=fallback_chunk_id,
-                        original_table=table_infos[idx]['content'],
-                        text_description=f"转换失败: {str(e)}",
-                        text_chunks=[],
-                        chunk_ids=[],
-                        metadata={'error': str(e)}
-                    )
-                finally:
-                    pbar.update(1)
-            pbar.close()
+        if isinstance(self.llm_model, AsyncCacheOpenAI):
+            # 异步客户端：在客户端事件循环上并发执行（并发度与限速由客户端控制），每个表格各自计时
+            results = self.llm_model.run(self._aconvert_batch_tables(table_infos, show_progress))
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(_process_one, i, info): i for i, info in enumerate(table_infos)}
+                pbar = tqdm(total=total, desc="转换表格为文本", unit="table", disable=not show_progress)
+
+                for future in as_completed(futures):
+                    try:
+                        idx, res = future.result()
+                        results[idx] = res
+                    except Exception as e:
+                        idx = futures[future]
+                        logger.warning(f"第 {idx+1} 个表格转换失败: {e}")
+                        # 创建错误结果
+                        fallback_chunk_id = table_infos[idx].get('chunk_id') or compute_mdhash_id(
+                            table_infos[idx]['content'], prefix="table-")
+                        results[idx] = TableTextOutput(
+                            chunk_id=fallback_chunk_id,
+                            original_table=table_infos[idx]['content'],
+                            text_description=f"转换失败: {str(e)}",
+                            text_chunks=[],
+                            chunk_ids=[],
+                            metadata={'error': str(e)}
+                        )
+                    finally:
+                        pbar.update(1)
+                pbar.close()
 
         # 确保所有结果都有效
         finalized_results: List[TableTextOutput] = []
@@ -338,9 +392,17 @@ class TableToTextConverter:
                     chunk_ids=[],
                     metadata={'error': 'Unknown Error'}
                 )
-                error_count += 1
             finalized_results.append(r)
 
+            # 更新统计信息
+            if r.text_chunks:
+                success_count += 1
+                total_chunks += len(r.text_chunks)
+                if 'timing' in r.metadata:
+                    total_conversion_time += r.metadata['timing'].get('total_time', 0)
+            else:
+                error_count += 1
+
         # 计算和记录统计信息
         total_time = time.time() - start_time
         avg_time_per_table = total_conversion_time / success_count if success_count > 0 else 0
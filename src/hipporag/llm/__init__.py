@@ -1,22 +1,41 @@
 import os
+import sys
 
 from ..utils.logging_utils import get_logger
 from ..utils.config_utils import BaseConfig
 
-from .openai_gpt import CacheOpenAI
+from .openai_gpt import CacheOpenAI, AsyncCacheOpenAI
 from .base import BaseLLM
-from .bedrock_llm import BedrockLLM
 
 
 logger = get_logger(__name__)
 
 
+def __getattr__(name: str):
+    # BedrockLLM pulls in litellm, so it is only imported when asked for.
+    if name == "BedrockLLM":
+        from .bedrock_llm import BedrockLLM
+        return BedrockLLM
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def is_vllm_offline(llm_model) -> bool:
+    """Whether `llm_model` is a `VLLMOffline`, checked without importing vllm, which is optional."""
+    # An instance implies that its module is already loaded.
+    vllm_offline = sys.modules.get(f"{__name__}.vllm_offline")
+    return vllm_offline is not None and isinstance(llm_model, vllm_offline.VLLMOffline)
+
+
 def _get_llm_class(config: BaseConfig):
     if config.llm_base_url is not None and 'localhost' in config.llm_base_url and os.getenv('OPENAI_API_KEY') is None:
         os.environ['OPENAI_API_KEY'] = 'sk-'
 
     if config.llm_name.startswith('bedrock'):
+        from .bedrock_llm import BedrockLLM
         return BedrockLLM(config)
+
+    if config.llm_async:
+        return AsyncCacheOpenAI.from_experiment_config(config)
     
     return CacheOpenAI.from_experiment_config(config)
     
\ No newline at end of file
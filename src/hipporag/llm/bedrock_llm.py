@@ -1,15 +1,13 @@
 import os
 from typing import List, Tuple
 from copy import deepcopy
-import sqlite3
-import json
 import time
 import hashlib
 
 import litellm
-from filelock import FileLock
 
 from .base import BaseLLM, LLMConfig
+from .cache import get_response_cache
 from ..utils.llm_utils import TextChatMessage
 from ..utils.logging_utils import get_logger
 
@@ -21,46 +19,17 @@ class LLM_Cache:
     def __init__(self, cache_dir: str, cache_filename):
         os.makedirs(cache_dir, exist_ok=True)
         self.cache_filepath =  os.path.join(cache_dir, f"{cache_filename}.sqlite")
-        self.lock_file = self.cache_filepath + ".lock"
-
-        self.__db_operation("""
-            CREATE TABLE IF NOT EXISTS cache (
-                key TEXT PRIMARY KEY,
-                message TEXT,
-                metadata TEXT
-            )
-        """, commit=True)
-    
-    def __db_operation(self, sql, parameters=(), commit=False, fetchone=False):
-        with FileLock(self.lock_file):
-            conn = sqlite3.connect(self.cache_filepath)
-            c = conn.cursor()
-            c.execute(sql, parameters)
-            if commit:
-                conn.commit()
-            if fetchone:
-                row = c.fetchone()
-            conn.close()
-            if fetchone:
-                return row
+        self.response_cache = get_response_cache(self.cache_filepath)
 
     def __params_to_key(self, params):
         key_str = f"Model: {params['model']}, Temperature: {params['temperature']}, Messages: {params['messages']}"
         return hashlib.sha256(key_str.encode("utf-8")).hexdigest()
 
     def read(self, params):
-        key = self.__params_to_key(params)
-        row = self.__db_operation("SELECT message, metadata FROM cache WHERE key = ?", (key,), fetchone=True)
-        if row is None:
-            return None
-        message, metadata_str = row
-        metadata = json.loads(metadata_str)
-        return message, metadata
+        return self.response_cache.get(self.__params_to_key(params))
 
     def write(self, params, message, metadata):
-        key = self.__params_to_key(params)
-        metadata_str = json.dumps(metadata)
-        self.__db_operation("INSERT OR REPLACE INTO cache (key, message, metadata) VALUES (?, ?, ?)", (key, message, metadata_str), commit=True)
+        self.response_cache.put(self.__params_to_key(params), message, metadata)
 
 
 class BedrockLLM(BaseLLM):
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        message TEXT,
+        metadata TEXT
+    )
+"""
+
+
+class LLMResponseCache:
+    """
+    SQLite cache of LLM responses (a `cache` table of key, message and JSON metadata), safe to share between
+    threads and processes.
+
+    The database is switched to WAL journal mode once, so readers never block the writer. Every thread reads through
+    its own persistent connection, and hot keys are served from an in-memory LRU without touching SQLite. Writes are
+    queued and committed in batches by a background writer thread; pending writes are visible to `get` right away
+    and are flushed at interpreter exit. `stats` reports hit, miss and latency counters.
+    """
+
+    def __init__(self, filename: str, lru_size: int = 10000, max_batch_size: int = 256, busy_timeout: float = 30.0):
+        self.filename = filename
+        self.lru_size = lru_size
+        self.max_batch_size = max_batch_size
+        self.busy_timeout = busy_timeout
+
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        conn = sqlite3.connect(filename, timeout=busy_timeout)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        conn.commit()
+        conn.close()
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, Tuple[str, dict]]" = OrderedDict()
+        self._pending: Dict[str, Tuple[str, dict]] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "write_batches": 0,
+                          "read_seconds": 0.0, "write_seconds": 0.0}
+
+        self._writer = threading.Thread(target=self._write_loop, name="LLMResponseCache-writer", daemon=True)
+        self._writer.start()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.filename, timeout=self.busy_timeout)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, value: Tuple[str, dict]):
+        # Caller holds self._lock.
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Tuple[str, dict]]:
+        """Returns the cached message and metadata of `key`, or None."""
+        start = time.perf_counter()
+        with self._lock:
+            value = self._pending.get(key) or self._lru.get(key)
+            if value is not None:
+                self._remember(key, value)
+                self._counters["memory_hits"] += 1
+                self._counters["read_seconds"] += time.perf_counter() - start
+                return value[0], dict(value[1])
+
+        row = self._connection().execute("SELECT message, metadata FROM cache WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            self._counters["read_seconds"] += time.perf_counter() - start
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            value = (row[0], json.loads(row[1]))
+            self._remember(key, value)
+            self._counters["disk_hits"] += 1
+        return value[0], dict(value[1])
+
+    def put(self, key: str, message: str, metadata: dict):
+        """Caches a response. The write is committed asynchronously by the writer thread."""
+        value = (message, dict(metadata))
+        with self._lock:
+            self._pending[key] = value
+            self._remember(key, value)
+        self._queue.put(key)
+
+    def _write_loop(self):
+        conn = sqlite3.connect(self.filename, timeout=self.busy_timeout)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        while True:
+            keys = [self._queue.get()]
+            # Drain whatever else is queued so that bursts are committed in one transaction.
+            while len(keys) < self.max_batch_size:
+                try:
+                    keys.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with self._lock:
+                rows = {key: self._pending[key] for key in keys if key in self._pending}
+
+            if rows:
+                start = time.perf_counter()
+                try:
+                    with conn:
+                        conn.executemany("INSERT OR REPLACE INTO cache (key, message, metadata) VALUES (?, ?, ?)",
+                                         [(key, message, json.dumps(metadata)) for key, (message, metadata) in rows.items()])
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to write {len(rows)} responses to LLM cache {self.filename}: {e}")
+                with self._lock:
+                    for key, value in rows.items():
+                        if self._pending.get(key) is value:
+                            del self._pending[key]
+                    self._counters["writes"] += len(rows)
+                    self._counters["write_batches"] += 1
+                    self._counters["write_seconds"] += time.perf_counter() - start
+
+            for _ in keys:
+                self._queue.task_done()
+
+    def flush(self):
+        """Blocks until all queued writes are committed."""
+        self._queue.join()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["pending_writes"] = len(self._pending)
+            counters["lru_entries"] = len(self._lru)
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        reads = hits + counters["misses"]
+        counters["hit_rate"] = hits / reads if reads else 0.0
+        counters["avg_read_ms"] = 1000 * counters["read_seconds"] / reads if reads else 0.0
+        counters["avg_write_batch_ms"] = 1000 * counters["write_seconds"] / counters["write_batches"] if counters["write_batches"] else 0.0
+        return counters
+
+
+_caches: Dict[str, LLMResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(filename: str) -> LLMResponseCache:
+    """Returns the process-wide `LLMResponseCache` of a database file, so that all LLM instances using it share one writer and LRU."""
+    path = os.path.abspath(filename)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = LLMResponseCache(path)
+        return _caches[path]
+
+
+@atexit.register
+def _flush_response_caches():
+    for cache in list(_caches.values()):
+        cache.flush()
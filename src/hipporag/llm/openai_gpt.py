@@ -1,18 +1,22 @@
+import asyncio
+import concurrent.futures
 import functools
 import hashlib
 import json
 import os
-import sqlite3
+import threading
+import time
 from copy import deepcopy
-from typing import List, Tuple
+from typing import Any, Awaitable, List, Optional, Tuple
 
 import httpx
 import openai
-from filelock import FileLock
 from openai import OpenAI
 from openai import AzureOpenAI
+from openai import AsyncOpenAI, AsyncAzureOpenAI
 from packaging import version
-from tenacity import retry, stop_after_attempt, wait_fixed
+from tenacity import AsyncRetrying, retry, stop_after_attempt, wait_fixed
+from tqdm import tqdm
 
 from ..utils.config_utils import BaseConfig
 from ..utils.llm_utils import (
@@ -20,9 +24,28 @@ from ..utils.llm_utils import (
 )
 from ..utils.logging_utils import get_logger
 from .base import BaseLLM, LLMConfig
+from .cache import get_response_cache
 
 logger = get_logger(__name__)
 
+def _response_cache_key(llm, messages, kwargs) -> str:
+    # get model, seed and temperature from kwargs or llm.llm_config.generate_params
+    gen_params = getattr(llm, "llm_config", {}).generate_params if hasattr(llm, "llm_config") else {}
+    model = kwargs.get("model", gen_params.get("model"))
+    seed = kwargs.get("seed", gen_params.get("seed"))
+    temperature = kwargs.get("temperature", gen_params.get("temperature"))
+
+    # build key data, convert to JSON string and hash to generate key_hash
+    key_data = {
+        "messages": messages,  # messages requires JSON serializable
+        "model": model,
+        "seed": seed,
+        "temperature": temperature,
+    }
+    key_str = json.dumps(key_data, sort_keys=True, default=str)
+    return hashlib.sha256(key_str.encode("utf-8")).hexdigest()
+
+
 def cache_response(func):
     @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
@@ -34,68 +57,17 @@ def cache_response(func):
         if messages is None:
             raise ValueError("Missing required 'messages' parameter for caching.")
 
-        # get model, seed and temperature from kwargs or self.llm_config.generate_params
-        gen_params = getattr(self, "llm_config", {}).generate_params if hasattr(self, "llm_config") else {}
-        model = kwargs.get("model", gen_params.get("model"))
-        seed = kwargs.get("seed", gen_params.get("seed"))
-        temperature = kwargs.get("temperature", gen_params.get("temperature"))
-
-        # build key data, convert to JSON string and hash to generate key_hash
-        key_data = {
-            "messages": messages,  # messages requires JSON serializable
-            "model": model,
-            "seed": seed,
-            "temperature": temperature,
-        }
-        key_str = json.dumps(key_data, sort_keys=True, default=str)
-        key_hash = hashlib.sha256(key_str.encode("utf-8")).hexdigest()
-
-        # the file name of lock, ensure mutual exclusion when accessing concurrently
-        lock_file = self.cache_file_name + ".lock"
-
-        # Try to read from SQLite cache
-        with FileLock(lock_file):
-            conn = sqlite3.connect(self.cache_file_name)
-            c = conn.cursor()
-            # if the table does not exist, create it
-            c.execute("""
-                CREATE TABLE IF NOT EXISTS cache (
-                    key TEXT PRIMARY KEY,
-                    message TEXT,
-                    metadata TEXT
-                )
-            """)
-            conn.commit()  # commit to save the table creation
-            c.execute("SELECT message, metadata FROM cache WHERE key = ?", (key_hash,))
-            row = c.fetchone()
-            conn.close()
-            if row is not None:
-                message, metadata_str = row
-                metadata = json.loads(metadata_str)
-                # return cached result and mark as hit
-                return message, metadata, True
+        key_hash = _response_cache_key(self, messages, kwargs)
+        cached = self.response_cache.get(key_hash)
+        if cached is not None:
+            # return cached result and mark as hit
+            message, metadata = cached
+            return message, metadata, True
 
         # if cache miss, call the original function to get the result
         result = func(self, *args, **kwargs)
         message, metadata = result
-
-        # insert new result into cache
-        with FileLock(lock_file):
-            conn = sqlite3.connect(self.cache_file_name)
-            c = conn.cursor()
-            # make sure the table exists again (if it doesn't exist, it would be created)
-            c.execute("""
-                CREATE TABLE IF NOT EXISTS cache (
-                    key TEXT PRIMARY KEY,
-                    message TEXT,
-                    metadata TEXT
-                )
-            """)
-            metadata_str = json.dumps(metadata)
-            c.execute("INSERT OR REPLACE INTO cache (key, message, metadata) VALUES (?, ?, ?)",
-                      (key_hash, message, metadata_str))
-            conn.commit()
-            conn.close()
+        self.response_cache.put(key_hash, message, metadata)
 
         return message, metadata, False
 
@@ -134,6 +106,7 @@ class CacheOpenAI(BaseLLM):
         if cache_filename is None:
             cache_filename = f"{self.llm_name.replace('/', '_')}_cache.sqlite"
         self.cache_file_name = os.path.join(self.cache_dir, cache_filename)
+        self.response_cache = get_response_cache(self.cache_file_name)
 
         self._init_llm_config()
         if high_throughput:
@@ -173,18 +146,25 @@ class CacheOpenAI(BaseLLM):
         messages: List[TextChatMessage],
         **kwargs
     ) -> Tuple[List[TextChatMessage], dict]:
+        params = self._build_params(messages, **kwargs)
+        logger.debug(f"Calling OpenAI GPT API with:\n{params}")
+
+        response = self.openai_client.chat.completions.create(**params)
+        return self._parse_response(response)
+
+    def _build_params(self, messages: List[TextChatMessage], **kwargs) -> dict:
         params = deepcopy(self.llm_config.generate_params)
         if kwargs:
             params.update(kwargs)
         params["messages"] = messages
-        logger.debug(f"Calling OpenAI GPT API with:\n{params}")
 
         if 'gpt' not in params['model'] or version.parse(openai.__version__) < version.parse("1.45.0"): # if we use vllm to call openai api or if we use openai but the version is too old to use 'max_completion_tokens' argument
             # TODO strange version change in openai protocol, but our current vllm version not changed yet
             params['max_tokens'] = params.pop('max_completion_tokens')
+        return params
 
-        response = self.openai_client.chat.completions.create(**params)
-
+    @staticmethod
+    def _parse_response(response) -> Tuple[str, dict]:
         response_message = response.choices[0].message.content
         assert isinstance(response_message, str), "response_message should be a string"
         
@@ -197,3 +177,166 @@ class CacheOpenAI(BaseLLM):
         return response_message, metadata
 
 
+class TokenBucket:
+    """
+    Token-bucket rate limiter for coroutines of one event loop: tokens refill continuously at `rate` per second up
+    to `capacity`, the burst size.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class AsyncCacheOpenAI(CacheOpenAI):
+    """
+    OpenAI LLM implementation on `openai.AsyncOpenAI`, sharing the response cache of `CacheOpenAI`.
+
+    Requests run on one background event loop owned by the instance, where a semaphore keeps at most
+    `llm_max_concurrency` of them in flight and, if `llm_requests_per_second` is set, a token bucket limits their
+    rate. This holds for every caller: coroutines awaiting `ainfer` from any event loop, `batch_ainfer` and the
+    synchronous `infer`, which blocks the calling thread until its request completes on the loop.
+    """
+
+    def __init__(self, cache_dir, global_config, cache_filename: str = None,
+                 high_throughput: bool = True,
+                 **kwargs) -> None:
+        super().__init__(cache_dir, global_config, cache_filename=cache_filename,
+                         high_throughput=high_throughput, **kwargs)
+
+        if high_throughput:
+            limits = httpx.Limits(max_connections=500, max_keepalive_connections=100)
+            client = httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(5*60, read=5*60))
+        else:
+            client = None
+
+        if self.global_config.azure_endpoint is None:
+            self.async_openai_client = AsyncOpenAI(base_url=self.llm_base_url, http_client=client, max_retries=self.max_retries)
+        else:
+            self.async_openai_client = AsyncAzureOpenAI(api_version=self.global_config.azure_endpoint.split('api-version=')[1],
+                                                        azure_endpoint=self.global_config.azure_endpoint, max_retries=self.max_retries)
+
+        self.max_concurrency = global_config.llm_max_concurrency
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.rate_limiter = None
+        if global_config.llm_requests_per_second is not None:
+            self.rate_limiter = TokenBucket(rate=global_config.llm_requests_per_second,
+                                            capacity=global_config.llm_rate_limit_burst)
+
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name=f"{self.__class__.__name__}-loop",
+                                 daemon=True).start()
+        return self._loop
+
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        """Schedules a coroutine on the event loop of this instance from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    def run(self, coro: Awaitable) -> Any:
+        """Runs a coroutine on the event loop of this instance from synchronous code and returns its result."""
+        loop = self._get_loop()
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            raise RuntimeError("AsyncCacheOpenAI.run cannot be called from its own event loop, await the coroutine instead.")
+        return self.submit(coro).result()
+
+    async def _request(self, messages: List[TextChatMessage], **kwargs) -> Tuple[str, dict]:
+        params = self._build_params(messages, **kwargs)
+        logger.debug(f"Calling OpenAI GPT API with:\n{params}")
+
+        async with self.semaphore:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            response = await self.async_openai_client.chat.completions.create(**params)
+        return self._parse_response(response)
+
+    async def _ainfer(self, messages: List[TextChatMessage], **kwargs) -> Tuple[str, dict, bool]:
+        key_hash = _response_cache_key(self, messages, kwargs)
+        cached = self.response_cache.get(key_hash)
+        if cached is not None:
+            message, metadata = cached
+            return message, metadata, True
+
+        async for attempt in AsyncRetrying(stop=stop_after_attempt(self.max_retries), wait=wait_fixed(1)):
+            with attempt:
+                message, metadata = await self._request(messages, **kwargs)
+
+        self.response_cache.put(key_hash, message, metadata)
+        return message, metadata, False
+
+    async def ainfer(
+        self,
+        messages: List[TextChatMessage],
+        **kwargs
+    ) -> Tuple[str, dict, bool]:
+        """
+        Asynchronous counterpart of `infer`, returning the response message, its metadata and whether it was
+        served from the cache. Can be awaited from any event loop; the request itself runs on the loop of this
+        instance.
+        """
+        loop = self._get_loop()
+        if asyncio.get_running_loop() is loop:
+            return await self._ainfer(messages, **kwargs)
+        return await asyncio.wrap_future(self.submit(self._ainfer(messages, **kwargs)))
+
+    async def batch_ainfer(
+        self,
+        batch_messages: List[List[TextChatMessage]],
+        desc: Optional[str] = None,
+        return_exceptions: bool = False,
+        **kwargs
+    ) -> List[Tuple[str, dict, bool]]:
+        """
+        Runs `ainfer` on all messages concurrently, within the concurrency and rate limits of this instance.
+
+        Args:
+            batch_messages: The input messages of each request.
+            desc: If given, progress is shown on a progress bar with this description.
+            return_exceptions: If True, the exception of a failed request is returned in its place instead of
+                being raised.
+            **kwargs: Generation parameters passed to every request.
+
+        Returns:
+            List[Tuple[str, dict, bool]]: The results of `ainfer`, in the order of `batch_messages`.
+        """
+        pbar = tqdm(total=len(batch_messages), desc=desc, disable=desc is None)
+
+        async def infer_one(messages):
+            try:
+                return await self.ainfer(messages, **kwargs)
+            finally:
+                pbar.update(1)
+
+        try:
+            return await asyncio.gather(*(infer_one(messages) for messages in batch_messages),
+                                        return_exceptions=return_exceptions)
+        finally:
+            pbar.close()
+
+    def infer(
+        self,
+        messages: List[TextChatMessage],
+        **kwargs
+    ) -> Tuple[str, dict, bool]:
+        return self.run(self._ainfer(messages, **kwargs))
@@ -96,6 +96,8 @@ class VLLMOffline:
         metadata = {
             "prompt_tokens": sum(all_prompt_tokens),
             "completion_tokens": sum(all_completion_tokens),
-            "num_request": len(messages_list)
+            "num_request": len(messages_list),
+            "all_prompt_tokens": all_prompt_tokens,
+            "all_completion_tokens": all_completion_tokens
         }
         return all_responses, metadata
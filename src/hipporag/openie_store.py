@@ -0,0 +1,144 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, Iterator, List, Set
+
+from .utils.misc_utils import compute_mdhash_id
+
+logger = logging.getLogger(__name__)
+
+# Keys are looked up in chunks to stay below SQLite's limit on the number of bound parameters.
+_MAX_QUERY_PARAMS = 900
+
+
+class OpenIEStore:
+    """
+    SQLite-backed store of per-chunk OpenIE results, replacing the monolithic `openie_results_ner_*.json` file.
+
+    Every chunk is one row keyed by its chunk id (`idx`), holding the passage and the JSON-encoded extracted
+    entities and triples, so existence checks and lookups use the primary key index and new results are
+    appended without touching existing rows. Deletes only set a tombstone flag; `compact` drops tombstoned
+    rows. A `generation` counter is bumped by every write, which lets derived state detect staleness.
+    """
+
+    def __init__(self, filename: str, legacy_json_filename: str = None):
+        self.filename = filename
+        self._lock = threading.Lock()
+
+        is_new = not os.path.exists(filename)
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS openie (
+                idx TEXT PRIMARY KEY,
+                passage TEXT,
+                extracted_entities TEXT,
+                extracted_triples TEXT,
+                num_phrases INTEGER,
+                sum_phrase_chars INTEGER,
+                sum_phrase_words INTEGER,
+                deleted INTEGER DEFAULT 0
+            )
+        """)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+        self.conn.commit()
+
+        if is_new and legacy_json_filename is not None and os.path.isfile(legacy_json_filename):
+            self.import_json(legacy_json_filename)
+
+    @property
+    def generation(self) -> int:
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM openie WHERE deleted = 0").fetchone()[0]
+
+    def _select_by_keys(self, columns: str, keys: List[str]) -> Iterator[tuple]:
+        for start in range(0, len(keys), _MAX_QUERY_PARAMS):
+            batch = keys[start:start + _MAX_QUERY_PARAMS]
+            yield from self.conn.execute(
+                f"SELECT {columns} FROM openie WHERE deleted = 0 AND idx IN ({','.join('?' * len(batch))})", batch)
+
+    def existing_keys(self, chunk_keys: Iterable[str]) -> Set[str]:
+        """Returns the subset of `chunk_keys` that have (non-deleted) OpenIE results."""
+        return {row[0] for row in self._select_by_keys("idx", list(chunk_keys))}
+
+    def get(self, chunk_keys: Iterable[str]) -> List[dict]:
+        """Returns the OpenIE results of the given chunks that are in the store, in storage order."""
+        rows = self._select_by_keys("rowid, idx, passage, extracted_entities, extracted_triples", list(chunk_keys))
+        return [self._to_doc(row[1:]) for row in sorted(rows)]
+
+    def iter_docs(self, batch_size: int = 1000) -> Iterator[dict]:
+        """Streams the OpenIE results of all chunks in storage order, `batch_size` rows at a time."""
+        last_rowid = 0
+        while True:
+            rows = self.conn.execute(
+                "SELECT rowid, idx, passage, extracted_entities, extracted_triples FROM openie "
+                "WHERE deleted = 0 AND rowid > ? ORDER BY rowid LIMIT ?", (last_rowid, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._to_doc(row[1:])
+            last_rowid = rows[-1][0]
+
+    @staticmethod
+    def _to_doc(row) -> dict:
+        idx, passage, entities, triples = row
+        return {'idx': idx, 'passage': passage,
+                'extracted_entities': json.loads(entities), 'extracted_triples': json.loads(triples)}
+
+    def upsert(self, docs: List[dict]):
+        """Inserts or replaces the OpenIE results of the given chunks, each a dict like those of the legacy JSON file."""
+        if not docs:
+            return
+
+        records = []
+        for doc in docs:
+            entities = doc['extracted_entities']
+            records.append((doc['idx'], doc['passage'], json.dumps(entities), json.dumps(doc['extracted_triples']),
+                            len(entities), sum(len(e) for e in entities), sum(len(e.split()) for e in entities)))
+
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO openie (idx, passage, extracted_entities, extracted_triples, "
+                "num_phrases, sum_phrase_chars, sum_phrase_words, deleted) VALUES (?, ?, ?, ?, ?, ?, ?, 0)", records)
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        logger.info(f"Saved OpenIE results of {len(records)} chunks to {self.filename}")
+
+    def delete(self, chunk_keys: Iterable[str]):
+        """Tombstones the OpenIE results of the given chunks."""
+        chunk_keys = list(chunk_keys)
+        if not chunk_keys:
+            return
+
+        with self._lock, self.conn:
+            self.conn.executemany("UPDATE openie SET deleted = 1 WHERE idx = ?", [(key,) for key in chunk_keys])
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        logger.info(f"Deleted OpenIE results of {len(chunk_keys)} chunks from {self.filename}")
+
+    def compact(self):
+        """Physically removes tombstoned rows and reclaims their space."""
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM openie WHERE deleted = 1")
+            self.conn.execute("VACUUM")
+
+    def stats(self) -> Dict[str, float]:
+        """Average number of characters and words of the extracted entities, as saved in the legacy JSON file."""
+        num_phrases, sum_chars, sum_words = self.conn.execute(
+            "SELECT SUM(num_phrases), SUM(sum_phrase_chars), SUM(sum_phrase_words) FROM openie WHERE deleted = 0").fetchone()
+        if not num_phrases:
+            return {'avg_ent_chars': 0, 'avg_ent_words': 0}
+        return {'avg_ent_chars': round(sum_chars / num_phrases, 4), 'avg_ent_words': round(sum_words / num_phrases, 4)}
+
+    def import_json(self, json_filename: str):
+        """Imports a legacy OpenIE JSON file, standardizing chunk ids like `HippoRAG.load_existing_openie`."""
+        with open(json_filename) as f:
+            docs = json.load(f).get('docs', [])
+        for doc in docs:
+            doc['idx'] = compute_mdhash_id(doc['passage'], 'chunk-')
+        logger.info(f"Migrating {len(docs)} OpenIE results from {json_filename} to {self.filename}")
+        self.upsert(docs)
@@ -0,0 +1,321 @@
+import logging
+import threading
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import scipy.sparse as sp
+from igraph import Graph
+
+from .utils.misc_utils import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+
+def _weighted_adjacency(graph: Union[Graph, sp.spmatrix], weight_attr: str = 'weight') -> Tuple[sp.csr_matrix, np.ndarray]:
+    """
+    Symmetric weighted adjacency matrix of `graph` treated as undirected, and the weighted degree of every vertex.
+    A sparse matrix is taken to already be such an adjacency matrix (e.g. one loaded from a serving snapshot).
+    """
+    if sp.issparse(graph):
+        adjacency = graph.tocsr()
+        return adjacency, np.asarray(adjacency.sum(axis=1)).ravel()
+
+    num_nodes = graph.vcount()
+    edges = np.asarray(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    if weight_attr in graph.es.attributes():
+        weights = np.asarray(graph.es[weight_attr], dtype=np.float64)
+    else:
+        weights = np.ones(len(edges), dtype=np.float64)
+
+    # Both directions of every edge; duplicate entries (parallel edges) are summed and self-loops count twice.
+    adjacency = sp.csr_matrix(
+        (np.concatenate([weights, weights]), (np.concatenate([edges[:, 0], edges[:, 1]]), np.concatenate([edges[:, 1], edges[:, 0]]))),
+        shape=(num_nodes, num_nodes)
+    )
+    strength = np.asarray(adjacency.sum(axis=1)).ravel()
+    return adjacency, strength
+
+
+def adjacency_to_graph(adjacency: sp.spmatrix, weight_attr: str = 'weight') -> Graph:
+    """Inverse of `_weighted_adjacency`: an undirected igraph graph with one weighted edge per non-zero entry of the upper triangle."""
+    adjacency = sp.triu(adjacency).tocoo()
+    weights = np.where(adjacency.row == adjacency.col, adjacency.data / 2, adjacency.data)  # self-loops count twice
+    graph = Graph(n=adjacency.shape[0], edges=np.column_stack([adjacency.row, adjacency.col]).tolist(), directed=False)
+    graph.es[weight_attr] = weights.tolist()
+    return graph
+
+
+class SparsePPR:
+    """
+    Personalized PageRank by power iteration over a sparse transition matrix that is built once per graph.
+
+    The graph is treated as undirected and weighted, matching
+    `Graph.personalized_pagerank(directed=False, weights='weight')` as used by `HippoRAG.run_ppr`: a vertex
+    spreads its rank to its neighbours proportionally to the edge weights, and the rank of vertices without
+    edges teleports according to the reset vector. A whole batch of reset vectors is iterated together, so
+    each iteration is a single sparse-dense matrix multiply.
+    """
+
+    def __init__(self, graph: Union[Graph, sp.spmatrix], weight_attr: str = 'weight', tol: float = 1e-8, max_iter: int = 100):
+        self.tol = tol
+        self.max_iter = max_iter
+        self.num_nodes = graph.shape[0] if sp.issparse(graph) else graph.vcount()
+        self.last_num_iters = 0
+
+        adjacency, strength = _weighted_adjacency(graph, weight_attr)
+        inv_strength = np.divide(1.0, strength, out=np.zeros_like(strength), where=strength > 0)
+
+        # transition @ x moves the rank in x one step along the edges: column j holds the out-probabilities of vertex j.
+        self.transition = (adjacency @ sp.diags(inv_strength)).tocsr()
+        self.dangling = (strength == 0).astype(np.float64)
+
+        logger.info(f"Built PPR transition matrix with {self.num_nodes} nodes and {self.transition.nnz} entries.")
+
+    def run(self, reset_probs: np.ndarray, damping: float = 0.5, nodes: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Runs Personalized PageRank for one or several reset vectors.
+
+        Parameters:
+            reset_probs (np.ndarray): A (#nodes,) reset vector or a (#queries, #nodes) batch of them. NaNs and
+                negative values are treated as zeros and each vector is normalized to sum to one.
+            damping (float): Probability of following an edge rather than teleporting.
+            nodes (np.ndarray, optional): If given, only the scores of these nodes are returned, in this order.
+
+        Returns:
+            np.ndarray: PageRank scores with the same shape as `reset_probs`, each row summing to one, or only the
+            columns of `nodes`.
+        """
+        reset_probs = np.asarray(reset_probs, dtype=np.float64)
+        single = reset_probs.ndim == 1
+        reset = np.atleast_2d(reset_probs)
+        reset = np.where(np.isnan(reset) | (reset < 0), 0, reset)
+
+        totals = reset.sum(axis=1, keepdims=True)
+        if np.any(totals <= 0):
+            raise ValueError("Each reset vector must have a positive sum.")
+        reset = np.ascontiguousarray((reset / totals).T)  # shape: (#nodes, #queries)
+
+        scores = reset.copy()
+        for num_iters in range(1, self.max_iter + 1):
+            dangling_mass = self.dangling @ scores  # shape: (#queries, )
+            new_scores = self.transition @ scores
+            new_scores *= damping
+            new_scores += (1 - damping + damping * dangling_mass) * reset
+
+            # The previous scores are no longer needed, so the L1 change is computed in their buffer.
+            np.subtract(scores, new_scores, out=scores)
+            np.abs(scores, out=scores)
+            delta = scores.sum(axis=0).max()
+            scores = new_scores
+            if delta < self.tol:
+                break
+        else:
+            logger.warning(f"PPR did not converge to tol={self.tol} within {self.max_iter} iterations (last L1 change {delta:.2e}).")
+        self.last_num_iters = num_iters
+
+        scores = scores.T
+        if nodes is not None:
+            scores = scores[:, np.asarray(nodes, dtype=np.int64)]
+        return scores[0] if single else scores
+
+
+def _positive_entries(ids: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """The ids with a positive weight and their weights; NaNs and negative weights are treated as zeros."""
+    ids, weights = np.asarray(ids, dtype=np.int64), np.asarray(weights, dtype=np.float64)
+    positive = weights > 0
+    return ids[positive], weights[positive]
+
+
+class PushPPR:
+    """
+    Approximate Personalized PageRank by forward push (Andersen, Chung and Lang, 2006).
+
+    Rank is only pushed from the sparse part of the reset vector (the phrase nodes selected by HippoRAG). The mass
+    the reset vector puts on `prior_nodes` (the passage nodes, which all carry a small dense retrieval weight) is
+    not propagated; it is blended into the result post hoc as its own teleport term `(1 - damping) * reset`,
+    which is what PPR would assign to it before any propagation.
+
+    Pushes are done in rounds: every vertex whose residual exceeds `epsilon` times its degree is pushed at once,
+    touching only the CSR rows of the pushed vertices. Estimates and residuals live in per-thread buffers that are
+    allocated once and cleared only at the touched vertices, so the push costs time in proportion to the
+    neighbourhood it reaches (set by `epsilon`), not to the graph.
+
+    `run_sparse` takes the seeds and the prior as (ids, weights) pairs and returns the top scoring output nodes,
+    so a query only touches the pushed neighbourhood, its prior entries and the returned nodes. `run` takes dense
+    reset vectors like `SparsePPR.run` and is therefore linear in the graph size.
+    """
+
+    def __init__(self, graph: Union[Graph, sp.spmatrix], prior_nodes=(), weight_attr: str = 'weight', epsilon: float = 1e-6):
+        self.epsilon = epsilon
+        self.num_nodes = graph.shape[0] if sp.issparse(graph) else graph.vcount()
+        self.last_num_pushes = 0
+
+        adjacency, strength = _weighted_adjacency(graph, weight_attr)
+        inv_strength = np.divide(1.0, strength, out=np.zeros_like(strength), where=strength > 0)
+
+        # Row u holds the probabilities of stepping from u to each of its neighbours.
+        self.step = (sp.diags(inv_strength) @ adjacency).tocsr()
+        self.degree = np.diff(self.step.indptr)
+        self.prior_mask = np.zeros(self.num_nodes, dtype=bool)
+        self.prior_mask[np.asarray(prior_nodes, dtype=np.int64)] = True
+        self.seed_candidates = np.flatnonzero(~self.prior_mask)
+
+        self._buffers = threading.local()
+        self._output_nodes = None
+
+        logger.info(f"Built PPR push index with {self.num_nodes} nodes and {self.step.nnz} entries.")
+
+    def _output_columns(self, nodes: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The output nodes, the output column of every graph node (-1 if not output) and the prior output columns."""
+        cached = self._output_nodes
+        # Passing the same `nodes` object again, as HippoRAG does, skips comparing the arrays.
+        if cached is not None and cached[0] is nodes:
+            return cached[1:]
+
+        node_array = np.arange(self.num_nodes) if nodes is None else np.asarray(nodes, dtype=np.int64)
+        if cached is None or not np.array_equal(cached[1], node_array):
+            columns = np.full(self.num_nodes, -1, dtype=np.int64)
+            columns[node_array] = np.arange(len(node_array))
+            cached = (nodes, node_array, columns, np.flatnonzero(self.prior_mask[node_array]))
+        self._output_nodes = (nodes,) + cached[1:]
+        return cached[1:]
+
+    def run_sparse(self,
+                   seed_ids: np.ndarray,
+                   seed_weights: np.ndarray,
+                   prior_ids: np.ndarray,
+                   prior_weights: np.ndarray,
+                   damping: float = 0.5,
+                   nodes: Optional[np.ndarray] = None,
+                   top_k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Runs approximate Personalized PageRank for one reset vector given by its nonzero entries and returns the
+        top scoring output nodes. Rank is pushed from the seeds and the prior is blended in post hoc, as in `run`.
+
+        Parameters:
+            seed_ids (np.ndarray): Distinct vertices to push from, e.g. the linked phrase nodes.
+            seed_weights (np.ndarray): Reset weights of `seed_ids`.
+            prior_ids (np.ndarray): Distinct vertices whose reset weight is only blended in, e.g. passage nodes.
+            prior_weights (np.ndarray): Reset weights of `prior_ids`.
+            damping (float): Probability of following an edge rather than teleporting.
+            nodes (np.ndarray, optional): The output nodes. Defaults to every vertex.
+            top_k (int, optional): Number of output nodes to return. If None, all of them are returned.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The positions in `nodes` of the top scoring output nodes, sorted by
+            descending score, and their scores, normalized by the total reset weight.
+        """
+        seed_ids, seed_weights = _positive_entries(seed_ids, seed_weights)
+        prior_ids, prior_weights = _positive_entries(prior_ids, prior_weights)
+        seed_mass = seed_weights.sum()
+        total = seed_mass + prior_weights.sum()
+        if total <= 0:
+            raise ValueError("The reset vector must have a positive sum.")
+
+        node_array, columns, _ = self._output_columns(nodes)
+
+        self.last_num_pushes = 0
+        candidate_columns = [columns[prior_ids]]
+        candidate_scores = [(1 - damping) * prior_weights]
+        if seed_mass > 0:
+            touched, estimates = self._push(seed_ids, seed_weights / seed_mass, damping)
+            candidate_columns.append(columns[touched])
+            candidate_scores.append(seed_mass * estimates)
+
+        candidate_columns = np.concatenate(candidate_columns)
+        output = candidate_columns >= 0
+        candidate_columns, occurrences = np.unique(candidate_columns[output], return_inverse=True)
+        scores = np.bincount(occurrences, weights=np.concatenate(candidate_scores)[output],
+                             minlength=len(candidate_columns)) / total
+
+        top = top_k_indices(scores, top_k)
+        candidate_columns, scores = candidate_columns[top], scores[top]
+
+        # Output nodes reached by neither the push nor the prior score zero; they only fill up the top k.
+        num_missing = (len(node_array) if top_k is None else min(top_k, len(node_array))) - len(candidate_columns)
+        if num_missing > 0:
+            reached = set(candidate_columns.tolist())
+            unreached = (column for column in range(len(node_array)) if column not in reached)
+            candidate_columns = np.concatenate([candidate_columns, np.fromiter(unreached, dtype=np.int64, count=num_missing)])
+            scores = np.concatenate([scores, np.zeros(num_missing)])
+
+        return candidate_columns, scores
+
+    def run(self, reset_probs: np.ndarray, damping: float = 0.5, nodes: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Runs approximate Personalized PageRank for one or several reset vectors, see `SparsePPR.run`.
+
+        Returns:
+            np.ndarray: Approximate PageRank scores with the same shape as `reset_probs`, or only the columns of
+            `nodes` if given.
+        """
+        reset_probs = np.asarray(reset_probs, dtype=np.float64)
+        single = reset_probs.ndim == 1
+        reset = np.atleast_2d(reset_probs)
+        reset = np.where(np.isnan(reset) | (reset < 0), 0, reset)
+
+        totals = reset.sum(axis=1)
+        if np.any(totals <= 0):
+            raise ValueError("Each reset vector must have a positive sum.")
+
+        nodes, columns, prior_columns = self._output_columns(nodes)
+        prior_nodes = nodes[prior_columns]
+
+        self.last_num_pushes = 0
+        scores = np.zeros((len(reset), len(nodes)))
+        for i, reset_prob in enumerate(reset):
+            seeds = self.seed_candidates[reset_prob[self.seed_candidates] > 0]
+            seed_mass = reset_prob[seeds].sum()
+            if seed_mass > 0:
+                touched, estimates = self._push(seeds, reset_prob[seeds] / seed_mass, damping)
+                touched_columns = columns[touched]
+                output = touched_columns >= 0
+                scores[i, touched_columns[output]] = seed_mass * estimates[output]
+            # Post-hoc blend of the prior mass: only its teleport term, without propagation.
+            scores[i, prior_columns] += (1 - damping) * reset_prob[prior_nodes]
+            scores[i] /= totals[i]
+
+        return scores[0] if single else scores
+
+    def _push(self, seeds: np.ndarray, seed_probs: np.ndarray, damping: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Pushes from `seeds` and returns the vertices it reached with their (unnormalized) estimates."""
+        alpha = 1 - damping
+        if getattr(self._buffers, "estimate", None) is None:
+            self._buffers.estimate = np.zeros(self.num_nodes)
+            self._buffers.residual = np.zeros(self.num_nodes)
+        estimate, residual = self._buffers.estimate, self._buffers.residual
+
+        touched = [seeds]
+        try:
+            residual[seeds] = seed_probs
+            frontier = seeds[residual[seeds] > self.epsilon * np.maximum(self.degree[seeds], 1)]
+            while len(frontier) > 0:
+                self.last_num_pushes += len(frontier)
+                mass = residual[frontier]
+                residual[frontier] = 0
+                estimate[frontier] += alpha * mass
+
+                # Gather the CSR rows of the frontier in one go.
+                starts, lengths = self.step.indptr[frontier], self.degree[frontier]
+                positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+                neighbours = self.step.indices[positions]
+                np.add.at(residual, neighbours, damping * np.repeat(mass, lengths) * self.step.data[positions])
+
+                # The rank of dangling vertices teleports back to the seeds, like in `SparsePPR`.
+                dangling_mass = damping * mass[lengths == 0].sum()
+                if dangling_mass > 0:
+                    residual[seeds] += dangling_mass * seed_probs
+                    neighbours = np.concatenate([neighbours, seeds])
+
+                neighbours = np.unique(neighbours)
+                touched.append(neighbours)
+                frontier = neighbours[residual[neighbours] > self.epsilon * np.maximum(self.degree[neighbours], 1)]
+        finally:
+            # Clear the buffers only where this push wrote, leaving them zeroed for the next query.
+            touched = np.unique(np.concatenate(touched))
+            estimates = estimate[touched]
+            estimate[touched] = 0
+            residual[touched] = 0
+
+        reached = estimates > 0
+        return touched[reached], estimates[reached]
@@ -0,0 +1,156 @@
+import logging
+from typing import Callable, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("float16", "int8", "binary")
+
+# Bit counts of every byte value, for NumPy versions without `np.bitwise_count` (added in 2.0).
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(codes: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(codes)
+    return _POPCOUNT_TABLE[codes]
+
+
+class QuantizedIndex:
+    """
+    Compressed in-memory copy of the rows of an `EmbeddingStore`, used to generate candidates that are then
+    rescored exactly with the store's full-precision vectors.
+
+    Supported modes:
+        - `float16`: half-precision copy (2 bytes per dimension).
+        - `int8`: symmetric int8 codes with one float32 scale per vector (1 byte per dimension).
+        - `binary`: 1-bit sign codes (1 bit per dimension), scored by Hamming distance.
+
+    A query is first scored against every code, the best `rescore_k` rows are rescored with
+    `vectors[rows] @ query`, and only those are returned. With the 'mmap' store backend or a snapshot, the
+    full-precision vectors stay memory-mapped and only the shortlisted rows are read. Like `IVFIndex`, the index
+    mirrors the row order of the store it is attached to, which reports changes through `add` and `remove_rows`.
+    """
+
+    def __init__(self, mode: str = "int8", rescore_k: int = 1000, batch_size: int = 1024, query_batch_size: int = 32):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode {mode}, expected one of {QUANTIZATION_MODES}.")
+        self.mode = mode
+        self.rescore_k = rescore_k
+        self.batch_size = batch_size
+        self.query_batch_size = query_batch_size
+        self.dim = None
+        self.codes = None
+        self.scales = None
+
+    def __len__(self) -> int:
+        return 0 if self.codes is None else len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the codes (and scales)."""
+        return sum(array.nbytes for array in (self.codes, self.scales) if array is not None)
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        codes, scales = [], []
+        for start in range(0, len(vectors), self.batch_size):
+            block = np.asarray(vectors[start:start + self.batch_size], dtype=np.float32)
+            if self.mode == "float16":
+                codes.append(block.astype(np.float16))
+            elif self.mode == "int8":
+                scale = np.abs(block).max(axis=1) / 127.0
+                scale[scale == 0] = 1.0
+                codes.append(np.rint(block / scale[:, None]).astype(np.int8))
+                scales.append(scale.astype(np.float32))
+            else:
+                codes.append(np.packbits(block > 0, axis=1))
+        return np.concatenate(codes), np.concatenate(scales) if scales else None
+
+    def build(self, vectors: np.ndarray):
+        """(Re)encodes every row of `vectors`."""
+        self.dim = vectors.shape[1] if vectors.ndim == 2 and vectors.size > 0 else None
+        if self.dim is None:
+            self.codes, self.scales = None, None
+            return
+        self.codes, self.scales = self._encode(vectors)
+        logger.info(f"Quantized {len(vectors)} rows to {self.mode} ({self.nbytes / 2 ** 20:.1f} MiB).")
+
+    def add(self, new_vectors: np.ndarray, all_vectors: Callable[[], np.ndarray]):
+        """
+        Encodes `new_vectors`, the rows just appended to the store. `all_vectors` returns every row of the store and
+        is only called if the index has not been built yet.
+        """
+        if len(new_vectors) == 0:
+            return
+        if self.codes is None:
+            self.build(all_vectors())
+            return
+        codes, scales = self._encode(new_vectors)
+        self.codes = np.concatenate([self.codes, codes])
+        if self.scales is not None:
+            self.scales = np.concatenate([self.scales, scales])
+
+    def remove_rows(self, rows):
+        if self.codes is None:
+            return
+        keep = np.ones(len(self.codes), dtype=bool)
+        keep[np.asarray(list(rows), dtype=np.intp)] = False
+        self.codes = self.codes[keep]
+        if self.scales is not None:
+            self.scales = self.scales[keep]
+
+    def approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Scores queries against every code: inner products for float16/int8, negated Hamming distances for binary.
+        Codes are decoded one small block at a time (to stay in cache) and each block is shared by all queries.
+
+        Returns:
+            np.ndarray: A (#queries, #rows) score matrix.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        scores = np.empty((len(queries), len(self)), dtype=np.float32)
+        if self.mode == "binary":
+            query_bits = np.packbits(queries > 0, axis=1)
+        for start in range(0, len(self), self.batch_size):
+            block = self.codes[start:start + self.batch_size]
+            if self.mode == "binary":
+                for q_idx, bits in enumerate(query_bits):
+                    scores[q_idx, start:start + len(block)] = -_popcount(block ^ bits).sum(axis=1, dtype=np.int32)
+            else:
+                scores[:, start:start + len(block)] = queries @ block.astype(np.float32).T
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search(self, vectors: np.ndarray, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the top-k rows of `vectors` by inner product for each query, among the `max(k, rescore_k)` rows
+        shortlisted by the codes and rescored exactly.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row indices and exact scores of shape (#queries, k), sorted by descending
+            score. Slots without a candidate hold index -1 and score -inf.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        if len(self) == 0:
+            return indices, scores
+
+        shortlist_size = min(max(k, self.rescore_k), len(self))
+        top = min(k, shortlist_size)
+        for query_start in range(0, len(queries), self.query_batch_size):
+            query_block = queries[query_start:query_start + self.query_batch_size]
+            shortlists = np.argpartition(-self.approximate_scores(query_block), shortlist_size - 1, axis=1)[:, :shortlist_size]
+
+            for q_idx, (query, rows) in enumerate(zip(query_block, shortlists), start=query_start):
+                # Sorted rows read the full-precision vectors front to back, which is friendlier to memory maps.
+                rows = np.sort(rows)
+                row_scores = np.asarray(vectors[rows], dtype=np.float32) @ query
+                top_idx = np.argpartition(-row_scores, top - 1)[:top]
+                top_idx = top_idx[np.argsort(-row_scores[top_idx])]
+                indices[q_idx, :top] = rows[top_idx]
+                scores[q_idx, :top] = row_scores[top_idx]
+
+        return indices, scores
@@ -1,18 +1,60 @@
 import json
-import difflib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel, Field, TypeAdapter
 from openai import OpenAI
-from copy import deepcopy
 from typing import Union, Optional, List, Dict, Any, Tuple, Literal
 import re
 import ast
+from .llm import is_vllm_offline
+from .llm.openai_gpt import AsyncCacheOpenAI
 from .prompts.filter_default_prompt import best_dspy_prompt
+from .utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def _fact_key(fact) -> Tuple[str, ...]:
+    """Case- and whitespace-insensitive key of a fact, used to match generated facts to the candidates."""
+    parts = fact if isinstance(fact, (list, tuple)) else [fact]
+    return tuple(" ".join(str(part).lower().split()) for part in parts)
+
 
 class Fact(BaseModel):
     fact: list[list[str]] = Field(description="A list of facts, each fact is a list of 3 strings: [subject, predicate, object]")
 
 
-class DSPyFilter:
+class BaseReranker(ABC):
+    """
+    Recognition memory of `HippoRAG.rerank_facts`: keeps the candidate facts of a query that are relevant to it.
+
+    Every implementation returns, for each query, the kept candidate indices, the kept facts (at most
+    `len_after_rerank`, most relevant first) and a dict of extra information. Returning no fact makes retrieval fall
+    back to dense passage retrieval for that query.
+    """
+
+    def __call__(self, *args, **kwargs):
+        return self.rerank(*args, **kwargs)
+
+    @abstractmethod
+    def rerank(self,
+               query: str,
+               candidate_items: List[Tuple],
+               candidate_indices: List[int],
+               len_after_rerank: int = None) -> Tuple[List[int], List[Tuple], dict]:
+        pass
+
+    def rerank_batch(self,
+                     queries: List[str],
+                     batch_candidate_items: List[List[Tuple]],
+                     batch_candidate_indices: List[List[int]],
+                     len_after_rerank: int = None) -> List[Tuple[List[int], List[Tuple], dict]]:
+        """Reranks the candidates of every query, in the order of `queries`. Calls `rerank` once per query by default."""
+        return [self.rerank(query, candidate_items, candidate_indices, len_after_rerank=len_after_rerank)
+                for query, candidate_items, candidate_indices in zip(queries, batch_candidate_items, batch_candidate_indices)]
+
+
+class DSPyFilter(BaseReranker):
     def __init__(self, hipporag):
         """
         Initializes the object with the necessary configurations and templates for processing input and output messages.
@@ -28,14 +70,17 @@ class DSPyFilter:
         llm_infer_fn : A function reference for making inferences using the provided LLM model.
         model_name : The name of the language model as specified in the global configuration.
         default_gen_kwargs : A dictionary for storing the default generation keyword arguments.
+        max_workers : Number of threads issuing filter requests concurrently in `rerank_batch`.
         """
         dspy_file_path = hipporag.global_config.rerank_dspy_file_path
         self.one_input_template = """[[ ## question ## ]]\n{question}\n\n[[ ## fact_before_filter ## ]]\n{fact_before_filter}\n\nRespond with the corresponding output fields, starting with the field `[[ ## fact_after_filter ## ]]` (must be formatted as a valid Python Fact), and then ending with the marker for `[[ ## completed ## ]]`."""
         self.one_output_template = """[[ ## fact_after_filter ## ]]\n{fact_after_filter}\n\n[[ ## completed ## ]]"""
         self.message_template = self.make_template(dspy_file_path)
+        self.llm_model = hipporag.llm_model
         self.llm_infer_fn = hipporag.llm_model.infer
         self.model_name = hipporag.global_config.llm_name
-        self.default_gen_kwargs = {}
+        self.default_gen_kwargs = {'max_completion_tokens': 512}
+        self.max_workers = hipporag.global_config.rerank_max_workers
 
     def make_template(self, dspy_file_path):
         if dspy_file_path is not None:
@@ -84,16 +129,13 @@ class DSPyFilter:
 
         return parsed
 
-    def llm_call(self, question, fact_before_filter):
-        # make prompt
-        messages = deepcopy(self.message_template)
-        messages.append({"role": "user", "content": self.one_input_template.format(question=question, fact_before_filter=fact_before_filter)})
-        # call openai
-
-        self.default_gen_kwargs['max_completion_tokens'] = 512
+    def make_messages(self, question, fact_before_filter):
+        # The few-shot template is never modified, so its messages are shared by all prompts instead of copied.
+        return self.message_template + [{"role": "user", "content": self.one_input_template.format(question=question, fact_before_filter=fact_before_filter)}]
 
+    def llm_call(self, question, fact_before_filter):
         response = self.llm_infer_fn(
-            messages=messages,
+            messages=self.make_messages(question, fact_before_filter),
             model=self.model_name,
             **self.default_gen_kwargs
         )
@@ -102,8 +144,43 @@ class DSPyFilter:
             return response[0]
         return response
 
-    def __call__(self, *args, **kwargs):
-        return self.rerank(*args, **kwargs)
+    def batch_llm_call(self, questions: List[str], facts_before_filter: List[str]) -> List[Union[str, Exception]]:
+        """
+        Runs `llm_call` for every question concurrently and returns the responses in question order, with the
+        exception raised by a failed request in its place. A `VLLMOffline` model generates all responses in one
+        `batch_infer` call, an `AsyncCacheOpenAI` model runs the requests on its event loop within its concurrency
+        and rate limits, and any other model is called from `max_workers` threads.
+        """
+        if len(questions) == 0:
+            return []
+
+        if is_vllm_offline(self.llm_model):
+            all_messages = [self.make_messages(question, fact_before_filter)
+                            for question, fact_before_filter in zip(questions, facts_before_filter)]
+            try:
+                responses, _ = self.llm_model.batch_infer(all_messages, max_tokens=self.default_gen_kwargs['max_completion_tokens'])
+                return responses
+            except Exception as e:
+                return [e] * len(questions)
+
+        if isinstance(self.llm_model, AsyncCacheOpenAI):
+            all_messages = [self.make_messages(question, fact_before_filter)
+                            for question, fact_before_filter in zip(questions, facts_before_filter)]
+            results = self.llm_model.run(self.llm_model.batch_ainfer(all_messages, return_exceptions=True,
+                                                                     model=self.model_name, **self.default_gen_kwargs))
+            return [result if isinstance(result, BaseException) else result[0] for result in results]
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            futures = [executor.submit(self.llm_call, question, fact_before_filter)
+                       for question, fact_before_filter in zip(questions, facts_before_filter)]
+
+            responses = []
+            for future in futures:
+                try:
+                    responses.append(future.result())
+                except Exception as e:
+                    responses.append(e)
+        return responses
 
     def rerank(self,
                query: str,
@@ -114,18 +191,134 @@ class DSPyFilter:
         try:
             # prediction = self.program(question=query, fact_before_filter=json.dumps(fact_before_filter))
             response = self.llm_call(query, json.dumps(fact_before_filter))
-            generated_facts = self.parse_filter(response)
         except Exception as e:
-            print('exception', e)
+            response = e
+        return self.select_facts(response, candidate_items, candidate_indices, len_after_rerank)
+
+    def rerank_batch(self,
+                     queries: List[str],
+                     batch_candidate_items: List[List[Tuple]],
+                     batch_candidate_indices: List[List[int]],
+                     len_after_rerank: int = None) -> List[Tuple[List[int], List[Tuple], dict]]:
+        """
+        Batched counterpart of `rerank`: filters the candidate facts of every query with concurrent LLM requests
+        (see `batch_llm_call`) and returns one `rerank` result per query, in the order of `queries`.
+        """
+        facts_before_filter = [json.dumps({"fact": [list(candidate_item) for candidate_item in candidate_items]})
+                               for candidate_items in batch_candidate_items]
+        responses = self.batch_llm_call(queries, facts_before_filter)
+        return [self.select_facts(response, candidate_items, candidate_indices, len_after_rerank)
+                for response, candidate_items, candidate_indices in zip(responses, batch_candidate_items, batch_candidate_indices)]
+
+    def select_facts(self,
+                     response: Union[str, Exception],
+                     candidate_items: List[Tuple],
+                     candidate_indices: List[int],
+                     len_after_rerank: int = None) -> Tuple[List[int], List[Tuple], dict]:
+        """
+        Maps the facts kept in an LLM filter response back to the candidates with one dictionary lookup per fact,
+        ignoring case and whitespace. Facts that match no candidate are dropped rather than mapped to an
+        unrelated one.
+        """
+        if isinstance(response, Exception):
+            logger.warning(f"Fact filtering failed: {response}")
             generated_facts = []
-        result_indices = []
-        for generated_fact in generated_facts:
-            closest_matched_fact = difflib.get_close_matches(str(generated_fact), [str(i) for i in candidate_items], n=1, cutoff=0.0)[0]
+        else:
             try:
-                result_indices.append(candidate_items.index(eval(closest_matched_fact)))
+                generated_facts = self.parse_filter(response)
             except Exception as e:
-                print('result_indices exception', e)
+                logger.warning(f"Could not parse the fact filter response: {e}")
+                generated_facts = []
+
+        candidate_to_idx = {}
+        for i, candidate_item in enumerate(candidate_items):
+            candidate_to_idx.setdefault(_fact_key(candidate_item), i)
+
+        result_indices = []
+        for generated_fact in generated_facts:
+            idx = candidate_to_idx.get(_fact_key(generated_fact))
+            if idx is not None:
+                result_indices.append(idx)
+
+        num_dropped = len(generated_facts) - len(result_indices)
+        if num_dropped > 0:
+            logger.warning(f"Dropped {num_dropped} of {len(generated_facts)} filtered facts that match no candidate fact.")
 
         sorted_candidate_indices = [candidate_indices[i] for i in result_indices]
         sorted_candidate_items = [candidate_items[i] for i in result_indices]
-        return sorted_candidate_indices[:len_after_rerank], sorted_candidate_items[:len_after_rerank], {'confidence': None}
\ No newline at end of file
+        return sorted_candidate_indices[:len_after_rerank], sorted_candidate_items[:len_after_rerank], {'confidence': None}
+
+
+class CrossEncoderReranker(BaseReranker):
+    """
+    Recognition memory that scores every (query, fact) pair with a local cross-encoder (a sequence classification
+    model such as `cross-encoder/ms-marco-MiniLM-L-6-v2`), without calling the LLM.
+
+    Facts are turned into "subject predicate object" sentences and the pairs of all queries in `rerank_batch` are
+    scored together, `cross_encoder_batch_size` pairs per forward pass, on `cross_encoder_device` (CPU by default).
+    Facts scoring at least `cross_encoder_threshold` are kept, sorted by descending score.
+    """
+
+    def __init__(self, hipporag):
+        # torch and transformers are only needed by this reranker, so they are not imported with the module.
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        global_config = hipporag.global_config
+        self.model_name = global_config.cross_encoder_model_name
+        self.batch_size = global_config.cross_encoder_batch_size
+        self.threshold = global_config.cross_encoder_threshold
+        self.max_length = global_config.cross_encoder_max_length
+        self.device = global_config.cross_encoder_device
+
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name).to(self.device)
+        self.model.eval()
+        logger.info(f"Loaded cross-encoder reranker {self.model_name} on {self.device}")
+
+    def score(self, queries: List[str], facts: List[Tuple]) -> List[float]:
+        """Relevance scores (logits) of the (query, fact) pairs, one per pair."""
+        fact_texts = [" ".join(str(part) for part in fact) for fact in facts]
+        scores = []
+        with self.torch.inference_mode():
+            for start in range(0, len(fact_texts), self.batch_size):
+                inputs = self.tokenizer(queries[start:start + self.batch_size], fact_texts[start:start + self.batch_size],
+                                        padding=True, truncation=True, max_length=self.max_length, return_tensors="pt").to(self.device)
+                logits = self.model(**inputs).logits.float()
+                # Models with one output give a relevance logit, two-class models the log odds of the positive class.
+                logits = logits[:, 0] if logits.shape[-1] == 1 else logits[:, -1] - logits[:, 0]
+                scores.extend(logits.cpu().tolist())
+        return scores
+
+    def rerank(self,
+               query: str,
+               candidate_items: List[Tuple],
+               candidate_indices: List[int],
+               len_after_rerank: int = None) -> Tuple[List[int], List[Tuple], dict]:
+        return self.rerank_batch([query], [candidate_items], [candidate_indices], len_after_rerank=len_after_rerank)[0]
+
+    def rerank_batch(self,
+                     queries: List[str],
+                     batch_candidate_items: List[List[Tuple]],
+                     batch_candidate_indices: List[List[int]],
+                     len_after_rerank: int = None) -> List[Tuple[List[int], List[Tuple], dict]]:
+        pair_queries = [query for query, candidate_items in zip(queries, batch_candidate_items) for _ in candidate_items]
+        pair_facts = [candidate_item for candidate_items in batch_candidate_items for candidate_item in candidate_items]
+        all_scores = self.score(pair_queries, pair_facts)
+
+        results, start = [], 0
+        for candidate_items, candidate_indices in zip(batch_candidate_items, batch_candidate_indices):
+            scores = all_scores[start:start + len(candidate_items)]
+            start += len(candidate_items)
+            kept = sorted((i for i, score in enumerate(scores) if self.threshold is None or score >= self.threshold),
+                          key=lambda i: -scores[i])[:len_after_rerank]
+            results.append(([candidate_indices[i] for i in kept], [candidate_items[i] for i in kept],
+                            {'confidence': [scores[i] for i in kept]}))
+        return results
+
+
+def _get_reranker(hipporag) -> BaseReranker:
+    if hipporag.global_config.reranker == "cross_encoder":
+        return CrossEncoderReranker(hipporag)
+    return DSPyFilter(hipporag)
@@ -0,0 +1,77 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Collapses runs of whitespace and strips both ends, so that queries differing only in spacing share results."""
+    return " ".join(query.split())
+
+
+def config_fingerprint(global_config) -> str:
+    """Hash of every configuration value, so that results computed under another configuration are never reused."""
+    return hashlib.sha256(json.dumps(asdict(global_config), sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class RetrievalResultCache:
+    """
+    In-memory cache of `HippoRAG.retrieve` results: the ranked passage hash ids and scores of a query, keyed by
+    (normalized query, configuration fingerprint, number of passages, index version).
+
+    `HippoRAG.index` and `HippoRAG.delete` bump the index version of their instance, so entries computed against an
+    older index can no longer be looked up and simply age out. At most `max_size` entries are kept, evicting the
+    least recently used ones, and entries older than `ttl` seconds (if set) are treated as misses.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[Hashable, Tuple[float, List[str], np.ndarray]]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0}
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def get(self, key: Hashable) -> Optional[Tuple[List[str], np.ndarray]]:
+        """Returns copies of the cached passage ids and scores of `key`, or None."""
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._lru[key]
+                self._counters["expired"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._lru.move_to_end(key)
+            self._counters["hits"] += 1
+        return list(entry[1]), entry[2].copy()
+
+    def put(self, key: Hashable, passage_ids: List[str], scores: np.ndarray):
+        with self._lock:
+            self._lru[key] = (time.monotonic(), list(passage_ids), np.array(scores, copy=True))
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["entries"] = len(self._lru)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+        return counters
@@ -0,0 +1,218 @@
+import os
+import json
+import shutil
+import logging
+from collections.abc import Sequence
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+import scipy.sparse as sp
+
+from .embedding_store import EmbeddingStore
+from .graph_state import _pack_strings
+from .ppr import _weighted_adjacency
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+STORE_NAMESPACES = ("chunk", "entity", "fact")
+
+
+class PackedStrings(Sequence):
+    """
+    Read-only sequence of strings stored as one utf-8 byte buffer plus an offsets array, both of which can be
+    memory-mapped. Each string is only decoded when accessed.
+    """
+
+    def __init__(self, buffer: np.ndarray, offsets: np.ndarray):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    @classmethod
+    def load(cls, prefix: str) -> "PackedStrings":
+        return cls(np.load(prefix + ".bytes.npy", mmap_mode="r"), np.load(prefix + ".offsets.npy"))
+
+    @staticmethod
+    def save(prefix: str, strings: List[str]):
+        buffer, offsets = _pack_strings(strings)
+        np.save(prefix + ".bytes.npy", buffer)
+        np.save(prefix + ".offsets.npy", offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> str:
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        return self.buffer[self.offsets[idx]:self.offsets[idx + 1]].tobytes().decode("utf-8")
+
+    def tolist(self) -> List[str]:
+        data = self.buffer.tobytes()
+        offsets = self.offsets.tolist()
+        return [data[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+class SnapshotEmbeddingStore(EmbeddingStore):
+    """
+    Read-only `EmbeddingStore` served from a snapshot directory written by `write_snapshot`.
+
+    Embeddings are memory-mapped, so worker processes opened on the same snapshot share them through the page
+    cache. Texts stay in their packed buffer and are decoded per row; only the hash id lookup is built eagerly.
+    """
+
+    def __init__(self, snapshot_dir: str, namespace: str):
+        self.embedding_model = None
+        self.batch_size = None
+        self.namespace = namespace
+        self.snapshot_dir = snapshot_dir
+        self.filename = os.path.join(snapshot_dir, namespace)
+        self.ann_index = None
+        self.quantized_index = None
+        self._load_data()
+
+    def _load_data(self):
+        self.hash_ids = PackedStrings.load(self.filename + ".ids").tolist()
+        self.texts = PackedStrings.load(self.filename + ".texts")
+        self._matrix = np.load(self.filename + ".embeddings.npy", mmap_mode="r")
+        self._num_rows = len(self.hash_ids)
+        self.hash_id_to_idx = {h: idx for idx, h in enumerate(self.hash_ids)}
+        self._text_to_hash_id = None
+        assert len(self.hash_ids) == len(self.texts) == len(self._matrix)
+
+    def _read_only(self, *args, **kwargs):
+        raise RuntimeError(f"The {self.namespace} store of snapshot {self.snapshot_dir} is read-only.")
+
+    insert_strings = delete = _upsert = _save_data = _read_only
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        return self._matrix
+
+    @property
+    def text_to_hash_id(self) -> Dict[str, str]:
+        if self._text_to_hash_id is None:
+            self._text_to_hash_id = {t: h for h, t in zip(self.hash_ids, self.texts.tolist())}
+        return self._text_to_hash_id
+
+    @property
+    def hash_id_to_text(self) -> Dict[str, str]:
+        return dict(zip(self.hash_ids, self.texts.tolist()))
+
+    @property
+    def hash_id_to_row(self) -> Dict[str, Dict[str, str]]:
+        return {h: {"hash_id": h, "content": t} for h, t in zip(self.hash_ids, self.texts.tolist())}
+
+    def attach_ann_index(self, ann_index):
+        """Loads the ANN index saved in the snapshot, or builds one in memory since the snapshot is never written to."""
+        self.ann_index = ann_index
+        if not ann_index.load(len(self.hash_ids)):
+            ann_index.build(self.embeddings)
+
+    def get_row(self, hash_id):
+        return {"hash_id": hash_id, "content": self.texts[self.hash_id_to_idx[hash_id]]}
+
+    def get_rows(self, hash_ids, dtype=np.float32):
+        if not hash_ids:
+            return {}
+
+        return {id: self.get_row(id) for id in hash_ids}
+
+    def get_all_ids(self):
+        return list(self.hash_ids)
+
+    def get_all_id_to_rows(self):
+        return self.hash_id_to_row
+
+    def get_all_texts(self):
+        return set(self.texts.tolist())
+
+
+def write_snapshot(path: str, hipporag) -> None:
+    """
+    Writes the retrieval state of a prepared HippoRAG instance (see `HippoRAG.prepare_retrieval_objects`) into
+    the directory `path`, replacing it if it exists:
+
+        - `manifest.json`: format version, creation time, vertex count and the configuration of the instance.
+        - `<namespace>.ids.*`, `<namespace>.texts.*` and `<namespace>.embeddings.npy` for the chunk, entity and
+          fact stores, in store order. Strings are packed into `.bytes.npy` utf-8 buffers with `.offsets.npy`.
+        - `<namespace>.ivf.npz`: the ANN index of the store, if it has one.
+        - `graph.indptr.npy`, `graph.indices.npy` and `graph.weights.npy`: the symmetric weighted adjacency
+          matrix of the graph in CSR form, with parallel edges summed, and `graph.names.*` the vertex names.
+        - `entity_vertex_idxs.npy`, `passage_vertex_idxs.npy` and `vertex_chunk_counts.npy`.
+
+    All arrays are plain `.npy` files, so readers can memory-map them.
+    """
+    tmp_path = path.rstrip(os.sep) + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    stores = {"chunk": (hipporag.chunk_embedding_store, hipporag.passage_node_keys, hipporag.passage_embeddings),
+              "entity": (hipporag.entity_embedding_store, hipporag.entity_node_keys, hipporag.entity_embeddings),
+              "fact": (hipporag.fact_embedding_store, hipporag.fact_node_keys, hipporag.fact_embeddings)}
+    for namespace, (store, node_keys, embeddings) in stores.items():
+        prefix = os.path.join(tmp_path, namespace)
+        PackedStrings.save(prefix + ".ids", node_keys)
+        PackedStrings.save(prefix + ".texts", [store.get_row(node_key)["content"] for node_key in node_keys])
+        np.save(prefix + ".embeddings.npy", np.asarray(embeddings, dtype=np.float32).reshape(len(node_keys), -1))
+        if store.ann_index is not None and os.path.exists(store.ann_index.filename):
+            shutil.copyfile(store.ann_index.filename, prefix + ".ivf.npz")
+
+    adjacency, _ = _weighted_adjacency(hipporag.graph)
+    np.save(os.path.join(tmp_path, "graph.indptr.npy"), adjacency.indptr)
+    np.save(os.path.join(tmp_path, "graph.indices.npy"), adjacency.indices)
+    np.save(os.path.join(tmp_path, "graph.weights.npy"), adjacency.data)
+    vertex_names = hipporag.graph.vs["name"] if "name" in hipporag.graph.vs.attribute_names() else []
+    PackedStrings.save(os.path.join(tmp_path, "graph.names"), vertex_names)
+
+    np.save(os.path.join(tmp_path, "entity_vertex_idxs.npy"), np.asarray(hipporag.entity_node_idxs, dtype=np.int64))
+    np.save(os.path.join(tmp_path, "passage_vertex_idxs.npy"), np.asarray(hipporag.passage_node_idxs, dtype=np.int64))
+    np.save(os.path.join(tmp_path, "vertex_chunk_counts.npy"), np.asarray(hipporag.vertex_chunk_counts, dtype=np.float64))
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "num_vertices": int(hipporag.num_vertices),
+        "config": asdict(hipporag.global_config),
+    }
+    with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    logger.info(f"Exported snapshot with {manifest['num_vertices']} vertices to {path}")
+
+
+def read_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Opens a snapshot written by `write_snapshot`.
+
+    Returns:
+        Dict[str, Any]: The `manifest`, the three `SnapshotEmbeddingStore`s keyed by namespace, the graph
+        `adjacency` (a CSR matrix over memory-mapped arrays) and `vertex_names`, and the `entity_vertex_idxs`,
+        `passage_vertex_idxs` and `vertex_chunk_counts` arrays.
+    """
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest["format_version"] != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Snapshot {path} has format version {manifest['format_version']}, expected {SNAPSHOT_FORMAT_VERSION}.")
+
+    num_vertices = manifest["num_vertices"]
+    adjacency = sp.csr_matrix((np.load(os.path.join(path, "graph.weights.npy"), mmap_mode="r"),
+                               np.load(os.path.join(path, "graph.indices.npy"), mmap_mode="r"),
+                               np.load(os.path.join(path, "graph.indptr.npy"), mmap_mode="r")),
+                              shape=(num_vertices, num_vertices), copy=False)
+
+    snapshot = {
+        "manifest": manifest,
+        "adjacency": adjacency,
+        "vertex_names": PackedStrings.load(os.path.join(path, "graph.names")),
+    }
+    for namespace in STORE_NAMESPACES:
+        snapshot[namespace] = SnapshotEmbeddingStore(path, namespace)
+    for name in ["entity_vertex_idxs", "passage_vertex_idxs", "vertex_chunk_counts"]:
+        snapshot[name] = np.load(os.path.join(path, f"{name}.npy"))
+    return snapshot
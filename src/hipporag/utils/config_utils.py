@@ -61,6 +61,22 @@ class BaseConfig:
         default=5,
         metadata={"help": "Max number of retry attempts for an asynchronous API calling."}
     )
+    llm_async: bool = field(
+        default=False,
+        metadata={"help": "If set to True, OpenAI compatible LLMs are served by AsyncCacheOpenAI, which runs all requests of the process on one event loop within the concurrency and rate limits below."}
+    )
+    llm_max_concurrency: int = field(
+        default=64,
+        metadata={"help": "Max number of LLM requests in flight at the same time when llm_async is set."}
+    )
+    llm_requests_per_second: Optional[float] = field(
+        default=None,
+        metadata={"help": "Rate limit of LLM requests when llm_async is set, enforced with a token bucket. None means unlimited."}
+    )
+    llm_rate_limit_burst: Optional[int] = field(
+        default=None,
+        metadata={"help": "Burst size (bucket capacity) of the LLM rate limiter. Defaults to one second worth of requests."}
+    )
     # Storage specific attributes
     force_openie_from_scratch: bool = field(
         default=False,
@@ -72,10 +88,54 @@ class BaseConfig:
         default=False,
         metadata={"help": "If set to True, will ignore all existing storage files and graph data and will rebuild from scratch."}
     )
+    embedding_store_backend: Literal["parquet", "mmap"] = field(
+        default="parquet",
+        metadata={"help": "Storage backend of the embedding stores. 'parquet' rewrites a single parquet file on every update, 'mmap' keeps vectors in an append-only memory-mapped file with a segment log and tombstones."}
+    )
+    embedding_store_dtype: Literal["float32", "float16"] = field(
+        default="float32",
+        metadata={"help": "Data type of the vectors persisted by the 'mmap' embedding store backend."}
+    )
+    embedding_store_compaction_ratio: float = field(
+        default=0.25,
+        metadata={"help": "Fraction of tombstoned rows above which the 'mmap' embedding store backend compacts its files."}
+    )
     rerank_dspy_file_path: str = field(
         default=None,
         metadata={"help": "Path to the rerank dspy file."}
     )
+    rerank_max_workers: int = field(
+        default=8,
+        metadata={"help": "Number of threads issuing recognition memory (fact filter) requests concurrently in `retrieve`. With llm_async set, requests run on the event loop of the LLM instead, bounded by llm_max_concurrency."}
+    )
+    rerank_batch_size: int = field(
+        default=128,
+        metadata={"help": "Number of queries whose facts are filtered concurrently when `retrieve` scores queries one by one. The batched path (`retrieval_batch_size`) filters each retrieval batch at once."}
+    )
+    reranker: Literal["dspy_filter", "cross_encoder"] = field(
+        default="dspy_filter",
+        metadata={"help": "Recognition memory that filters the candidate facts of a query. 'dspy_filter' asks the LLM with the DSPy-optimized prompt, 'cross_encoder' scores (query, fact) pairs with a local cross-encoder and needs no LLM endpoint."}
+    )
+    cross_encoder_model_name: str = field(
+        default="cross-encoder/ms-marco-MiniLM-L-6-v2",
+        metadata={"help": "Sequence classification model used by the 'cross_encoder' reranker."}
+    )
+    cross_encoder_batch_size: int = field(
+        default=64,
+        metadata={"help": "Number of (query, fact) pairs per forward pass of the 'cross_encoder' reranker."}
+    )
+    cross_encoder_threshold: Optional[float] = field(
+        default=0.0,
+        metadata={"help": "Facts with a lower cross-encoder score (logit) are dropped. 0 keeps the facts the model considers more likely relevant than not. If None, all candidates are kept and only reordered."}
+    )
+    cross_encoder_max_length: int = field(
+        default=256,
+        metadata={"help": "Max number of tokens of a (query, fact) pair for the 'cross_encoder' reranker."}
+    )
+    cross_encoder_device: str = field(
+        default="cpu",
+        metadata={"help": "Device the 'cross_encoder' reranker runs on."}
+    )
     passage_node_weight: float = field(
         default=0.05,
         metadata={"help": "Multiplicative factor that modified the passage node weights in PPR."}
@@ -84,6 +144,10 @@ class BaseConfig:
         default=True,
         metadata={"help": "If set to True, will save the OpenIE model to disk."}
     )
+    openie_store_backend: Literal["json", "sqlite"] = field(
+        default="json",
+        metadata={"help": "Storage of the OpenIE results. 'json' loads and rewrites a single JSON file on every index and delete call. 'sqlite' keeps one row per chunk in an SQLite database (migrated from the JSON file on first use), so indexing only reads the results of chunks that are not in the graph yet and only appends the new ones, and deletes are tombstones."}
+    )
     
     # Preprocessing specific attributes
     text_preprocessor_class_name: str = field(
@@ -114,6 +178,22 @@ class BaseConfig:
         default="online",
         metadata={"help": "Mode of the OpenIE model to use."}
     )
+    openie_pipelined: bool = field(
+        default=False,
+        metadata={"help": "If set to True, online OpenIE submits the triple extraction of each chunk as soon as its NER is done instead of running NER for all chunks first."}
+    )
+    openie_ner_workers: Optional[int] = field(
+        default=None,
+        metadata={"help": "Number of threads issuing NER calls in pipelined OpenIE. Defaults to ThreadPoolExecutor's default."}
+    )
+    openie_triple_workers: Optional[int] = field(
+        default=None,
+        metadata={"help": "Number of threads issuing triple extraction calls in pipelined OpenIE. Defaults to ThreadPoolExecutor's default."}
+    )
+    openie_max_in_flight: Optional[int] = field(
+        default=None,
+        metadata={"help": "Max number of chunks in pipelined OpenIE whose NER has started but whose triple extraction has not finished. Defaults to twice the total number of workers."}
+    )
     skip_graph: bool = field(
         default=False,
         metadata={"help": "Whether to skip graph construction or not. Set it to be true when running vllm offline indexing for the first time."}
@@ -141,7 +221,15 @@ class BaseConfig:
         default="auto",
         metadata={"help": "Data type for local embedding model."}
     )
-    
+    query_embedding_cache_size: int = field(
+        default=100000,
+        metadata={"help": "Max number of query embeddings kept in memory, least recently used ones are evicted first. Should exceed the number of queries retrieved at once."}
+    )
+    query_embedding_cache_path: Optional[str] = field(
+        default=None,
+        metadata={"help": "SQLite file in which query embeddings are persisted across runs, keyed by embedding model, instruction and query. If None, they are only cached in memory."}
+    )
+
     
     
     # Graph construction specific attributes
@@ -219,6 +307,66 @@ class BaseConfig:
         default=0.5,
         metadata={"help": "Damping factor for ppr algorithm."}
     )
+    ppr_engine: Literal["igraph", "sparse", "push"] = field(
+        default="igraph",
+        metadata={"help": "Personalized PageRank implementation. 'igraph' calls igraph's prpack solver once per query, 'sparse' runs power iteration over a scipy.sparse transition matrix built once in `prepare_retrieval_objects`, for a whole batch of queries at a time when `retrieval_batch_size` is set. 'push' approximates PPR by forward push from the phrase nodes only and blends the passage weights in afterwards, so its cost does not grow with the graph."}
+    )
+    ppr_tol: float = field(
+        default=1e-8,
+        metadata={"help": "Convergence tolerance (max L1 change of the scores between iterations) of the 'sparse' PPR engine."}
+    )
+    ppr_max_iter: int = field(
+        default=100,
+        metadata={"help": "Max number of power iterations of the 'sparse' PPR engine."}
+    )
+    ppr_push_epsilon: float = field(
+        default=1e-6,
+        metadata={"help": "Residual threshold (per unit of degree) of the 'push' PPR engine. Smaller values are more accurate and touch more of the graph."}
+    )
+    retrieval_batch_size: Optional[int] = field(
+        default=None,
+        metadata={"help": "If set, `retrieve` scores this many queries at a time against all facts and passages with one matrix multiply per batch before reranking and graph search each query. Only applies to exact search over unquantized stores. If None, queries are scored one by one."}
+    )
+    retrieval_search_mode: Literal["exact", "ann"] = field(
+        default="exact",
+        metadata={"help": "How facts and passages are scored against a query. 'exact' scans every embedding, 'ann' only scores the candidates returned by an IVF index attached to each embedding store."}
+    )
+    ann_nlist: int = field(
+        default=1024,
+        metadata={"help": "Number of inverted lists (k-means centroids) of the ANN index."}
+    )
+    ann_nprobe: int = field(
+        default=32,
+        metadata={"help": "Number of inverted lists scanned per query by the ANN index. Higher values trade latency for recall."}
+    )
+    ann_top_k: int = field(
+        default=1000,
+        metadata={"help": "Number of candidates returned by the ANN index per query. Facts and passages outside the candidates get a score of 0."}
+    )
+    passage_embedding_quantization: Literal["none", "float16", "int8", "binary"] = field(
+        default="none",
+        metadata={"help": "Compressed in-memory copy of the passage embeddings used by exact search to shortlist passages, which are then rescored with the full-precision vectors. 'int8' uses per-vector scales, 'binary' 1-bit sign codes compared by Hamming distance. Pair it with the 'mmap' embedding store backend (or a snapshot) so that the full-precision vectors stay on disk."}
+    )
+    fact_embedding_quantization: Literal["none", "float16", "int8", "binary"] = field(
+        default="none",
+        metadata={"help": "Same as `passage_embedding_quantization`, for the fact embeddings."}
+    )
+    quantization_rescore_k: int = field(
+        default=1000,
+        metadata={"help": "Number of candidates shortlisted by a quantized index and rescored exactly per query. Facts and passages outside the candidates get a score of 0."}
+    )
+    retrieval_cache: bool = field(
+        default=False,
+        metadata={"help": "Whether `retrieve` caches the ranked passages of each query in memory, keyed by the whitespace-normalized query, the configuration, the number of passages and the index version. `index` and `delete` bump the index version, so results are never served from an outdated index."}
+    )
+    retrieval_cache_size: int = field(
+        default=10000,
+        metadata={"help": "Max number of queries whose results are cached, least recently used ones are evicted first."}
+    )
+    retrieval_cache_ttl: Optional[float] = field(
+        default=None,
+        metadata={"help": "Seconds after which a cached retrieval result expires. If None, results only expire through eviction or index updates."}
+    )
     
     
     # QA specific attributes
@@ -230,6 +378,10 @@ class BaseConfig:
         default=5,
         metadata={"help": "Feeding top k documents to the QA model for reading."}
     )
+    qa_max_workers: int = field(
+        default=8,
+        metadata={"help": "Number of threads running QA reading requests concurrently. With llm_async set, requests run on the event loop of the LLM instead, bounded by llm_max_concurrency."}
+    )
     
     # Save dir (highest level directory)
     save_dir: str = field(
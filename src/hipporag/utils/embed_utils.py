@@ -1,7 +1,77 @@
-from typing import List
-import torch
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import numpy as np
 from tqdm import tqdm
 
+from .misc_utils import top_k_indices
+
+
+def _normalized_block(vecs) -> np.ndarray:
+    """Casts a block of vectors (any float or integer dtype, possibly memory-mapped) to L2-normalized float32."""
+    block = np.asarray(vecs, dtype=np.float32)
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    return block / np.maximum(norms, 1e-12)
+
+
+def knn_search(query_vecs, key_vecs, k=2047, query_batch_size=1000, key_batch_size=10000,
+               num_workers=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact cosine-similarity top-k search of each query vector among the key vectors, on CPU.
+
+    Inputs can be NumPy arrays or memmaps of any float or integer dtype (e.g. float16 or int8 embeddings); they are
+    converted to normalized float32 one block at a time, so the full matrices are never copied. Query batches are
+    scored in parallel threads (NumPy's matrix multiply releases the GIL) and each batch keeps a running top-k
+    while it scans the key blocks.
+
+    Args:
+        query_vecs: (#queries, dim) query vectors.
+        key_vecs: (#keys, dim) key vectors.
+        k: top-k
+        query_batch_size: Number of queries scored per thread task.
+        key_batch_size: Number of keys scored per matrix multiply.
+        num_workers: Number of threads, defaults to the number of CPUs.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (#queries, min(k, #keys)) key indices and cosine similarities (float32),
+        sorted by descending similarity.
+    """
+    num_queries, num_keys = len(query_vecs), len(key_vecs)
+    k = min(k, num_keys)
+    indices = np.empty((num_queries, k), dtype=np.int64)
+    scores = np.empty((num_queries, k), dtype=np.float32)
+    if num_queries == 0 or k == 0:
+        return indices, scores
+
+    def search_batch(query_start):
+        query_block = _normalized_block(query_vecs[query_start:query_start + query_batch_size])
+        top_idx = np.empty((len(query_block), 0), dtype=np.int64)
+        top_scores = np.empty((len(query_block), 0), dtype=np.float32)
+
+        for key_start in range(0, num_keys, key_batch_size):
+            similarity = query_block @ _normalized_block(key_vecs[key_start:key_start + key_batch_size]).T
+
+            # Merge the block's candidates into the running top-k; sorting is deferred to the end.
+            block_k = min(k, similarity.shape[1])
+            block_idx = np.argpartition(-similarity, block_k - 1, axis=1)[:, :block_k]
+            top_scores = np.concatenate([top_scores, np.take_along_axis(similarity, block_idx, axis=1)], axis=1)
+            top_idx = np.concatenate([top_idx, block_idx + key_start], axis=1)
+            if top_scores.shape[1] > k:
+                keep = np.argpartition(-top_scores, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(top_scores, keep, axis=1)
+                top_idx = np.take_along_axis(top_idx, keep, axis=1)
+
+        order = top_k_indices(top_scores, None, axis=1)
+        indices[query_start:query_start + len(query_block)] = np.take_along_axis(top_idx, order, axis=1)
+        scores[query_start:query_start + len(query_block)] = np.take_along_axis(top_scores, order, axis=1)
+
+    query_starts = range(0, num_queries, query_batch_size)
+    with ThreadPoolExecutor(max_workers=num_workers or os.cpu_count()) as executor:
+        list(tqdm(executor.map(search_batch, query_starts), total=len(query_starts), desc="KNN for Queries"))
+
+    return indices, scores
+
 
 def retrieve_knn(query_ids: List[str], key_ids: List[str], query_vecs, key_vecs, k=2047, query_batch_size=1000,
                  key_batch_size=10000):
@@ -15,80 +85,14 @@ def retrieve_knn(query_ids: List[str], key_ids: List[str], query_vecs, key_vecs,
         key_batch_size:
 
     Returns:
-
+        Dict[str, Tuple[List[str], List[float]]]: For each query id, its nearest key ids and their cosine
+        similarities, sorted by descending similarity. Use `knn_search` directly to get index/score arrays.
     """
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-
     if len(key_vecs) == 0: return {}
 
-    query_vecs = torch.tensor(query_vecs, dtype=torch.float32)
-    query_vecs = torch.nn.functional.normalize(query_vecs, dim=1)
-
-    key_vecs = torch.tensor(key_vecs, dtype=torch.float32)
-    key_vecs = torch.nn.functional.normalize(key_vecs, dim=1)
-
-    results = {}
-
-    def get_batches(vecs, batch_size):
-        for i in range(0, len(vecs), batch_size):
-            yield vecs[i:i + batch_size], i
-
-    for query_batch, query_batch_start_idx in tqdm(
-            get_batches(vecs=query_vecs, batch_size=query_batch_size),
-            total=(len(query_vecs) + query_batch_size - 1) // query_batch_size,  # Calculate total batches
-            desc="KNN for Queries"
-    ):
-        query_batch = query_batch.clone().detach()
-        query_batch = query_batch.to(device)
-
-        batch_topk_sim_scores = []
-        batch_topk_indices = []
-
-        offset_keys = 0
-
-        for key_batch, key_batch_start_idx in get_batches(vecs=key_vecs, batch_size=key_batch_size):
-            key_batch = key_batch.to(device)
-            actual_key_batch_size = key_batch.size(0)
-
-            similarity = torch.mm(query_batch, key_batch.T)
-
-            topk_sim_scores, topk_indices = torch.topk(similarity, min(k, actual_key_batch_size), dim=1, largest=True,
-                                                       sorted=True)
-
-            topk_indices += offset_keys
-
-            batch_topk_sim_scores.append(topk_sim_scores)
-            batch_topk_indices.append(topk_indices)
-
-            del similarity
-            key_batch = key_batch.cpu()
-            torch.cuda.empty_cache()
-
-            offset_keys += actual_key_batch_size
-        # end for each kb batch
-
-        batch_topk_sim_scores = torch.cat(batch_topk_sim_scores, dim=1)
-        batch_topk_indices = torch.cat(batch_topk_indices, dim=1)
-
-        final_topk_sim_scores, final_topk_indices = torch.topk(batch_topk_sim_scores,
-                                                               min(k, batch_topk_sim_scores.size(1)), dim=1,
-                                                               largest=True, sorted=True)
-        final_topk_indices = final_topk_indices.cpu()
-        final_topk_sim_scores = final_topk_sim_scores.cpu()
-
-        for i in range(final_topk_indices.size(0)):
-            query_relative_idx = query_batch_start_idx + i
-            query_idx = query_ids[query_relative_idx]
-
-            final_topk_indices_i = final_topk_indices[i]
-            final_topk_sim_scores_i = final_topk_sim_scores[i]
-
-            query_to_topk_key_relative_ids = batch_topk_indices[i][final_topk_indices_i]
-            query_to_topk_key_ids = [key_ids[idx] for idx in query_to_topk_key_relative_ids.cpu().numpy()]
-            results[query_idx] = (query_to_topk_key_ids, final_topk_sim_scores_i.numpy().tolist())
-
-        query_batch = query_batch.cpu()
-        torch.cuda.empty_cache()
-    # end for each query batch
+    indices, scores = knn_search(query_vecs, key_vecs, k=k, query_batch_size=query_batch_size,
+                                 key_batch_size=key_batch_size)
 
-    return results
\ No newline at end of file
+    key_ids = np.asarray(key_ids, dtype=object)
+    return {query_id: (key_ids[row].tolist(), row_scores.tolist())
+            for query_id, row, row_scores in zip(query_ids, indices, scores)}
@@ -101,7 +101,13 @@ def flatten_facts(chunk_triples: List[Triple]) -> List[Triple]:
     graph_triples = list(set(graph_triples))
     return graph_triples
 
-def min_max_normalize(x):
+def min_max_normalize(x, axis=None):
+    if axis is not None:
+        # Row-wise (or column-wise) variant used for batched score matrices; constant slices map to ones.
+        min_val = np.min(x, axis=axis, keepdims=True)
+        range_val = np.max(x, axis=axis, keepdims=True) - min_val
+        return np.where(range_val == 0, 1.0, (x - min_val) / np.where(range_val == 0, 1.0, range_val))
+
     min_val = np.min(x)
     max_val = np.max(x)
     range_val = max_val - min_val
@@ -112,6 +118,27 @@ def min_max_normalize(x):
     
     return (x - min_val) / range_val
 
+
+def top_k_indices(scores: np.ndarray, k: Optional[int], axis: int = -1) -> np.ndarray:
+    """
+    Returns the indices of the `k` largest entries of `scores` along `axis`, sorted by descending score.
+
+    Only the selected entries are sorted (`np.argpartition` followed by a sort of `k` elements), which is
+    O(n + k log k) rather than the O(n log n) of a full `np.argsort`. If `k` is None or not smaller than the
+    length of `axis`, all indices are returned in sorted order.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[axis]
+    if k is None or k >= n:
+        return np.argsort(-scores, axis=axis, kind='stable')
+    if k <= 0:
+        return np.take(np.argsort(scores, axis=axis), [], axis=axis)
+
+    top = np.take(np.argpartition(-scores, k - 1, axis=axis), np.arange(k), axis=axis)
+    order = np.argsort(-np.take_along_axis(scores, top, axis=axis), axis=axis, kind='stable')
+    return np.take_along_axis(top, order, axis=axis)
+
+
 def compute_mdhash_id(content: str, prefix: str = "") -> str:
     """
     Compute the MD5 hash of the given content string and optionally prepend a prefix.
@@ -1,9 +1,14 @@
-from typing import Dict, List, Union, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Union, Any, Optional, Tuple
 
+from tqdm import tqdm
 
 from ..prompts.prompt_template_manager import PromptTemplateManager
 from .logging_utils import get_logger
-from ..llm.openai_gpt import CacheOpenAI
+from .llm_utils import TextChatMessage
+from ..llm import is_vllm_offline
+from ..llm.openai_gpt import CacheOpenAI, AsyncCacheOpenAI
 
 logger = get_logger(__name__)
 
@@ -54,4 +59,72 @@ def reason_step(dataset, prompt_template_manager: PromptTemplateManager, query:
         logger.exception("An exception occurred while calling LLM for QA!")
         return ''
     
-    return response_content
\ No newline at end of file
+    return response_content
+
+
+def batch_qa_inference(llm_model, all_qa_messages: List[List[TextChatMessage]],
+                       max_workers: int = 8) -> Tuple[List[str], List[dict], List[bool]]:
+    """
+    Runs QA reading for all prompts with bounded concurrency and returns the results in prompt order.
+
+    A `VLLMOffline` model generates all answers in one `batch_infer` call. Requests to an `AsyncCacheOpenAI` model run
+    on its event loop within its concurrency and rate limits. Any other model is called from `max_workers` threads.
+    Aggregate token and cache hit counts are shown on the progress bar and logged at the end.
+
+    Returns:
+        Tuple[List[str], List[dict], List[bool]]: The response message, metadata and cache hit flag of each prompt.
+    """
+    num_prompts = len(all_qa_messages)
+    start_time = time.time()
+
+    if is_vllm_offline(llm_model):
+        all_response_message, batch_metadata = llm_model.batch_infer(all_qa_messages)
+        all_metadata = [{"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+                        for prompt_tokens, completion_tokens in zip(batch_metadata["all_prompt_tokens"],
+                                                                    batch_metadata["all_completion_tokens"])]
+        all_cache_hit = [False] * num_prompts
+        logger.info(f"QA Reading: {num_prompts} prompts in {time.time() - start_time:.2f}s, "
+                    f"{batch_metadata['prompt_tokens']} prompt tokens, {batch_metadata['completion_tokens']} completion tokens")
+        return all_response_message, all_metadata, all_cache_hit
+
+    results = [None] * num_prompts
+    total_prompt_tokens, total_completion_tokens, num_cache_hit = 0, 0, 0
+
+    # The requests of an async model run on its own event loop, so a thread pool is only needed for the others.
+    executor = None
+    if isinstance(llm_model, AsyncCacheOpenAI):
+        futures = {llm_model.submit(llm_model.ainfer(qa_messages)): idx for idx, qa_messages in enumerate(all_qa_messages)}
+    else:
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        futures = {executor.submit(llm_model.infer, qa_messages): idx for idx, qa_messages in enumerate(all_qa_messages)}
+
+    try:
+        pbar = tqdm(as_completed(futures), total=num_prompts, desc="QA Reading")
+        for future in pbar:
+            result = future.result()
+            results[futures[future]] = result
+            _, metadata, cache_hit = result
+            total_prompt_tokens += metadata.get('prompt_tokens', 0)
+            total_completion_tokens += metadata.get('completion_tokens', 0)
+            num_cache_hit += int(bool(cache_hit))
+            pbar.set_postfix({
+                'total_prompt_tokens': total_prompt_tokens,
+                'total_completion_tokens': total_completion_tokens,
+                'num_cache_hit': num_cache_hit
+            })
+    except BaseException:
+        # Do not wait for the remaining requests once one has failed.
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    logger.info(f"QA Reading: {num_prompts} prompts in {time.time() - start_time:.2f}s, {num_cache_hit} cache hits, "
+                f"{total_prompt_tokens} prompt tokens, {total_completion_tokens} completion tokens")
+
+    if not results:
+        return [], [], []
+    all_response_message, all_metadata, all_cache_hit = zip(*results)
+    return list(all_response_message), list(all_metadata), list(all_cache_hit)
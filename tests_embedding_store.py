@@ -0,0 +1,166 @@
+import os
+import json
+import hashlib
+import tempfile
+
+import numpy as np
+
+from src.hipporag.embedding_store import EmbeddingStore, MmapEmbeddingStore
+from src.hipporag.utils.misc_utils import compute_mdhash_id
+
+DIM = 8
+
+
+class HashEmbeddingModel:
+    """Deterministic stand-in for an embedding model: every text gets a fixed random vector."""
+
+    def batch_encode(self, texts, **kwargs):
+        return np.stack([np.random.default_rng(int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16))
+                         .standard_normal(DIM).astype(np.float32) for text in texts])
+
+
+def make_texts(start, end):
+    return [f"passage {i}: the quick brown fox number {i}" for i in range(start, end)]
+
+
+def open_mmap_store(db_dir, compaction_ratio=0.25):
+    return MmapEmbeddingStore(HashEmbeddingModel(), db_dir, 16, "chunk", compaction_ratio=compaction_ratio)
+
+
+def assert_same_store(store, expected):
+    assert store.get_all_ids() == expected.get_all_ids()
+    assert store.text_to_hash_id == expected.text_to_hash_id
+    assert store.hash_id_to_idx == expected.hash_id_to_idx
+    hash_ids = expected.get_all_ids()
+    if hash_ids:
+        np.testing.assert_array_equal(store.get_embeddings(hash_ids), expected.get_embeddings(hash_ids))
+        subset = hash_ids[::-3]
+        np.testing.assert_array_equal(store.get_embeddings(subset), expected.get_embeddings(subset))
+        np.testing.assert_array_equal(store.get_embedding(hash_ids[0]), expected.get_embedding(hash_ids[0]))
+    np.testing.assert_array_equal(np.asarray(store.embeddings).reshape(len(hash_ids), -1),
+                                  np.asarray(expected.embeddings).reshape(len(hash_ids), -1))
+
+
+def test_mmap_matches_parquet_backend():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parquet_dir, mmap_dir = os.path.join(tmp_dir, "parquet"), os.path.join(tmp_dir, "mmap")
+        stores = [EmbeddingStore(HashEmbeddingModel(), parquet_dir, 16, "chunk"), open_mmap_store(mmap_dir)]
+
+        steps = [("insert", make_texts(0, 10)),
+                 ("insert", make_texts(5, 15)),  # overlapping texts are only inserted once
+                 ("delete", [2, 7]),
+                 ("insert", make_texts(15, 18)),
+                 ("delete", [0, 1, 3, 4])]  # enough tombstones to compact the mmap store
+        for op, arg in steps:
+            for store in stores:
+                if op == "insert":
+                    store.insert_strings(arg)
+                else:
+                    store.delete([store.text_to_hash_id[make_texts(i, i + 1)[0]] for i in arg])
+            assert_same_store(stores[1], stores[0])
+
+        assert stores[1].generation == 1
+        assert_same_store(open_mmap_store(mmap_dir), EmbeddingStore(HashEmbeddingModel(), parquet_dir, 16, "chunk"))
+
+
+def test_mmap_append_delete_and_compaction():
+    with tempfile.TemporaryDirectory() as db_dir:
+        store = open_mmap_store(db_dir)
+        store.insert_strings(make_texts(0, 20))
+        hash_ids = store.get_all_ids()
+
+        # 3 of 20 rows tombstoned stays below the compaction ratio: the deletes are only appended to the log.
+        store.delete(hash_ids[:3])
+        assert store.generation == 0 and store.num_physical_rows == 20
+        reopened = open_mmap_store(db_dir)
+        assert reopened.generation == 0 and reopened.num_physical_rows == 20
+        assert_same_store(reopened, store)
+
+        # 6 of 20 rows crosses it: live rows move to generation 1 and the old segment is removed.
+        old_vectors_filename, old_log_filename = store.vectors_filename, store.log_filename
+        store.delete(hash_ids[3:6])
+        assert store.generation == 1 and store.num_physical_rows == 14
+        assert not os.path.exists(old_vectors_filename) and not os.path.exists(old_log_filename)
+        with open(store.meta_filename) as f:
+            assert json.load(f)["generation"] == 1
+        assert_same_store(open_mmap_store(db_dir), store)
+
+        # Appends after a compaction go to the new generation.
+        store.insert_strings(make_texts(20, 25))
+        assert store.get_all_ids()[:14] == hash_ids[6:]
+        reopened = open_mmap_store(db_dir)
+        assert reopened.num_physical_rows == 19
+        assert_same_store(reopened, store)
+        np.testing.assert_array_equal(reopened.get_embeddings(reopened.get_all_ids()),
+                                      HashEmbeddingModel().batch_encode(make_texts(6, 25)))
+
+
+def test_mmap_reopen_after_truncated_vectors():
+    with tempfile.TemporaryDirectory() as db_dir:
+        store = open_mmap_store(db_dir)
+        store.insert_strings(make_texts(0, 5))
+        row_bytes = DIM * store.dtype.itemsize
+
+        # Crash between the two appends of an insert: whole vectors without log records, then half a vector.
+        with open(store.vectors_filename, "ab") as f:
+            f.write(HashEmbeddingModel().batch_encode(make_texts(5, 7)).tobytes())
+            f.write(b"\0" * (row_bytes // 2))
+        reopened = open_mmap_store(db_dir)
+        assert os.path.getsize(reopened.vectors_filename) == 5 * row_bytes
+        assert_same_store(reopened, store)
+
+        # A torn vector file tail: the log references a row whose vector was only partly written.
+        os.truncate(reopened.vectors_filename, 4 * row_bytes + row_bytes // 2)
+        reopened = open_mmap_store(db_dir)
+        assert reopened.get_all_ids() == store.get_all_ids()[:4]
+        assert os.path.getsize(reopened.vectors_filename) == 4 * row_bytes
+        with open(reopened.log_filename) as f:
+            assert len(f.readlines()) == 4
+
+        # The repaired store takes new rows at the right physical positions.
+        reopened.insert_strings(make_texts(4, 6))
+        reopened = open_mmap_store(db_dir)
+        np.testing.assert_array_equal(reopened.get_embeddings(reopened.get_all_ids()),
+                                      HashEmbeddingModel().batch_encode(make_texts(0, 6)))
+
+
+def test_mmap_reopen_after_truncated_log():
+    with tempfile.TemporaryDirectory() as db_dir:
+        store = open_mmap_store(db_dir)
+        store.insert_strings(make_texts(0, 5))
+        store.delete([store.text_to_hash_id[make_texts(1, 2)[0]]])
+
+        # Crash while appending the log records of an insert whose vectors were written: the last record is torn.
+        with open(store.vectors_filename, "ab") as f:
+            f.write(HashEmbeddingModel().batch_encode(make_texts(5, 7)).tobytes())
+        with open(store.log_filename, "a") as f:
+            text = make_texts(5, 6)[0]
+            f.write(json.dumps({"hash_id": compute_mdhash_id(text, prefix="chunk-"), "content": text}) + "\n")
+            f.write('{"hash_id": "chunk-')
+
+        reopened = open_mmap_store(db_dir)
+        assert reopened.get_all_texts() == set(make_texts(0, 6)) - set(make_texts(1, 2))
+        assert reopened.num_physical_rows == 6
+        assert os.path.getsize(reopened.vectors_filename) == 6 * DIM * reopened.dtype.itemsize
+        with open(reopened.log_filename, "rb") as f:
+            assert f.read().endswith(b"\n")
+
+        reopened.insert_strings(make_texts(6, 8))
+        reopened = open_mmap_store(db_dir)
+        expected_texts = make_texts(0, 1) + make_texts(2, 8)
+        assert [reopened.hash_id_to_text[h] for h in reopened.get_all_ids()] == expected_texts
+        np.testing.assert_array_equal(reopened.get_embeddings(reopened.get_all_ids()),
+                                      HashEmbeddingModel().batch_encode(expected_texts))
+
+
+def main():
+    for test in [test_mmap_matches_parquet_backend,
+                 test_mmap_append_delete_and_compaction,
+                 test_mmap_reopen_after_truncated_vectors,
+                 test_mmap_reopen_after_truncated_log]:
+        test()
+        print(f"{test.__name__}: passed")
+
+
+if __name__ == "__main__":
+    main()